@@ -1,66 +1,171 @@
 # Add references
+import argparse
 import asyncio
-from typing import cast
+import sys
 import os
-from dotenv import load_dotenv
-from agent_framework import ChatMessage, Role, ConcurrentBuilder, WorkflowOutputEvent
-from agent_framework_azure_ai import AzureAIAgentsProvider
-from azure.identity.aio import AzureCliCredential
-from agent_framework import AgentExecutor
-
-# Load environment variables from .env file
-load_dotenv()
+from agent_framework import ChatMessage, ConcurrentBuilder, WorkflowOutputEvent
+from orchestration.aggregation import AggregatedConversation, AggregationPolicy, LateResponseEvent, build_policy_workflow
+from orchestration import tracing
+from orchestration.context import ContextPolicies, Summarizer
+from orchestration.credentials import shared_credential
+from orchestration.hedging import HedgePolicy, Hedging
+from orchestration.ratelimit import NORMAL, scheduled_provider, shared_scheduler
+from orchestration.registry import AgentRegistry, AgentSpec
+from orchestration.startup import load_env
+from orchestration.streaming import StreamRenderer, open_sink
+
+# Load environment variables from .env file (once per process)
+load_env()
 project_endpoint = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
 model_deployment = os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME")
+# Optional file that lets later runs reuse still-valid access tokens
+token_cache = os.getenv("AZURE_TOKEN_CACHE")
 
-async def main():
+task = "We are launching a new budget-friendly electric bike for urban commuters."
+
+
+def create_context(specs: list[str] | None) -> ContextPolicies:
+    """Context policies by agent name; summaries are rate limited like the agents' own calls."""
+    return ContextPolicies.parse(specs or (), Summarizer(scheduler=shared_scheduler(), priority=NORMAL))
 
-    # 1) Create three domain agents using AzureChatClient
-    async with (
-        AzureCliCredential() as credential,
-        AzureAIAgentsProvider(credential=credential) as client,
-    ):
 
+def create_hedging(args) -> Hedging | None:
+    """Duplicate slow-starting calls of the agents named by --hedge, within a global rate cap."""
+    if not args.hedge:
+        return None
+    policy = HedgePolicy(percentile=args.hedge_percentile, initial_delay=args.hedge_after)
+    return Hedging(args.hedge, policy, max_rate=args.hedge_max_rate, scheduler=shared_scheduler())
 
-        researcher = await client.create_agent(
+
+async def create_agents(client, context: ContextPolicies | None = None, hedging: Hedging | None = None):
+    """Create the researcher, marketer and legal agents.
+
+    With hedging, a reply that is slow to start is requested twice and the faster copy is used,
+    so one stalled participant does not hold up the aggregated output.
+    """
+    context = context or create_context(None)
+    # Unchanged definitions are reused from the local registry; new ones are created in parallel
+    # Every model call goes through the process-wide rate limiter
+    # Context policies trim what each agent's model calls see
+    registry = AgentRegistry(client, middleware=lambda spec: [
+        *tracing.middleware(),
+        *context.middleware(spec.name),
+        *(hedging.middleware(spec.name) if hedging is not None else ()),
+        shared_scheduler().middleware(NORMAL),
+    ])
+    researcher, marketer, legal = await registry.ensure([
+        AgentSpec(
             instructions=(
                 "You're an expert market and product researcher. Given a prompt, provide concise, factual insights,"
                 " opportunities, and risks."
             ),
             name="researcher",
-        )
-
-        marketer = await client.create_agent(
+        ),
+        AgentSpec(
             instructions=(
                 "You're a creative marketing strategist. Craft compelling value propositions and target messaging"
                 " aligned to the prompt."
             ),
             name="marketer",
-        )
-
-        legal = await client.create_agent(
+        ),
+        AgentSpec(
             instructions=(
                 "You're a cautious legal/compliance reviewer. Highlight constraints, disclaimers, and policy concerns"
                 " based on the prompt."
             ),
             name="legal",
-        )
+        ),
+    ])
+    return [researcher, marketer, legal]
+
+
+def build_workflow(agents, policy: AggregationPolicy | None = None):
+    """Fan the prompt out to every agent and aggregate the replies.
 
-        workflow = ConcurrentBuilder().participants([researcher, marketer, legal]).build()
+    With a policy, the output is yielded after the first k replies or at the deadline instead
+    of waiting for the slowest agent.
+    """
+    if policy is not None:
+        return tracing.trace_workflow(build_policy_workflow(agents, policy), "concurrent")
+    return tracing.trace_workflow(ConcurrentBuilder().participants(agents).build(), "concurrent")
 
+
+async def main(args):
+    # The Azure SDK is the slowest import by far; only live runs pay for it
+    from agent_framework_azure_ai import AzureAIAgentsProvider
+
+
+    # 1) Create three domain agents using AzureChatClient
+    async with (
+        shared_credential(disk_cache=token_cache) as credential,
+        scheduled_provider(AzureAIAgentsProvider, credential) as client,
+    ):
+
+        context = create_context(args.context)
+        hedging = create_hedging(args)
+        agents = await create_agents(client, context=context, hedging=hedging)
+        policy = None
+        if args.first_k is not None or args.deadline is not None:
+            policy = AggregationPolicy(first_k=args.first_k, deadline=args.deadline, late=args.late)
+        workflow = build_workflow(agents, policy)
+
+        # Each agent's reply streams live; the aggregated conversation follows once complete
         output_evt: WorkflowOutputEvent  | None = None
-        async for event in workflow.run_stream("We are launching a new budget-friendly electric bike for urban commuters."):
-            if isinstance(event, WorkflowOutputEvent):
-                output_evt = event
-
-        if output_evt:
-            print("===== Final Aggregated Conversation (messages) =====")
-            messages: list[ChatMessage] | Any = output_evt.data
-            for i, msg in enumerate(messages, start=1):
-                name = msg.author_name if msg.author_name else "user"
-                print(f"{'-' * 60}\n\n{i:02d} [{name}]:\n{msg.text}")
+        async with open_sink(args.stream_to) as sink:
+            renderer = StreamRenderer(sink)
+            async for event in workflow.run_stream(task):
+                if renderer.handle(event):
+                    continue
+                if isinstance(event, WorkflowOutputEvent):
+                    output_evt = event
+                    await sink.flush()
+                    print_aggregated(output_evt)
+                elif isinstance(event, LateResponseEvent):
+                    await sink.flush()
+                    print(f"{'-' * 60}\n\n[late] [{event.participant}] after {event.seconds:.2f}s:\n{event.data.text if event.data else event.error}")
+            renderer.finish()
+        print(renderer.report(), file=sys.stderr)
+        print(shared_scheduler().stats.report(), file=sys.stderr)
+        if context.stats.calls:
+            print(context.report(), file=sys.stderr)
+        if hedging is not None:
+            print(hedging.report(), file=sys.stderr)
+        tracing.finish()
+
+
+def print_aggregated(output_evt: WorkflowOutputEvent) -> None:
+    print("===== Final Aggregated Conversation (messages) =====")
+    messages: list[ChatMessage] | Any = output_evt.data
+    if isinstance(messages, AggregatedConversation):
+        made_it = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in messages.timings.items())
+        print(f"Policy: {messages.policy} | made the cut: {made_it or 'none'} | missed: {', '.join(messages.missed) or 'none'}")
+        for name, error in messages.failed.items():
+            print(f"Failed: {name}: {error}")
+    for i, msg in enumerate(messages, start=1):
+        name = msg.author_name if msg.author_name else "user"
+        print(f"{'-' * 60}\n\n{i:02d} [{name}]:\n{msg.text}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent product-launch brief from researcher, marketer and legal.")
+    parser.add_argument("--first-k", type=int, help="return after the first k replies")
+    parser.add_argument("--deadline", type=float, help="return after this many seconds with whatever is done")
+    parser.add_argument("--late", choices=["cancel", "attach"], default="cancel",
+                        help="cancel participants that miss the cut, or print their replies when they arrive")
+    parser.add_argument("--stream-to", default="-",
+                        help="where live agent output goes: '-' (terminal), a JSONL path, tcp://host:port or unix:///path")
+    parser.add_argument("--context", action="append", metavar="AGENT=POLICY",
+                        help="context policy per agent ('*' for all), e.g. legal=window:4000 or '*=last:2'; see orchestration/context.py")
+    parser.add_argument("--hedge", action="append", metavar="AGENT",
+                        help="hedge this agent's slow-starting calls ('*' for all agents); repeatable")
+    parser.add_argument("--hedge-percentile", type=float, default=95.0,
+                        help="hedge once a call has waited longer than this percentile of recent first-token times")
+    parser.add_argument("--hedge-after", type=float,
+                        help="seconds to wait before hedging while there are too few samples for the percentile")
+    parser.add_argument("--hedge-max-rate", type=float, default=0.1, help="largest share of calls that may be duplicated")
+    return parser.parse_args(argv)
     
     
     
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
\ No newline at end of file
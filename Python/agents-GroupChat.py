@@ -1,44 +1,88 @@
 # Add references
+import argparse
 import asyncio
+import sys
 from typing import cast
 import os
-from dotenv import load_dotenv
-from agent_framework import ChatMessage, Role, GroupChatBuilder, GroupChatState, WorkflowOutputEvent,GroupChatResponseReceivedEvent
-from agent_framework_azure_ai import AzureAIAgentsProvider
-from azure.identity.aio import AzureCliCredential
-from agent_framework import AgentExecutor
-
-# Load environment variables from .env file
-load_dotenv()
+from agent_framework import ChatMessage, WorkflowOutputEvent
+from orchestration import tracing
+from orchestration.context import ContextPolicies, Summarizer
+from orchestration.credentials import shared_credential
+from orchestration.ratelimit import NORMAL, scheduled_provider, shared_scheduler
+from orchestration.registry import AgentRegistry, AgentSpec
+from orchestration.speakers import (
+    FINISH,
+    LocalFirstGroupChatBuilder,
+    RoundRobinSelector,
+    Rule,
+    RuleTableSelector,
+    SelectionStats,
+    StateMachineSelector,
+    all_of,
+    at_start,
+    last_message_longer_than,
+    spoke_last,
+)
+from orchestration.startup import load_env
+from orchestration.termination import (
+    DEFAULT_PRICES,
+    AnyOf,
+    Condition,
+    MaxTurns,
+    TerminatedConversation,
+    Termination,
+    limits,
+    parse_prices,
+    turn_meter,
+)
+from orchestration.streaming import StreamRenderer, open_sink
+
+# Load environment variables from .env file (once per process)
+load_env()
 project_endpoint = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
 model_deployment = os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME")
+# Optional file that lets later runs reuse still-valid access tokens
+token_cache = os.getenv("AZURE_TOKEN_CACHE")
 
-async def main():
+# Older turns are summarized once the conversation passes ~3000 tokens
+# (--context replaces the policy of the agents it names)
+DEFAULT_CONTEXT = ["*=summary:3000:6"]
+
+task = "What are the key benefits of async/await in Python?"
 
-    # 1) Create three domain agents using AzureChatClient
-    async with (
-        AzureCliCredential() as credential,
-        AzureAIAgentsProvider(credential=credential) as client,
-    ):
 
+def create_context(specs: list[str] | None) -> ContextPolicies:
+    """Context policies by agent name; summaries are rate limited like the agents' own calls."""
+    return ContextPolicies.parse([*DEFAULT_CONTEXT, *(specs or ())], Summarizer(scheduler=shared_scheduler(), priority=NORMAL))
 
-        researcher = await client.create_agent(
+
+async def create_agents(client, context: ContextPolicies | None = None):
+    """Create the Researcher and Writer participants and the Orchestrator agent."""
+    context = context or create_context(None)
+    # Unchanged definitions are reused from the local registry; new ones are created in parallel
+    # Every model call goes through the process-wide rate limiter
+    # Context policies trim what each agent's model calls see; the turn meter feeds run limits
+    registry = AgentRegistry(client, middleware=lambda spec: [
+        *tracing.middleware(), turn_meter(), *context.middleware(spec.name), shared_scheduler().middleware(NORMAL),
+    ])
+    researcher, writer, orchestrator_agent = await registry.ensure([
+        AgentSpec(
             instructions=(
                 "Gather concise facts that help answer the question. Be brief and factual."
             ),
             name="Researcher",
             description= "Collects relevant background information."
-        )
+        ),
 
-        writer = await client.create_agent(
+        AgentSpec(
             instructions=(
                 "Compose clear, structured answers using any notes provided. Be comprehensive."
             ),
             name="Writer",
             description= "Synthesizes polished answers using gathered information."
-        )
+        ),
 
-        orchestrator_agent  = await client.create_agent(
+        AgentSpec(
             instructions="""
             You coordinate a team conversation to solve the user's task.
 
@@ -50,32 +94,84 @@ async def main():
             name="Orchestrator",
             description="Coordinates multi-agent collaboration by selecting speakers",
 
-        )
-
-        workflow = (
-            GroupChatBuilder()
-            .with_agent_orchestrator(agent=orchestrator_agent)
-            # Set a hard termination condition: stop after 4 assistant messages
-            # The agent orchestrator will intelligently decide when to end before this limit but just in case
-            .with_termination_condition(lambda messages: sum(1 for msg in messages if msg.role == Role.ASSISTANT) >= 4)
-            .participants([researcher, writer])
-            .build()
-        )
-        
+        ),
+    ])
+    return [researcher, writer, orchestrator_agent]
+
+
+def create_selector(speaker: str):
+    """Local speaker selection that follows the orchestrator's own guidelines."""
+    if speaker == "round-robin":
+        return RoundRobinSelector(["Researcher", "Writer"], max_turns=2)
+    if speaker == "state-machine":
+        return StateMachineSelector({None: "Researcher", "Researcher": "Writer", "Writer": FINISH})
+    # Rule table: the orchestrator agent is only asked when no rule matches (e.g. a thin answer)
+    return RuleTableSelector([
+        Rule(at_start, "Researcher", "research first"),
+        Rule(spoke_last("Researcher"), "Writer", "writer synthesizes"),
+        Rule(all_of(spoke_last("Writer"), last_message_longer_than(200)), FINISH, "writer answered"),
+    ])
+
+
+def build_workflow(agents, speaker: str = "rules", stats: SelectionStats | None = None, conditions: list[Condition] | None = None):
+    """Group chat where speakers are picked locally, falling back to the orchestrator agent.
+
+    With speaker="llm" the orchestrator agent picks the next speaker every turn. ``conditions``
+    (time, token, cost or turn limits) can end the conversation early.
+    """
+    researcher, writer, orchestrator_agent = agents
+    # Set a hard termination condition: stop after 4 participant turns
+    # The agent orchestrator will intelligently decide when to end before this limit but just in case
+    termination = Termination(AnyOf(MaxTurns(4, researcher.name, writer.name), *(conditions or ())))
+    builder = LocalFirstGroupChatBuilder()
+    if speaker == "llm":
+        builder = builder.with_agent_orchestrator(agent=orchestrator_agent)
+    else:
+        builder = builder.with_local_selector(create_selector(speaker), fallback=orchestrator_agent, stats=stats)
+    workflow = (
+        builder
+        .with_termination_condition(termination)
+        .participants([researcher, writer])
+        .build()
+    )
+    return termination.watch(tracing.trace_workflow(workflow, "groupchat"))
+
+
+async def main(args):
+    # The Azure SDK is the slowest import by far; only live runs pay for it
+    from agent_framework_azure_ai import AzureAIAgentsProvider
+
 
-        task = "What are the key benefits of async/await in Python?"
+    # 1) Create three domain agents using AzureChatClient
+    async with (
+        shared_credential(disk_cache=token_cache) as credential,
+        scheduled_provider(AzureAIAgentsProvider, credential) as client,
+    ):
+
+
+        context = create_context(args.context)
+        agents = await create_agents(client, context=context)
+        stats = SelectionStats()
+        conditions = limits(args.max_seconds, args.max_tokens, args.max_cost, args.token_prices, args.max_turns or ())
+        workflow = build_workflow(agents, args.speaker, stats, conditions)
+        
 
         print(f"Task: {task}\n")
         print("=" * 80)
 
         final_conversation: list[ChatMessage] = []
-        last_executor_id: str | None = None
 
-        # Run the workflow
-        async for event in workflow.run_stream(task):
-            if isinstance(event, WorkflowOutputEvent):
-                # Workflow completed - data is a list of ChatMessage
-                final_conversation = cast(list[ChatMessage], event.data)
+        # Run the workflow, showing each speaker's turn as it streams in
+        async with open_sink(args.stream_to) as sink:
+            renderer = StreamRenderer(sink)
+            async for event in workflow.run_stream(task):
+                if renderer.handle(event):
+                    continue
+                if isinstance(event, WorkflowOutputEvent):
+                    # Workflow completed - data is a list of ChatMessage
+                    final_conversation = cast(list[ChatMessage], event.data)
+            renderer.finish()
+        print(renderer.report(), file=sys.stderr)
 
         if final_conversation:
             print("\n\n" + "=" * 80)
@@ -87,9 +183,36 @@ async def main():
                 print("-" * 80)
 
         print("\nWorkflow completed.")
+        if isinstance(final_conversation, TerminatedConversation):
+            print(final_conversation.report(), file=sys.stderr)
+        if args.speaker != "llm":
+            print(stats.report(args.orchestrator_ms / 1000 if args.orchestrator_ms else None), file=sys.stderr)
+        if context.stats.calls:
+            print(context.report(), file=sys.stderr)
+        tracing.finish()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Researcher and Writer group chat steered by an orchestrator.")
+    parser.add_argument("--stream-to", default="-",
+                        help="where live agent output goes: '-' (terminal), a JSONL path, tcp://host:port or unix:///path")
+    parser.add_argument("--speaker", choices=["rules", "state-machine", "round-robin", "llm"], default="rules",
+                        help="how the next speaker is chosen; 'llm' asks the orchestrator agent every turn")
+    parser.add_argument("--orchestrator-ms", type=float,
+                        help="price avoided orchestrator calls at this latency (default: measured fallback calls)")
+    parser.add_argument("--max-seconds", type=float, help="stop the conversation after this many seconds")
+    parser.add_argument("--max-tokens", type=int, help="stop once the agents' model calls have used this many tokens")
+    parser.add_argument("--max-cost", type=float, help="stop once the model calls have cost this many dollars (see --token-prices)")
+    parser.add_argument("--token-prices", type=parse_prices, default=DEFAULT_PRICES, metavar="IN:OUT",
+                        help="dollars per 1K input and output tokens for --max-cost (default: %(default)s)")
+    parser.add_argument("--max-turns", action="append", metavar="AGENT=N",
+                        help="stop after AGENT has taken N turns ('N' alone counts every agent)")
+    parser.add_argument("--context", action="append", metavar="AGENT=POLICY",
+                        help="context policy per agent ('*' for all), e.g. Writer=from:user,Researcher or '*=summary:3000:6'; see orchestration/context.py")
+    return parser.parse_args(argv)
 
     
     
     
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
\ No newline at end of file
@@ -1,141 +1,287 @@
 # Add references
+import argparse
 import asyncio
 import json
-from typing import cast
+import sys
 import os
-from dotenv import load_dotenv
 from typing import Annotated
 from agent_framework import (
-    ChatMessage, 
-    Role,  
     WorkflowOutputEvent,
     RequestInfoEvent,
     HandoffBuilder,
-    AgentRunUpdateEvent,
-    RequestInfoEvent,
     HandoffAgentUserRequest,
 )
-from agent_framework_azure_ai import AzureAIProjectAgentProvider
-from azure.identity.aio import AzureCliCredential
-from agent_framework import AgentExecutor
+from orchestration import tracing
+from orchestration.context import ContextPolicies, Summarizer
+from orchestration.credentials import shared_credential
+from orchestration.dispatch import EventDispatcher
+from orchestration.ratelimit import INTERACTIVE, scheduled_provider, shared_scheduler
+from orchestration.registry import AgentRegistry, AgentSpec
+from orchestration.routing import KeywordRule, NaiveBayesClassifier, TriageFastPath, TriageRouter, evaluate_router
+from orchestration.singleflight import SingleFlight
+from orchestration.startup import load_env
+from orchestration.termination import (
+    DEFAULT_PRICES,
+    AnyOf,
+    Condition,
+    TerminatedConversation,
+    Termination,
+    TextMentions,
+    limits,
+    parse_prices,
+    turn_meter,
+)
+from orchestration.tools import ToolPool
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file (once per process)
+load_env()
 project_endpoint = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
 model_deployment = os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME")
+# Optional file that lets later runs reuse still-valid access tokens
+token_cache = os.getenv("AZURE_TOKEN_CACHE")
+
 
+# Older turns are summarized once the conversation passes ~3000 tokens
+# (--context replaces the policy of the agents it names)
+DEFAULT_CONTEXT = ["*=summary:3000:6"]
 
+# Sync tools run on worker threads so slow backends do not block the event loop
+tools = ToolPool(max_workers=8)
+
+
+@tools.tool
 def process_refund(order_number: Annotated[str, "Order number to process refund for"]) -> str:
     """Simulated function to process a refund for a given order number."""
     return f"Refund processed successfully for order {order_number}."
 
 
+# Read-only, so repeated lookups within 30 seconds reuse the answer
+@tools.tool(memo_ttl=30)
 def check_order_status(order_number: Annotated[str, "Order number to check status for"]) -> str:
     """Simulated function to check the status of a given order number."""
     return f"Order {order_number} is currently being processed and will ship in 2 business days."
 
+
+@tools.tool
 def process_return(order_number: Annotated[str, "Order number to process return for"]) -> str:
     """Simulated function to process a return for a given order number."""
     return f"Return initiated successfully for order {order_number}. You will receive return instructions via email."
 
-async def main():
 
-    # 1) Create three domain agents using AzureChatClient
-    async with (
-        AzureCliCredential() as credential,
-        AzureAIProjectAgentProvider(credential=credential) as client,
-    ):
+task = "I need help with my order."
+
+
+# Specialists triage may hand off to (wired in build_workflow, scored by --eval-router)
+TRIAGE_TARGETS = ["orderAgent", "returnAgent"]
 
+# Requests that plainly name their specialist skip the triage model call
+ROUTING_RULES = [
+    KeywordRule("returnAgent", [r"\b(return|send (it|this|them) back)\b"]),
+    KeywordRule("orderAgent", [r"\border\s*(number|no\.?|#)?\s*:?\s*#?\d{4,}", r"\b(track(ing)?|shipping|shipped|deliver(y|ed)?)\b"]),
+    # Triage has no handoff to refundAgent, so this rule never fires from triage
+    KeywordRule("refundAgent", [r"\brefund\b"]),
+]
 
-        triage_agent   = await client.create_agent(
+# Seed examples for the optional local classifier; "triageAgent" means "let triage decide"
+ROUTING_EXAMPLES = [
+    ("I want to return the shoes I bought", "returnAgent"),
+    ("this jacket does not fit, how do I send it back", "returnAgent"),
+    ("the item arrived broken and I would like to return it", "returnAgent"),
+    ("where is my package", "orderAgent"),
+    ("my order has not arrived yet", "orderAgent"),
+    ("when will my order ship", "orderAgent"),
+    ("can you check the status of my order", "orderAgent"),
+    ("I need help", "triageAgent"),
+    ("I have a question about my account", "triageAgent"),
+    ("hello", "triageAgent"),
+]
+
+
+def create_fast_path(classifier: bool = False, threshold: float = 0.8) -> TriageFastPath:
+    """Local pre-router for the triage agent (rules, plus a naive Bayes classifier if asked)."""
+    model = NaiveBayesClassifier(ROUTING_EXAMPLES) if classifier else None
+    return TriageFastPath(TriageRouter(ROUTING_RULES, classifier=model, threshold=threshold))
+
+
+def create_context(specs: list[str] | None) -> ContextPolicies:
+    """Context policies by agent name; summaries are rate limited like the agents' own calls."""
+    return ContextPolicies.parse([*DEFAULT_CONTEXT, *(specs or ())], Summarizer(scheduler=shared_scheduler(), priority=INTERACTIVE))
+
+
+async def create_agents(client, fast_path: TriageFastPath | None = None, context: ContextPolicies | None = None,
+                        flight: SingleFlight | None = None):
+    """Create the triage agent and the refund, order and return specialists.
+
+    With a fast path, obvious requests are handed to a specialist without a triage model call.
+    With single-flight, identical requests reaching triage at the same time share one call.
+    """
+    context = context or create_context(None)
+    # Unchanged definitions are reused from the local registry; new ones are created in parallel
+    # Every model call goes through the process-wide rate limiter, ahead of background work
+    # Context policies trim what each agent's model calls see; the turn meter feeds run limits
+    registry = AgentRegistry(client, middleware=lambda spec: [
+        *tracing.middleware(), turn_meter(), *context.middleware(spec.name), shared_scheduler().middleware(INTERACTIVE),
+    ])
+    triage_agent, refund_agent, order_agent, return_agent = await registry.ensure([
+        AgentSpec(
             instructions=(
                 "You are frontline support triage. Route customer issues to the appropriate specialist agents "
                 "based on the problem described."
             ),
             name="triageAgent",
-            description= "Triage agent that handles general inquiries."
-        )
+            description= "Triage agent that handles general inquiries.",
+            # Rules route first; only what reaches the model joins (or starts) the in-flight call
+            middleware=[m for m in (fast_path, flight) if m is not None] or None,
+        ),
 
-        refund_agent  = await client.create_agent(
+        AgentSpec(
             instructions=(
                 "You process refund requests."
             ),
             name="refundAgent",
             description= "Agent that handles refund requests.",
             tools=[process_refund]
-        )
+        ),
 
-        order_agent = await client.create_agent(
+        AgentSpec(
             instructions="You handle order and shipping inquiries.",
             name="orderAgent",
             description="Agent that handles order tracking and shipping issues.",
             tools=[check_order_status],
-        )
+        ),
 
-        return_agent  = await client.create_agent(
+        AgentSpec(
             instructions="You manage product return requests.",
             name="returnAgent",
             description="Agent that handles return processing.",
             tools=[process_return],
-        )
+        ),
+    ])
+    return [triage_agent, refund_agent, order_agent, return_agent]
 
-        workflow = (
-            HandoffBuilder(
-                name="support_with_approvals",
-                participants=[triage_agent, refund_agent, order_agent, return_agent],
-            )
-            .with_start_agent(triage_agent) # Triage receives initial user input
-            .with_termination_condition(
-                # Custom termination: Check if one of the agents has provided a closing message.
-                # This looks for the last message containing "welcome", which indicates the
-                # conversation has concluded naturally.
-                lambda conversation: len(conversation) > 0 and "welcome" in conversation[-1].text.lower()
-            )
-            .with_autonomous_mode(
-                agents=[triage_agent],
-                turn_limits={triage_agent.name: 3},
-                prompts={triage_agent.name: "Continue with your best judgment as the user is unavailable."},
-            )
-            # Triage cannot route directly to refund agent
-            .add_handoff(triage_agent, [order_agent, return_agent])
-            # Only the return agent can handoff to refund agent - users wanting refunds after returns
-            .add_handoff(return_agent, [refund_agent])
-            # All specialists can handoff back to triage for further routing
-            .add_handoff(order_agent, [triage_agent])
-            .add_handoff(return_agent, [triage_agent])
-            .add_handoff(refund_agent, [triage_agent])
-            .build()
+
+def build_workflow(agents, conditions: list[Condition] | None = None):
+    """Customer support handoff graph starting at triage; ``conditions`` can end it early."""
+    triage_agent, refund_agent, order_agent, return_agent = agents
+    # Custom termination: Check if one of the agents has provided a closing message.
+    # This looks for an agent reply containing "welcome", which indicates the
+    # conversation has concluded naturally; time, token, cost and turn limits stop it sooner.
+    termination = Termination(AnyOf(TextMentions("welcome"), *(conditions or ())))
+    workflow = (
+        HandoffBuilder(
+            name="support_with_approvals",
+            participants=[triage_agent, refund_agent, order_agent, return_agent],
+        )
+        .with_start_agent(triage_agent) # Triage receives initial user input
+        .with_termination_condition(termination)
+        .with_autonomous_mode(
+            agents=[triage_agent],
+            turn_limits={triage_agent.name: 3},
+            prompts={triage_agent.name: "Continue with your best judgment as the user is unavailable."},
         )
+        # Triage cannot route directly to refund agent
+        .add_handoff(triage_agent, [agent for agent in agents if agent.name in TRIAGE_TARGETS])
+        # Only the return agent can handoff to refund agent - users wanting refunds after returns
+        .add_handoff(return_agent, [refund_agent])
+        # All specialists can handoff back to triage for further routing
+        .add_handoff(order_agent, [triage_agent])
+        .add_handoff(return_agent, [triage_agent])
+        .add_handoff(refund_agent, [triage_agent])
+        .build()
+    )
+    return termination.watch(tracing.trace_workflow(workflow, "handoff-autonomous"))
+
+
+def evaluate(args) -> None:
+    """Print coverage and accuracy of the fast path on labelled customer messages."""
+    with open(args.eval_router, encoding="utf-8") as f:
+        examples = [(row["text"], row["target"]) for row in (json.loads(line) for line in f if line.strip())]
+    router = create_fast_path(args.router_classifier, args.router_threshold).router
+    print(evaluate_router(router, examples, TRIAGE_TARGETS))
+
+
+async def answer_requests(pending: list[RequestInfoEvent]) -> dict[str, HandoffAgentUserRequest]:
+    """Ask the user about each pending request in turn; end of input ends the conversation."""
+    responses: dict[str, HandoffAgentUserRequest] = {}
+    for request in pending:
+        if isinstance(request.data, HandoffAgentUserRequest):
+            # Agent needs user input
+            print(f"Agent {request.source_executor_id} asks:")
+            for msg in request.data.agent_response.messages[-2:]:
+                print(f"  {msg.author_name}: {msg.text}")
+
+            try:
+                user_input = await asyncio.to_thread(input, "You: ")
+            except EOFError:
+                return {req.request_id: HandoffAgentUserRequest.terminate() for req in pending}
+            responses[request.request_id] = HandoffAgentUserRequest.create_response(user_input)
+    return responses
+
+
+async def main(args):
+    if args.eval_router:
+        evaluate(args)
+        return
+
+    # The Azure SDK is the slowest import by far; only live runs pay for it
+    from agent_framework_azure_ai import AzureAIProjectAgentProvider
+
+    # 1) Create three domain agents using AzureChatClient
+    async with (
+        shared_credential(disk_cache=token_cache) as credential,
+        scheduled_provider(AzureAIProjectAgentProvider, credential) as client,
+    ):
+
+
+        fast_path = create_fast_path(args.router_classifier, args.router_threshold) if args.fast_path else None
+        context = create_context(args.context)
+        flight = SingleFlight() if args.single_flight else None
+        agents = await create_agents(client, fast_path, context=context, flight=flight)
+        conditions = limits(args.max_seconds, args.max_tokens, args.max_cost, args.token_prices, args.max_turns or ())
+        workflow = build_workflow(agents, conditions)
         
-        pending_requests: list[RequestInfoEvent] = []
-
-        # Start workflow
-        async for event in workflow.run_stream("I need help with my order."):
-            if isinstance(event, RequestInfoEvent):
-                pending_requests.append(event)
-
-
-        while pending_requests:
-            responses: dict[str, object] = {}
-
-            for request in pending_requests:
-                if isinstance(request.data, HandoffAgentUserRequest):
-                    # Agent needs user input
-                    print(f"Agent {request.source_executor_id} asks:")
-                    for msg in request.data.agent_response.messages[-2:]:
-                        print(f"  {msg.author_name}: {msg.text}")
-
-                    user_input = input("You: ")
-                    responses[request.request_id] = HandoffAgentUserRequest.create_response(user_input)
-               
-
-            # Send all responses and collect new requests
-            pending_requests = []
-            async for event in workflow.send_responses_streaming(responses):
-                if isinstance(event, RequestInfoEvent):
-                    pending_requests.append(event)
-                elif isinstance(event, WorkflowOutputEvent):
-                    print("\nWorkflow completed!")
-  
+        # Events are handled as they arrive; requests raised in each round carry into the next
+        dispatcher = EventDispatcher()
+        dispatcher.on(WorkflowOutputEvent, lambda event: print("\nWorkflow completed!"))
+        output = await dispatcher.converse(workflow, task, answer_requests)
+        if output is not None and isinstance(output.data, TerminatedConversation):
+            print(output.data.report(), file=sys.stderr)
+
+        if fast_path is not None:
+            print(fast_path.stats.report(args.triage_ms / 1000 if args.triage_ms else None), file=sys.stderr)
+        if flight is not None and flight.stats.merged:
+            print(flight.report(), file=sys.stderr)
+        print(tools.report(), file=sys.stderr)
+        print(dispatcher.stats.report(), file=sys.stderr)
+        if context.stats.calls:
+            print(context.report(), file=sys.stderr)
+        tracing.finish()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Customer support handoff with an autonomous triage agent.")
+    parser.add_argument("--no-fast-path", dest="fast_path", action="store_false",
+                        help="send every customer message through the triage agent")
+    parser.add_argument("--router-classifier", action="store_true",
+                        help="back the routing rules with a local naive Bayes classifier")
+    parser.add_argument("--router-threshold", type=float, default=0.8, help="minimum confidence to skip triage")
+    parser.add_argument("--triage-ms", type=float,
+                        help="price skipped triage calls at this latency (default: measured triage calls)")
+    parser.add_argument("--no-single-flight", dest="single_flight", action="store_false",
+                        help="give every triage request its own model call, even when an identical one is in flight")
+    parser.add_argument("--eval-router", metavar="PATH",
+                        help="score the router on a JSONL file of {\"text\", \"target\"} records and exit")
+    parser.add_argument("--max-seconds", type=float, help="stop the conversation after this many seconds")
+    parser.add_argument("--max-tokens", type=int, help="stop once the agents' model calls have used this many tokens")
+    parser.add_argument("--max-cost", type=float, help="stop once the model calls have cost this many dollars (see --token-prices)")
+    parser.add_argument("--token-prices", type=parse_prices, default=DEFAULT_PRICES, metavar="IN:OUT",
+                        help="dollars per 1K input and output tokens for --max-cost (default: %(default)s)")
+    parser.add_argument("--max-turns", action="append", metavar="AGENT=N",
+                        help="stop after AGENT has taken N turns ('N' alone counts every agent)")
+    parser.add_argument("--context", action="append", metavar="AGENT=POLICY",
+                        help="context policy per agent ('*' for all), e.g. triageAgent=last:6 or '*=summary:3000:6'; see orchestration/context.py")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
\ No newline at end of file
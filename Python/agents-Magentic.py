@@ -1,145 +1,282 @@
 # Add references
+import argparse
 import asyncio
 import json
+import sys
 from typing import cast
 import os
-from dotenv import load_dotenv
 from agent_framework import (
     ChatMessage, 
-    Role,  
     WorkflowOutputEvent,
     RequestInfoEvent,
     HostedCodeInterpreterTool,
     MagenticBuilder,
-    AgentRunUpdateEvent,
-    MagenticOrchestratorEvent,
-    MagenticProgressLedger,
     MagenticPlanReviewRequest,
-    MagenticPlanReviewResponse
+    MagenticPlanReviewResponse,
+    StandardMagenticManager,
 )
-from agent_framework_azure_ai import AzureAIProjectAgentProvider
-from azure.identity.aio import AzureCliCredential
-from agent_framework import AgentExecutor
+from orchestration.checkpoints import DeltaCheckpointStorage
+from orchestration import tracing
+from orchestration.context import ContextPolicies, Summarizer
+from orchestration.credentials import shared_credential
+from orchestration.plans import PlanCache, PlanCachingManager, PlanReviewPolicy, prompt_with_timeout
+from orchestration.ratelimit import NORMAL, scheduled_provider, shared_scheduler
+from orchestration.registry import AgentRegistry, AgentSpec
+from orchestration.startup import load_env
+from orchestration.termination import (
+    DEFAULT_PRICES,
+    AnyOf,
+    Condition,
+    TerminatedConversation,
+    Termination,
+    limits,
+    parse_prices,
+    turn_meter,
+)
+from orchestration.streaming import StreamRenderer, open_sink
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file (once per process)
+load_env()
 project_endpoint = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
 model_deployment = os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME")
+# Optional file that lets later runs reuse still-valid access tokens
+token_cache = os.getenv("AZURE_TOKEN_CACHE")
 
-async def main():
+task = (
+    "I am preparing a report on the energy efficiency of different machine learning model architectures. "
+    "Compare the estimated training and inference energy consumption of ResNet-50, BERT-base, and GPT-2 "
+    "on standard datasets (for example, ImageNet for ResNet, GLUE for BERT, WebText for GPT-2). "
+    "Then, estimate the CO2 emissions associated with each, assuming training on an Azure Standard_NC6s_v3 "
+    "VM for 24 hours. Provide tables for clarity, and recommend the most energy-efficient model "
+    "per task type (image classification, text classification, and text generation)."
+)
 
-    # 1) Create three domain agents using AzureChatClient
-    async with (
-        AzureCliCredential() as credential,
-        AzureAIProjectAgentProvider(credential=credential) as client,
-    ):
 
+def create_context(specs: list[str] | None) -> ContextPolicies:
+    """Context policies by agent name; summaries are rate limited like the agents' own calls."""
+    return ContextPolicies.parse(specs or (), Summarizer(scheduler=shared_scheduler(), priority=NORMAL))
 
-        researcher_agent  = await client.create_agent(
+
+async def create_agents(client, context: ContextPolicies | None = None):
+    """Create the researcher and coder participants and the Magentic manager agent."""
+    context = context or create_context(None)
+    # Unchanged definitions are reused from the local registry; new ones are created in parallel
+    # Every model call goes through the process-wide rate limiter
+    # Context policies trim what each agent's model calls see; the turn meter feeds run limits
+    registry = AgentRegistry(client, middleware=lambda spec: [
+        *tracing.middleware(), turn_meter(), *context.middleware(spec.name), shared_scheduler().middleware(NORMAL),
+    ])
+    researcher_agent, coder_agent, manager_agent = await registry.ensure([
+        AgentSpec(
             instructions=(
                 "You are a Researcher. You find information without additional computation or quantitative analysis."
             ),
             name="ResearcherAgent",
             description= "Specialist in research and information gathering"
-        )
+        ),
 
-        coder_agent = await client.create_agent(
+        AgentSpec(
             instructions=(
                 "You solve questions using code. Please provide detailed analysis and computation process."
             ),
             name="CoderAgent",
             description= "A helpful assistant that writes and executes code to process and analyze data.",
             tools=HostedCodeInterpreterTool()
-        )
+        ),
 
-        manager_agent   = await client.create_agent(
+        AgentSpec(
             instructions="You coordinate a team to complete complex tasks efficiently.",
             name="MagenticManager",
             description="Orchestrator that coordinates the research and coding workflow"
-        )
+        ),
+    ])
+    return [researcher_agent, coder_agent, manager_agent]
+
+
+# Round, stall and reset limits of the Magentic manager
+MANAGER_LIMITS = dict(max_round_count=10, max_stall_count=3, max_reset_count=2)
+
+
+def create_manager(manager_agent, plans: PlanCache) -> PlanCachingManager:
+    """Standard Magentic manager that starts from approved plans for similar tasks."""
+    return PlanCachingManager(manager_agent, plans, **MANAGER_LIMITS)
+
+
+def build_workflow(agents, checkpoints: DeltaCheckpointStorage | None = None, manager: PlanCachingManager | None = None,
+                   conditions: list[Condition] | None = None):
+    """Magentic orchestration with plan review, checkpointed after every round if given storage.
+
+    Without a manager, the standard manager is built from the manager agent. ``conditions``
+    (time, token, cost or turn limits) end the run at the manager's next progress check.
+    """
+    researcher_agent, coder_agent, manager_agent = agents
+    termination = Termination(AnyOf(*(conditions or ())))
+    manager = manager or StandardMagenticManager(manager_agent, **MANAGER_LIMITS)
+    builder = MagenticBuilder().participants([researcher_agent, coder_agent])
+    builder = builder.with_standard_manager(termination.manager(manager))
+    builder = builder.with_plan_review()
+    if checkpoints is not None:
+        builder = builder.with_checkpointing(checkpoints)
+    return termination.watch(tracing.trace_workflow(builder.build(), "magentic"))
+
+
+async def resolve_resume(checkpoints: DeltaCheckpointStorage | None, resume: str | None) -> str | None:
+    """Checkpoint id to resume from: an explicit id, or the newest one for 'latest'."""
+    if resume is None:
+        return None
+    if checkpoints is None:
+        raise SystemExit("--resume needs checkpointing; drop --no-checkpoint")
+    checkpoint_id = await checkpoints.latest_checkpoint_id() if resume == "latest" else resume
+    if checkpoint_id is None:
+        raise SystemExit(f"No checkpoints in {checkpoints.path}")
+    return checkpoint_id
+
 
-        workflow = (
-            MagenticBuilder()
-            .participants([researcher_agent, coder_agent])
-            .with_standard_manager (
-                agent=manager_agent,
-                max_round_count=10,
-                max_stall_count=3,
-                max_reset_count=2,
-            )
-            .with_plan_review() 
-            .build()
+async def main(args):
+    # The Azure SDK is the slowest import by far; only live runs pay for it
+    from agent_framework_azure_ai import AzureAIProjectAgentProvider
+
+    checkpoints = None if args.no_checkpoint else DeltaCheckpointStorage(args.checkpoint_db)
+    if args.list_checkpoints:
+        for row in checkpoints.describe() if checkpoints else []:
+            print(f"{row['checkpoint_id']}  step {row['iteration']:>3}  {row['kind']:<5} {row['bytes']:>8} B  {row['timestamp']}")
+        return
+    resume_from = await resolve_resume(checkpoints, args.resume)
+
+    # 1) Create three domain agents using AzureChatClient
+    async with (
+        shared_credential(disk_cache=token_cache) as credential,
+        scheduled_provider(AzureAIProjectAgentProvider, credential) as client,
+    ):
+
+
+        context = create_context(args.context)
+        agents = await create_agents(client, context=context)
+        plans = PlanCache(":memory:" if args.no_plan_cache else args.plan_cache)
+        manager = create_manager(agents[2], plans)
+        conditions = limits(args.max_seconds, args.max_tokens, args.max_cost, args.token_prices, args.max_turns or ())
+        workflow = build_workflow(agents, checkpoints, manager, conditions)
+        policy = PlanReviewPolicy(
+            manager,
+            auto_approve=set(args.auto_approve or ()),
+            timeout=0 if args.unattended else args.review_timeout,
+            default=args.review_default,
         )
+
+        async def ask_reviewer():
+            print("Please provide your feedback (press Enter to approve):")
+            return await prompt_with_timeout("> ", policy.timeout)
         
 
-        task = (
-            "I am preparing a report on the energy efficiency of different machine learning model architectures. "
-            "Compare the estimated training and inference energy consumption of ResNet-50, BERT-base, and GPT-2 "
-            "on standard datasets (for example, ImageNet for ResNet, GLUE for BERT, WebText for GPT-2). "
-            "Then, estimate the CO2 emissions associated with each, assuming training on an Azure Standard_NC6s_v3 "
-            "VM for 24 hours. Provide tables for clarity, and recommend the most energy-efficient model "
-            "per task type (image classification, text classification, and text generation)."
-        )
 
 
         pending_request: RequestInfoEvent | None = None
         pending_responses: dict[str, MagenticPlanReviewResponse] | None = None
         output_event: WorkflowOutputEvent | None = None
 
-        while not output_event:
-            if pending_responses is not None:
-                stream = workflow.send_responses_streaming(pending_responses)
-            else:
-                stream = workflow.run_stream(task)
-
-            last_message_id: str | None = None
-            async for event in stream:
-                if isinstance(event, AgentRunUpdateEvent):
-                    message_id = event.data.message_id
-                    if message_id != last_message_id:
-                        if last_message_id is not None:
-                            print("\n")
-                        print(f"- {event.executor_id}:", end=" ", flush=True)
-                        last_message_id = message_id
-                    print(event.data, end="", flush=True)
-
-                elif isinstance(event, RequestInfoEvent) and event.request_type is MagenticPlanReviewRequest:
-                    pending_request = event
-
-                elif isinstance(event, WorkflowOutputEvent):
-                    output_event = event
-
-            pending_responses = None
-
-            # Handle plan review request if any
-            if pending_request is not None:
-                event_data = cast(MagenticPlanReviewRequest, pending_request.data)
-
-                print("\n\n[Magentic Plan Review Request]")
-                if event_data.current_progress is not None:
-                    print("Current Progress Ledger:")
-                    print(json.dumps(event_data.current_progress.to_dict(), indent=2))
-                    print()
-                print(f"Proposed Plan:\n{event_data.plan.text}\n")
-                print("Please provide your feedback (press Enter to approve):")
-
-                reply = await asyncio.get_event_loop().run_in_executor(None, input, "> ")
-                if reply.strip() == "":
-                    print("Plan approved.\n")
-                    pending_responses = {pending_request.request_id: event_data.approve()}
+        async with open_sink(args.stream_to) as sink:
+            renderer = StreamRenderer(sink)
+            while not output_event:
+                if pending_responses is not None:
+                    stream = workflow.send_responses_streaming(pending_responses)
+                elif resume_from is not None:
+                    # Completed rounds are restored; a pending plan review is asked again
+                    print(f"Resuming from checkpoint {resume_from}", file=sys.stderr)
+                    stream = workflow.run_stream(checkpoint_id=resume_from)
+                    resume_from = None
                 else:
-                    print("Plan revised by human.\n")
-                    pending_responses = {pending_request.request_id: event_data.revise(reply)}
-                pending_request = None
+                    stream = workflow.run_stream(task)
+
+                async for event in stream:
+                    if renderer.handle(event):
+                        continue
+
+                    if isinstance(event, RequestInfoEvent) and event.request_type is MagenticPlanReviewRequest:
+                        pending_request = event
+
+                    elif isinstance(event, WorkflowOutputEvent):
+                        output_event = event
+
+                pending_responses = None
+
+                # Handle plan review request if any
+                if pending_request is not None:
+                    await sink.flush()
+                    event_data = cast(MagenticPlanReviewRequest, pending_request.data)
+
+                    print("\n\n[Magentic Plan Review Request]")
+                    if event_data.current_progress is not None:
+                        print("Current Progress Ledger:")
+                        print(json.dumps(event_data.current_progress.to_dict(), indent=2))
+                        print()
+                    print(f"Proposed Plan ({manager.plan_source}):\n{event_data.plan.text}\n")
+
+                    # Cached or low-risk plans may be approved by policy; otherwise a human is asked
+                    decision = await policy.review(event_data, ask_reviewer)
+                    if decision.abort:
+                        print("No reply in time; stopping without a result.\n")
+                        break
+                    if decision.reason == "human-revise":
+                        print("Plan revised by human.\n")
+                    elif decision.reason == "human":
+                        print("Plan approved.\n")
+                    else:
+                        print(f"Plan approved automatically ({decision.reason}).\n")
+                    pending_responses = {pending_request.request_id: decision.response}
+                    pending_request = None
+            renderer.finish()
+        print(renderer.report(), file=sys.stderr)
+        print(policy.stats.report(), file=sys.stderr)
+        if checkpoints is not None:
+            print(f"checkpoints: {checkpoints.bytes_written} bytes appended to {checkpoints.path}", file=sys.stderr)
+        if context.stats.calls:
+            print(context.report(), file=sys.stderr)
+        tracing.finish()
+
+    if output_event is None:
+        return
 
     # The output of the Magentic workflow is a list of ChatMessages with only one final message
     # generated by the orchestrator.
     output_messages = cast(list[ChatMessage], output_event.data)
+    if isinstance(output_messages, TerminatedConversation):
+        print(output_messages.report(), file=sys.stderr)
     output = output_messages[-1].text
     print(output)
 
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Magentic research and coding team with human plan review.")
+    parser.add_argument("--stream-to", default="-",
+                        help="where live agent output goes: '-' (terminal), a JSONL path, tcp://host:port or unix:///path")
+    parser.add_argument("--checkpoint-db", default=".magentic_checkpoints.sqlite",
+                        help="SQLite file that receives a checkpoint after every round")
+    parser.add_argument("--no-checkpoint", action="store_true", help="do not checkpoint the run")
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="CHECKPOINT_ID",
+                        help="continue from a checkpoint instead of starting the task (default: the latest)")
+    parser.add_argument("--list-checkpoints", action="store_true", help="list the stored checkpoints and exit")
+    parser.add_argument("--plan-cache", default=".magentic_plans.sqlite", help="SQLite file of approved plans")
+    parser.add_argument("--no-plan-cache", action="store_true", help="do not reuse or remember approved plans")
+    parser.add_argument("--auto-approve", action="append", choices=["cached", "low-risk"],
+                        help="approve these plans without asking (repeatable)")
+    parser.add_argument("--review-timeout", type=float, help="seconds to wait for a reviewer before --review-default applies")
+    parser.add_argument("--review-default", choices=["approve", "abort"], default="approve",
+                        help="what an unanswered plan review does")
+    parser.add_argument("--unattended", action="store_true",
+                        help="never ask a human; plans not auto-approved get --review-default")
+    parser.add_argument("--max-seconds", type=float, help="stop the conversation after this many seconds")
+    parser.add_argument("--max-tokens", type=int, help="stop once the agents' model calls have used this many tokens")
+    parser.add_argument("--max-cost", type=float, help="stop once the model calls have cost this many dollars (see --token-prices)")
+    parser.add_argument("--token-prices", type=parse_prices, default=DEFAULT_PRICES, metavar="IN:OUT",
+                        help="dollars per 1K input and output tokens for --max-cost (default: %(default)s)")
+    parser.add_argument("--max-turns", action="append", metavar="AGENT=N",
+                        help="stop after AGENT has taken N turns ('N' alone counts every agent)")
+    parser.add_argument("--context", action="append", metavar="AGENT=POLICY",
+                        help="context policy per agent ('*' for all), e.g. CoderAgent=from:user,ResearcherAgent or '*=window:4000'; see orchestration/context.py")
+    return parser.parse_args(argv)
+
     
     
     
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
\ No newline at end of file
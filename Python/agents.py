@@ -1,93 +1,258 @@
 # Add references
+import argparse
 import asyncio
+import sys
+from enum import Enum
 from typing import cast
 import os
-from dotenv import load_dotenv
-from agent_framework import ChatMessage, Role, SequentialBuilder, WorkflowOutputEvent
-from agent_framework_azure_ai import AzureAIProjectAgentProvider
-from azure.identity.aio import AzureCliCredential
-from agent_framework import AgentExecutor
-
-# Load environment variables from .env file
-load_dotenv()
+from agent_framework import ChatMessage, Role, WorkflowOutputEvent
+from orchestration.batch import JsonlWriter, positive_int, read_jsonl, run_batch
+from orchestration.cache import MemoryCacheBackend, ResponseCache, SqliteCacheBackend
+from orchestration import tracing
+from orchestration.context import ContextPolicies, Summarizer
+from orchestration.labels import LabelOutput
+from orchestration.credentials import shared_credential
+from orchestration.pipeline import PipelineBuilder, PipelineConversation, PipelineStats
+from orchestration.ratelimit import BATCH, NORMAL, scheduled_provider, shared_scheduler
+from orchestration.registry import AgentRegistry, AgentSpec
+from orchestration.singleflight import SingleFlight
+from orchestration.startup import load_env
+from orchestration.streaming import StreamRenderer, open_sink
+
+# Load environment variables from .env file (once per process)
+load_env()
 project_endpoint = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
 model_deployment = os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME")
+# Optional file that lets later runs reuse still-valid access tokens
+token_cache = os.getenv("AZURE_TOKEN_CACHE")
+
+# Agent instructions
+summarizer_instructions="""
+Summarize the customer's feedback in one short sentence. Keep it neutral and concise.
+Example output:
+App crashes during photo upload.
+User praises dark mode feature.
+"""
+
+classifier_instructions="""
+Classify the feedback as one of the following: Positive, Negative, or Feature request.
+Reply with the label only.
+"""
+
+
+# The classifier's answer as a typed value; the values are the labels it is asked for
+class FeedbackKind(str, Enum):
+    POSITIVE = "Positive"
+    NEGATIVE = "Negative"
+    FEATURE_REQUEST = "Feature request"
+
+action_instructions="""
+Based on the summary and classification, suggest the next action in one short sentence.
+Example output:
+Escalate as a high-priority bug for the mobile team.
+Log as positive feedback to share with design and marketing.
+Log as enhancement request for product backlog.
+"""
+
+# Initialize the current feedback
+feedback="""
+I use the dashboard every day to monitor metrics, and it works well overall. 
+But when I'm working late at night, the bright screen is really harsh on my eyes. 
+If you added a dark mode option, it would make the experience much more comfortable.
+"""
+
+
+def create_context(specs: list[str] | None, priority: int = NORMAL) -> ContextPolicies:
+    """Context policies by agent name; summaries are rate limited like the agents' own calls."""
+    return ContextPolicies.parse(specs or (), Summarizer(scheduler=shared_scheduler(), priority=priority))
+
 
-async def main():
-    # Agent instructions
-    summarizer_instructions="""
-    Summarize the customer's feedback in one short sentence. Keep it neutral and concise.
-    Example output:
-    App crashes during photo upload.
-    User praises dark mode feature.
+async def create_agents(client, cache: ResponseCache | None = None, priority: int = NORMAL,
+                        context: ContextPolicies | None = None, flight: SingleFlight | None = None,
+                        labels: LabelOutput | None = None):
+    """Create the summarizer, classifier and action agents once per process.
+
+    With a cache, the summarizer and classifier answer repeated feedback without a model call.
+    With single-flight, identical feedback arriving at the same time shares one call each.
+    With labels, the classifier's call stops as soon as it has named a FeedbackKind.
+    Batch runs pass BATCH so interactive work sharing the process is served first.
     """
+    context = context or create_context(None, priority)
+    # Unchanged definitions are reused from the local registry instead of being re-created
+    # Every model call goes through the process-wide rate limiter at the caller's priority
+    # Context policies trim what each agent's model calls see
+    registry = AgentRegistry(client, middleware=lambda spec: [
+        *tracing.middleware(), *context.middleware(spec.name), shared_scheduler().middleware(priority),
+    ])
+    # The cache answers first; only a miss joins (or starts) the in-flight call
+    shared = [m for m in (cache, flight) if m is not None]
+    summarizer, classifier, action = await registry.ensure([
+        AgentSpec(name="summarizer", instructions=summarizer_instructions, middleware=shared or None),
+        AgentSpec(name="classifier", instructions=classifier_instructions,
+                  middleware=[m for m in (*shared, labels) if m is not None] or None),
+        AgentSpec(name="action", instructions=action_instructions),
+    ])
+
+    return [summarizer, classifier, action]
+
 
-    classifier_instructions="""
-    Classify the feedback as one of the following: Positive, Negative, or Feature request.
+def build_workflow(agents, stats: PipelineStats | None = None):
+    """Build the feedback pipeline over the shared agents.
+
+    The summarizer and classifier both read only the feedback, so they run side by side;
+    the action agent starts once both have answered.
     """
+    summarizer, classifier, action = agents
+    workflow = (
+        PipelineBuilder(stats)
+        .stage(summarizer)
+        .stage(classifier)
+        .stage(action, reads=["summarizer", "classifier"])
+        .build()
+    )
+    return tracing.trace_workflow(workflow, "sequential")
+
 
-    action_instructions="""
-    Based on the summary and classification, suggest the next action in one short sentence.
-    Example output:
-    Escalate as a high-priority bug for the mobile team.
-    Log as positive feedback to share with design and marketing.
-    Log as enhancement request for product backlog.
+async def run_feedback(agents, feedback: str, renderer: StreamRenderer | None = None,
+                       stats: PipelineStats | None = None) -> list[ChatMessage]:
+    """Run one feedback string through the pipeline and return the conversation.
+
+    With a renderer, each agent's reply is shown as it streams in.
     """
+    # A workflow instance cannot run concurrently, so build one per run; the agents are shared
+    workflow = build_workflow(agents, stats)
+
+    # Run and collect outputs
+    outputs: list[list[ChatMessage]] = []
+    async for event in workflow.run_stream(f"Customer feedback: {feedback}"):
+        if renderer is not None and renderer.handle(event):
+            continue
+        if isinstance(event, WorkflowOutputEvent):
+            outputs.append(cast(list[ChatMessage], event.data))
+    return outputs[-1] if outputs else []
+
+
+async def run_batch_mode(agents, args, labels: LabelOutput | None = None) -> None:
+    """Stream feedback records from JSONL and write one result row per record as it finishes.
 
+    With labels, each row also carries the classifier's FeedbackKind as ``kind`` (null if unrecognised).
+    """
+    writer = JsonlWriter(args.output, append=args.append)
+    pipeline = PipelineStats()
+
+    def on_result(record, conversation, error, seconds):
+        row = {"id": record.get("id"), "latency_ms": round(seconds * 1000, 1)}
+        if error is not None:
+            row["error"] = f"{type(error).__name__}: {error}"
+        else:
+            for msg in conversation:
+                if msg.role == Role.ASSISTANT and msg.author_name:
+                    row[msg.author_name] = msg.text
+                if labels is not None and msg.author_name == "classifier":
+                    kind = labels.value(msg)
+                    row["kind"] = kind.value if kind is not None else None
+        writer.write(row)
+
+    try:
+        stats = await run_batch(
+            read_jsonl(args.batch),
+            lambda record: run_feedback(agents, record[args.field], stats=pipeline),
+            on_result,
+            concurrency=args.concurrency,
+        )
+    finally:
+        writer.close()
+
+    print(stats.report("records"), file=sys.stderr)
+    print(pipeline.report(), file=sys.stderr)
+
+
+def create_cache(args) -> ResponseCache | None:
+    if args.cache == "memory":
+        return ResponseCache(MemoryCacheBackend(max_entries=args.cache_size, ttl=args.cache_ttl))
+    if args.cache == "sqlite":
+        return ResponseCache(SqliteCacheBackend(args.cache_path, max_entries=args.cache_size, ttl=args.cache_ttl))
+    return None
+
+
+async def main(args):
+    # The Azure SDK is the slowest import by far; only live runs pay for it
+    from agent_framework_azure_ai import AzureAIProjectAgentProvider
+
+    cache = create_cache(args)
     async with (
-        AzureCliCredential() as credential,
-        AzureAIProjectAgentProvider(credential=credential) as client,
+        shared_credential(disk_cache=token_cache) as credential,
+        scheduled_provider(AzureAIProjectAgentProvider, credential) as client,
     ):
 
         # Create agents
-        summarizer = await client.create_agent(
-            instructions=summarizer_instructions,
-            name="summarizer",
-        )
+        priority = BATCH if args.batch else NORMAL
+        context = create_context(args.context, priority)
+        flight = SingleFlight() if args.single_flight else None
+        labels = LabelOutput(FeedbackKind, max_tokens=args.label_tokens) if args.labels else None
+        agents = await create_agents(client, cache, priority, context, flight, labels)
 
-        #thread = summarizer.get_new_thread()
+        if args.batch:
+            await run_batch_mode(agents, args, labels)
+            if cache is not None:
+                print(cache.report(), file=sys.stderr)
+            if flight is not None:
+                print(flight.report(), file=sys.stderr)
+            if labels is not None:
+                print(labels.report(), file=sys.stderr)
+            print(shared_scheduler().stats.report(), file=sys.stderr)
+            if context.stats.calls:
+                print(context.report(), file=sys.stderr)
+            tracing.finish()
+            return
 
-        classifier = await client.create_agent(
-            instructions=classifier_instructions,
-            name="classifier",
-        )
-
-        action = await client.create_agent(
-            instructions=action_instructions,
-            name="action",
-        )
+        # Build the pipeline and run it, streaming each agent's reply as it arrives
+        async with open_sink(args.stream_to) as sink:
+            renderer = StreamRenderer(sink)
+            conversation = await run_feedback(agents, feedback, renderer)
+            renderer.finish()
+        print(renderer.report(), file=sys.stderr)
+        if isinstance(conversation, PipelineConversation):
+            print(conversation.report(), file=sys.stderr)
 
-        #summarizerExec= AgentExecutor(summarizer,id="summarizerAgent",agent_thread=thread)
-        #classifierExec= AgentExecutor(classifier,id="classifierAgent",agent_thread=thread)
-        #actionExec= AgentExecutor(action,id="actionAgent",agent_thread=thread)
-        
-
-        # Initialize the current feedback
-        feedback="""
-        I use the dashboard every day to monitor metrics, and it works well overall. 
-        But when I'm working late at night, the bright screen is really harsh on my eyes. 
-        If you added a dark mode option, it would make the experience much more comfortable.
-        """
-        
-
-        # Build sequential orchestration
-        workflow = SequentialBuilder().participants([summarizer, classifier, action]).build()
-        
-        
-        # Run and collect outputs
-        outputs: list[list[ChatMessage]] = []
-        async for event in workflow.run_stream(f"Customer feedback: {feedback}"):
-            if isinstance(event, WorkflowOutputEvent):
-                outputs.append(cast(list[ChatMessage], event.data))
-        
-        
         # Display outputs
-        if outputs:
-            for i, msg in enumerate(outputs[-1], start=1):
-                name = msg.author_name or ("assistant" if msg.role == Role.ASSISTANT else "user")
-                print(f"{'-' * 60}\n{i:02d} [{name}]\n{msg.text}")
-    
+        for i, msg in enumerate(conversation, start=1):
+            name = msg.author_name or ("assistant" if msg.role == Role.ASSISTANT else "user")
+            print(f"{'-' * 60}\n{i:02d} [{name}]\n{msg.text}")
+
+        if labels is not None:
+            kind = next((labels.value(msg) for msg in conversation if msg.author_name == "classifier"), None)
+            print(f"classification: {kind.name if kind is not None else 'unrecognised'}", file=sys.stderr)
+        if cache is not None:
+            print(cache.report(), file=sys.stderr)
+        if context.stats.calls:
+            print(context.report(), file=sys.stderr)
+        tracing.finish()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize, classify and act on customer feedback.")
+    parser.add_argument("--batch", metavar="PATH", help="JSONL file of feedback records ('-' for stdin)")
+    parser.add_argument("--field", default="feedback", help="record field holding the feedback text")
+    parser.add_argument("--output", default="-", help="JSONL file for result rows (default: stdout)")
+    parser.add_argument("--append", action="store_true", help="add rows to an existing --output file instead of replacing it")
+    parser.add_argument("--concurrency", type=positive_int, default=8, help="conversations in flight at once")
+    parser.add_argument("--stream-to", default="-",
+                        help="where live agent output goes: '-' (terminal), a JSONL path, tcp://host:port or unix:///path")
+    parser.add_argument("--cache", choices=["off", "memory", "sqlite"], default="off",
+                        help="reuse summarizer/classifier replies for repeated feedback")
+    parser.add_argument("--cache-path", default=".agent_cache.sqlite", help="database file for --cache sqlite")
+    parser.add_argument("--cache-ttl", type=float, help="seconds before a cached reply expires")
+    parser.add_argument("--cache-size", type=int, default=10000, help="maximum cached replies")
+    parser.add_argument("--no-single-flight", dest="single_flight", action="store_false",
+                        help="give every summarizer/classifier request its own model call, even when identical ones are in flight")
+    parser.add_argument("--no-labels", dest="labels", action="store_false",
+                        help="let the classifier answer free-form instead of stopping once it has named a label")
+    parser.add_argument("--label-tokens", type=int, default=16, help="output token cap for the classifier's calls")
+    parser.add_argument("--context", action="append", metavar="AGENT=POLICY",
+                        help="context policy per agent ('*' for all), e.g. action=from:summarizer,classifier or '*=window:4000'; see orchestration/context.py")
+    return parser.parse_args(argv)
     
     
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main(parse_args()))
\ No newline at end of file
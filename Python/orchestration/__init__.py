@@ -0,0 +1,5 @@
+"""Shared helpers for the agent orchestration samples in this folder.
+
+Modules are imported explicitly (for example ``from orchestration.batch import run_batch``)
+so a script only pays for the helpers it actually uses.
+"""
@@ -0,0 +1,217 @@
+"""Single entry point for the orchestration samples.
+
+    python -m orchestration list
+    python -m orchestration run sequential --batch feedback.jsonl
+    python -m orchestration run magentic --resume
+    python -m orchestration run --trace traces.jsonl --trace-format otlp handoff
+    python -m orchestration run --record groupchat.cassette groupchat
+    python -m orchestration run --replay groupchat.cassette --replay-speed 0 groupchat
+    python -m orchestration imports --save imports.json
+    python -m orchestration imports --baseline imports.json --tolerance 0.25   # exit 1 on regression
+
+``run`` imports only the chosen script, loads ``.env`` once, and fetches the access token while
+the Azure SDK imports in a thread, since both take hundreds of milliseconds. Arguments after
+the pattern go to the script. A per-phase startup breakdown (env, import, auth, agent
+provisioning, first workflow event) is printed to stderr when the run ends. ``--record`` saves
+every model and tool call of a live run to a cassette; ``--replay`` runs the script against the
+cassette instead of Azure, without authenticating (see orchestration/cassettes.py).
+
+Nothing heavier than the standard library is imported up front, so ``--help`` and ``list`` stay instant.
+"""
+import argparse
+import asyncio
+import functools
+import importlib
+import json
+import os
+import sys
+from typing import Any
+
+from .scripts import SCRIPTS, SCRIPTS_DIR, load_script
+from .startup import StartupTimer, import_times, load_env
+
+# Started at import so the breakdown includes argument parsing
+_timer = StartupTimer()
+
+# Scope the Azure AI project and agents clients request tokens for
+AZURE_AI_SCOPE = "https://ai.azure.com/.default"
+
+
+class FirstEventProbe:
+    """Wraps a workflow to note when its first event arrives; everything else passes through."""
+
+    def __init__(self, workflow: Any, timer: StartupTimer):
+        self._workflow = workflow
+        self._timer = timer
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._workflow, name)
+
+    def run_stream(self, *args: Any, **kwargs: Any):
+        return self._watch(self._workflow.run_stream(*args, **kwargs))
+
+    def send_responses_streaming(self, *args: Any, **kwargs: Any):
+        return self._watch(self._workflow.send_responses_streaming(*args, **kwargs))
+
+    async def _watch(self, stream):
+        async for event in stream:
+            self._timer.mark_first_event()
+            yield event
+
+
+def instrument(module: Any, timer: StartupTimer) -> None:
+    """Time the script's agent provisioning and its first workflow event."""
+    create_agents, build_workflow = module.create_agents, module.build_workflow
+
+    async def timed_create_agents(*args: Any, **kwargs: Any) -> Any:
+        with timer.phase("agent provisioning"):
+            return await create_agents(*args, **kwargs)
+
+    def probed_build_workflow(*args: Any, **kwargs: Any) -> Any:
+        return FirstEventProbe(build_workflow(*args, **kwargs), timer)
+
+    module.create_agents = timed_create_agents
+    module.build_workflow = probed_build_workflow
+
+
+async def prefetch(timer: StartupTimer, disk_cache: str | None) -> Any:
+    """Fetch the access token and import the Azure SDK at the same time."""
+    from .credentials import shared_credential
+
+    credential = shared_credential(disk_cache=disk_cache)
+
+    async def auth() -> None:
+        with timer.phase("auth"):
+            await credential.get_token_info(AZURE_AI_SCOPE)
+
+    async def import_sdk() -> None:
+        with timer.phase("import azure sdk"):
+            await asyncio.to_thread(importlib.import_module, "agent_framework_azure_ai")
+
+    await asyncio.gather(auth(), import_sdk())
+    return credential
+
+
+def use_cassette(args: argparse.Namespace) -> Any:
+    """Record around the script's Azure providers, or replay in place of them; None for live runs."""
+    if not (args.record or args.replay):
+        return None
+    from .cassettes import Cassette, CassetteWriter, ReplayAgentProvider, patch_azure_providers, recording_provider
+
+    if args.record:
+        writer = CassetteWriter(args.record)
+        patch_azure_providers(lambda provider: recording_provider(provider, writer))
+        return writer
+    cassette = Cassette(args.replay)
+    patch_azure_providers(lambda provider: functools.partial(ReplayAgentProvider, cassette, args.replay_speed))
+    return cassette
+
+
+async def run(args: argparse.Namespace) -> None:
+    with _timer.phase("env"):
+        load_env()
+    if args.trace:
+        # Read by orchestration.tracing when the script first asks for its middleware
+        os.environ["ORCHESTRATION_TRACE"] = args.trace
+        os.environ["ORCHESTRATION_TRACE_FORMAT"] = args.trace_format
+    with _timer.phase(f"import {args.pattern}"):
+        module = load_script(args.pattern)
+    script_args = module.parse_args(args.script_args)
+    instrument(module, _timer)
+    cassette = None
+    try:
+        if args.prefetch and not args.replay:
+            # Held open around the script so its own shared_credential() reuses the warm token
+            async with await prefetch(_timer, os.getenv("AZURE_TOKEN_CACHE")):
+                cassette = use_cassette(args)
+                await module.main(script_args)
+        else:
+            cassette = use_cassette(args)
+            await module.main(script_args)
+    finally:
+        if cassette is not None:
+            cassette.close()
+            print(cassette.report(), file=sys.stderr)
+        print(_timer.report(), file=sys.stderr)
+
+
+def list_patterns() -> None:
+    for pattern, script in SCRIPTS.items():
+        print(f"{pattern:<20} {script}")
+
+
+def compare_imports(results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float) -> list[str]:
+    """Targets whose median import time grew by more than ``tolerance`` over the baseline."""
+    previous = {r["target"]: r for r in baseline}
+    problems = []
+    for result in results:
+        old = previous.get(result["target"])
+        if old and result["median_s"] > old["median_s"] * (1 + tolerance):
+            problems.append(f"{result['target']}: import {old['median_s']} -> {result['median_s']} s")
+    return problems
+
+
+def imports(args: argparse.Namespace) -> int:
+    targets = ["cli", *SCRIPTS] if args.targets == "all" else args.targets.split(",")
+    results = []
+    print(f"{'target':<20}{'median s':>10}{'min s':>8}   heaviest packages")
+    for target in targets:
+        timing = import_times(target, repeat=args.repeat, cwd=SCRIPTS_DIR)
+        heaviest = ", ".join(f"{name} {seconds:.2f}" for name, seconds in timing.heaviest[:3])
+        print(f"{target:<20}{timing.median:>10.3f}{min(timing.seconds):>8.3f}   {heaviest}")
+        results.append({"target": target, "median_s": round(timing.median, 4), "runs_s": [round(s, 4) for s in timing.seconds]})
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare_imports(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m orchestration", description="Run and measure the orchestration samples.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="list the orchestration patterns")
+
+    run_parser = commands.add_parser("run", help="run one pattern's script and report its startup phases")
+    run_parser.add_argument("pattern", choices=list(SCRIPTS), help="pattern to run")
+    run_parser.add_argument("--no-prefetch", dest="prefetch", action="store_false",
+                            help="let the script authenticate on its own instead of fetching the token up front")
+    run_parser.add_argument("--trace", metavar="PATH", help="write agent, model-call and tool spans to PATH")
+    run_parser.add_argument("--trace-format", choices=["jsonl", "otlp"], default="jsonl", help="span file format")
+    cassette = run_parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="PATH", help="save every model and tool call of the run to a cassette")
+    cassette.add_argument("--replay", metavar="PATH", help="answer model and tool calls from a recorded cassette instead of Azure")
+    run_parser.add_argument("--replay-speed", type=float, default=1.0,
+                            help="scale the recorded timing when replaying (0 for no latency)")
+    run_parser.add_argument("script_args", nargs=argparse.REMAINDER, help="arguments passed through to the script")
+
+    imports_parser = commands.add_parser("imports", help="benchmark import times in fresh interpreters")
+    imports_parser.add_argument("--targets", default="all",
+                                help="comma separated patterns, 'cli', 'agent_framework' or 'azure_ai' (default: cli and every pattern)")
+    imports_parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per target")
+    imports_parser.add_argument("--save", metavar="PATH", help="write the timings as JSON")
+    imports_parser.add_argument("--baseline", metavar="PATH", help="compare against saved timings")
+    imports_parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.command == "list":
+        list_patterns()
+    elif args.command == "run":
+        asyncio.run(run(args))
+    else:
+        return imports(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""First-k and deadline aggregation for concurrent fan-out.
+
+ConcurrentBuilder wires participants through a fan-in edge, and a workflow superstep only ends
+when every executor in it has finished, so the aggregated output always waits for the slowest
+agent. build_policy_workflow instead runs all participants inside one executor and yields the
+output as soon as the AggregationPolicy is satisfied:
+
+    policy = AggregationPolicy(first_k=2, deadline=8.0, late="attach")
+    workflow = build_policy_workflow([researcher, marketer, legal], policy)
+
+The output is an AggregatedConversation: the same ``[prompt, reply, reply, ...]`` list the
+default aggregator produces, plus per-participant timings and the names that missed the cut.
+Late replies are either cancelled or, with late="attach", emitted afterwards as
+LateResponseEvent; the output event itself is streamed as soon as the policy is met.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Literal, Sequence
+
+from agent_framework import (
+    AgentProtocol,
+    AgentRunUpdateEvent,
+    AgentResponse,
+    ChatMessage,
+    Executor,
+    Role,
+    Workflow,
+    WorkflowBuilder,
+    WorkflowContext,
+    WorkflowEvent,
+    handler,
+)
+from typing_extensions import Never
+
+from .executors import InputDispatcher
+
+
+@dataclass
+class AggregationPolicy:
+    """When to stop waiting for fan-out participants.
+
+    Attributes:
+        first_k: Return after this many successful replies (None waits for everyone).
+        deadline: Return after this many seconds with whatever has finished (None for no deadline).
+        late: "cancel" stops participants that missed the cut; "attach" lets them finish and emits
+            a LateResponseEvent for each one after the output.
+    """
+
+    first_k: int | None = None
+    deadline: float | None = None
+    late: Literal["cancel", "attach"] = "cancel"
+
+    def describe(self) -> str:
+        parts = []
+        if self.first_k is not None:
+            parts.append(f"first {self.first_k}")
+        if self.deadline is not None:
+            parts.append(f"deadline {self.deadline:g}s")
+        return (", ".join(parts) or "all") + f", late={self.late}"
+
+
+class AggregatedConversation(list):
+    """list[ChatMessage] output that also records which participants made the cut.
+
+    Attributes:
+        timings: Seconds each included participant took, in completion order.
+        missed: Participants still running when the policy was satisfied.
+        failed: Participants that raised, mapped to the error text.
+        policy: Human readable description of the policy that produced this output.
+    """
+
+    def __init__(self, messages: Sequence[ChatMessage], timings: dict[str, float], missed: list[str], failed: dict[str, str], policy: str):
+        super().__init__(messages)
+        self.timings = timings
+        self.missed = missed
+        self.failed = failed
+        self.policy = policy
+
+    @property
+    def included(self) -> list[str]:
+        return list(self.timings)
+
+
+class LateResponseEvent(WorkflowEvent):
+    """A participant reply that arrived after the aggregated output was yielded."""
+
+    def __init__(self, participant: str, seconds: float, message: ChatMessage | None, error: str | None = None):
+        super().__init__(message)
+        self.participant = participant
+        self.seconds = seconds
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(participant={self.participant}, seconds={self.seconds:.3f}, error={self.error})"
+
+
+class PolicyFanOutExecutor(Executor):
+    """Runs every participant concurrently and yields once the AggregationPolicy is met."""
+
+    def __init__(self, agents: Sequence[AgentProtocol], policy: AggregationPolicy, id: str = "policy_fan_out"):
+        super().__init__(id=id)
+        self._agents = list(agents)
+        self._policy = policy
+
+    @handler
+    async def fan_out(self, conversation: list[ChatMessage], ctx: WorkflowContext[Never, list[ChatMessage]]) -> None:
+        await self._fan_out(list(conversation), ctx)
+
+    async def _call(self, agent: AgentProtocol, conversation: list[ChatMessage], ctx: WorkflowContext[Any, Any]) -> AgentResponse:
+        if not ctx.is_streaming():
+            return await agent.run(conversation)
+        updates = []
+        async for update in agent.run_stream(conversation):
+            updates.append(update)
+            await ctx.add_event(AgentRunUpdateEvent(agent.name or agent.id, update))
+        return AgentResponse.from_agent_run_response_updates(updates)
+
+    async def _fan_out(self, conversation: list[ChatMessage], ctx: WorkflowContext[Never, list[ChatMessage]]) -> None:
+        policy = self._policy
+        start = time.perf_counter()
+        names = {}
+        for agent in self._agents:
+            task = asyncio.create_task(self._call(agent, conversation, ctx))
+            names[task] = agent.name or agent.id
+
+        replies: list[ChatMessage] = []
+        timings: dict[str, float] = {}
+        failed: dict[str, str] = {}
+        pending = set(names)
+        needed = min(policy.first_k or len(names), len(names))
+        deadline = start + policy.deadline if policy.deadline is not None else None
+
+        while pending and len(timings) < needed:
+            timeout = None if deadline is None else deadline - time.perf_counter()
+            if timeout is not None and timeout <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = names[task]
+                if task.exception() is not None:
+                    failed[name] = f"{type(task.exception()).__name__}: {task.exception()}"
+                    continue
+                timings[name] = time.perf_counter() - start
+                reply = next((m for m in reversed(task.result().messages) if m.role == Role.ASSISTANT), None)
+                if reply is not None:
+                    replies.append(reply)
+
+        missed = [names[task] for task in pending]
+        prompt = next((m for m in conversation if m.role == Role.USER), None)
+        output = AggregatedConversation(([prompt] if prompt else []) + replies, timings, missed, failed, policy.describe())
+        await ctx.yield_output(output)
+
+        if not pending:
+            return
+        if policy.late == "cancel":
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            return
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                seconds = time.perf_counter() - start
+                if task.exception() is not None:
+                    error = f"{type(task.exception()).__name__}: {task.exception()}"
+                    await ctx.add_event(LateResponseEvent(names[task], seconds, None, error))
+                    continue
+                reply = next((m for m in reversed(task.result().messages) if m.role == Role.ASSISTANT), None)
+                await ctx.add_event(LateResponseEvent(names[task], seconds, reply))
+
+
+def build_policy_workflow(agents: Sequence[AgentProtocol], policy: AggregationPolicy) -> Workflow:
+    """Concurrent fan-out that returns per the policy instead of waiting for the slowest agent."""
+    dispatcher = InputDispatcher(id="policy_dispatcher")
+    fan_out = PolicyFanOutExecutor(agents, policy)
+    return WorkflowBuilder().set_start_executor(dispatcher).add_edge(dispatcher, fan_out).build()
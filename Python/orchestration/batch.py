@@ -0,0 +1,127 @@
+"""Stream records through a workflow with a bounded number of runs in flight."""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, TextIO
+
+from .metrics import LatencyStats
+
+# Lines read per hop to the reader thread; keeps stdin/file IO off the event loop
+# without paying a thread switch per record.
+READ_CHUNK_BYTES = 1 << 16
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1, such as --concurrency."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+async def read_jsonl(source: str) -> AsyncIterator[dict[str, Any]]:
+    """Yield JSON objects from a JSONL file, or from stdin when source is "-".
+
+    Lines that are not valid JSON, or hold a JSON value other than an object, are skipped.
+    """
+    stream: TextIO = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        line_no = 0
+        while True:
+            lines = await asyncio.to_thread(stream.readlines, READ_CHUNK_BYTES)
+            if not lines:
+                break
+            for line in lines:
+                line_no += 1
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    print(f"Skipping line {line_no}: {exc}", file=sys.stderr)
+                    continue
+                if not isinstance(record, dict):
+                    print(f"Skipping line {line_no}: expected a JSON object, got {type(record).__name__}", file=sys.stderr)
+                    continue
+                yield record
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+class JsonlWriter:
+    """Writes one JSON row per call to a file, or to stdout when target is "-".
+
+    Each row is flushed as it is written, so readers of a pipe and the file left by a crashed
+    run see every finished row. An existing file is replaced unless ``append`` is set.
+    """
+
+    def __init__(self, target: str = "-", append: bool = False):
+        self._stream: TextIO = sys.stdout if target == "-" else open(target, "a" if append else "w", encoding="utf-8")
+
+    def write(self, row: dict[str, Any]) -> None:
+        self._stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._stream.flush()
+
+    def close(self) -> None:
+        self._stream.flush()
+        if self._stream is not sys.stdout:
+            self._stream.close()
+
+
+async def run_batch(
+    records: AsyncIterator[Any],
+    handler: Callable[[Any], Awaitable[Any]],
+    on_result: Callable[[Any, Any, BaseException | None, float], None],
+    concurrency: int = 8,
+) -> LatencyStats:
+    """Run handler(record) for every record with at most `concurrency` runs in flight.
+
+    on_result(record, result, error, seconds) is called as soon as each run finishes,
+    so results are emitted in completion order rather than input order. Errors from handler
+    are passed to on_result; an error raised by on_result itself (a failing writer) cancels
+    the runs still in flight and is raised from run_batch.
+    """
+    assert concurrency >= 1, "concurrency must be at least 1"
+    stats = LatencyStats()
+
+    async def run_one(record: Any) -> None:
+        start = time.perf_counter()
+        result, error = None, None
+        try:
+            result = await handler(record)
+        except Exception as exc:
+            error = exc
+        elapsed = time.perf_counter() - start
+        stats.record(elapsed, ok=error is None)
+        on_result(record, result, error, elapsed)
+
+    def check(done: set[asyncio.Task[None]]) -> None:
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+
+    in_flight: set[asyncio.Task[None]] = set()
+    try:
+        async for record in records:
+            if len(in_flight) >= concurrency:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                check(done)
+            in_flight.add(asyncio.create_task(run_one(record)))
+        while in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_EXCEPTION)
+            check(done)
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+    stats.stop()
+    return stats
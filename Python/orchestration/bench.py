@@ -0,0 +1,251 @@
+"""Offline benchmark for the six orchestration scripts.
+
+Runs each script's own workflow against OfflineAgentProvider at increasing concurrency and
+reports throughput, latency percentiles, orchestration overhead per model turn and peak memory.
+
+    python -m orchestration.bench
+    python -m orchestration.bench --patterns concurrent,handoff --levels 1,8,32 --latency lognormal:0.2:0.5
+    python -m orchestration.bench --save bench.json
+    python -m orchestration.bench --baseline bench.json --tolerance 0.2   # exit 1 on regression
+    python -m orchestration.bench --patterns groupchat,magentic --replay cassettes/{pattern}.cassette
+
+Overhead per turn is measured in a separate zero-latency pass, where all wall-clock time is
+framework work (executors, edges, event plumbing), divided by the number of model calls.
+With ``--replay`` the agents answer from cassettes recorded by ``python -m orchestration run
+--record`` instead of OfflineAgentProvider, with the recorded timing in the timed pass, so
+real conversations can be compared across framework versions.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any
+
+from agent_framework import (
+    HandoffAgentUserRequest,
+    MagenticPlanReviewRequest,
+    RequestInfoEvent,
+)
+
+from . import tracing
+from .cassettes import Cassette, ReplayAgentProvider
+from .dispatch import EventDispatcher
+from .metrics import LatencyStats, percentile
+from .offline import LatencyModel, OfflineAgentProvider, OfflineProfile, SimulationMeter, current_meter
+from .ratelimit import shared_scheduler
+from .scripts import SCRIPTS, load_script, sample_input
+
+# Scripted customer replies for the human-in-the-loop Handoff patterns
+USER_REPLIES = ["My order number is 12345.", "I'd like to return it, please."]
+
+
+@dataclass
+class RunResult:
+    seconds: float
+    model_calls: int
+    model_seconds: float
+    completed: bool
+
+
+async def run_once(module: Any, agents: Any, prompt: str, user_turns: int = len(USER_REPLIES)) -> RunResult:
+    """Drive one workflow run to completion, answering every request without a human."""
+    meter = SimulationMeter()
+    token = current_meter.set(meter)
+    start = time.perf_counter()
+    completed = False
+    try:
+        replies = 0
+
+        def respond(pending: list[RequestInfoEvent]) -> dict[str, Any]:
+            nonlocal replies
+            responses: dict[str, Any] = {}
+            for event in pending:
+                if isinstance(event.data, HandoffAgentUserRequest):
+                    if replies < user_turns:
+                        responses[event.request_id] = HandoffAgentUserRequest.create_response(USER_REPLIES[replies % len(USER_REPLIES)])
+                        replies += 1
+                    else:
+                        responses[event.request_id] = HandoffAgentUserRequest.terminate()
+                elif isinstance(event.data, MagenticPlanReviewRequest):
+                    responses[event.request_id] = event.data.approve()
+            return responses
+
+        output = await EventDispatcher().converse(module.build_workflow(agents), prompt, respond)
+        completed = output is not None
+    finally:
+        current_meter.reset(token)
+    return RunResult(time.perf_counter() - start, meter.calls, meter.model_seconds, completed)
+
+
+async def run_level(module: Any, agents: Any, prompt: str, concurrency: int, runs: int) -> tuple[LatencyStats, list[RunResult]]:
+    stats = LatencyStats()
+    results: list[RunResult] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            try:
+                result = await run_once(module, agents, prompt)
+            except Exception as exc:
+                print(f"  run failed: {type(exc).__name__}: {exc}", file=sys.stderr)
+                stats.failures += 1
+                return
+            results.append(result)
+            stats.record(result.seconds, ok=result.completed)
+
+    await asyncio.gather(*(one() for _ in range(runs)))
+    stats.stop()
+    return stats, results
+
+
+async def bench_pattern(pattern: str, profile: OfflineProfile, levels: list[int], runs_per_slot: int, min_runs: int,
+                        trace_memory: bool, cassette: Cassette | None = None) -> dict[str, Any]:
+    module = load_script(pattern)
+    prompt = sample_input(pattern, module)
+
+    def provider(zero_latency: bool) -> Any:
+        if cassette is not None:
+            return ReplayAgentProvider(cassette, speed=0.0 if zero_latency else 1.0)
+        if zero_latency:
+            return OfflineAgentProvider(OfflineProfile(latency=LatencyModel.fixed(0.0), tokens_per_second=0, seed=profile.seed))
+        return OfflineAgentProvider(profile)
+
+    # Zero-latency pass: everything left is orchestration overhead
+    async with provider(zero_latency=True) as client:
+        agents = await module.create_agents(client)
+        _, warm = await run_level(module, agents, prompt, 1, min_runs)
+    calls = sum(r.model_calls for r in warm)
+    overhead_ms = sum(r.seconds for r in warm) / calls * 1000 if calls else 0.0
+
+    report: dict[str, Any] = {"pattern": pattern, "overhead_ms_per_turn": round(overhead_ms, 3), "levels": []}
+    async with provider(zero_latency=False) as client:
+        agents = await module.create_agents(client)
+        for concurrency in levels:
+            if trace_memory:
+                tracemalloc.reset_peak()
+            stats, results = await run_level(module, agents, prompt, concurrency, max(min_runs, concurrency * runs_per_slot))
+            peak_mb = (
+                tracemalloc.get_traced_memory()[1] / 2**20
+                if trace_memory
+                else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            )
+            summary = stats.summary()
+            report["levels"].append({
+                "concurrency": concurrency,
+                "runs": summary["count"],
+                "failures": summary["failures"],
+                "runs_per_s": round(summary["count"] / stats.elapsed, 2) if stats.elapsed else 0.0,
+                "p50_ms": summary["p50_ms"],
+                "p95_ms": round(percentile(stats.samples, 95) * 1000, 1),
+                "p99_ms": summary["p99_ms"],
+                "turns_per_run": round(sum(r.model_calls for r in results) / len(results), 1) if results else 0,
+                "peak_mb": round(peak_mb, 1),
+            })
+    return report
+
+
+def print_report(reports: list[dict[str, Any]]) -> None:
+    header = f"{'pattern':<20}{'conc':>6}{'runs':>6}{'fail':>6}{'runs/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'turns':>7}{'ovh ms/turn':>13}{'peak MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for report in reports:
+        for level in report["levels"]:
+            print(
+                f"{report['pattern']:<20}{level['concurrency']:>6}{level['runs']:>6}{level['failures']:>6}"
+                f"{level['runs_per_s']:>9}{level['p50_ms']:>9}{level['p95_ms']:>9}{level['p99_ms']:>9}"
+                f"{level['turns_per_run']:>7}{report['overhead_ms_per_turn']:>13}{level['peak_mb']:>9}"
+            )
+
+
+def compare(reports: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float) -> list[str]:
+    """Regressions versus a saved baseline: lower throughput or higher per-turn overhead."""
+    previous = {r["pattern"]: r for r in baseline}
+    problems = []
+    for report in reports:
+        old = previous.get(report["pattern"])
+        if old is None:
+            continue
+        if old["overhead_ms_per_turn"] and report["overhead_ms_per_turn"] > old["overhead_ms_per_turn"] * (1 + tolerance):
+            problems.append(f"{report['pattern']}: overhead {old['overhead_ms_per_turn']} -> {report['overhead_ms_per_turn']} ms/turn")
+        old_levels = {lvl["concurrency"]: lvl for lvl in old["levels"]}
+        for level in report["levels"]:
+            old_level = old_levels.get(level["concurrency"])
+            if old_level and level["runs_per_s"] < old_level["runs_per_s"] * (1 - tolerance):
+                problems.append(
+                    f"{report['pattern']} @ {level['concurrency']}: {old_level['runs_per_s']} -> {level['runs_per_s']} runs/s"
+                )
+    return problems
+
+
+async def main(args: argparse.Namespace) -> int:
+    profile = OfflineProfile(
+        latency=LatencyModel.parse(args.latency),
+        tokens_per_second=args.tokens_per_second,
+        chunk_tokens=args.chunk_tokens,
+        reply_tokens=args.reply_tokens,
+        error_rate=args.error_rate,
+        quota_rpm=args.quota_rpm,
+        seed=args.seed,
+    )
+    patterns = list(SCRIPTS) if args.patterns == "all" else args.patterns.split(",")
+    levels = [int(level) for level in args.levels.split(",")]
+
+    if args.trace_memory:
+        tracemalloc.start()
+    reports = []
+    for pattern in patterns:
+        print(f"Benchmarking {pattern}...", file=sys.stderr)
+        # Every run of the benchmark replays the same recorded session
+        cassette = Cassette(args.replay.format(pattern=pattern), reuse=True) if args.replay else None
+        try:
+            reports.append(await bench_pattern(pattern, profile, levels, args.runs_per_slot, args.min_runs, args.trace_memory, cassette))
+        finally:
+            if cassette is not None:
+                print(f"{pattern} {cassette.report()}", file=sys.stderr)
+                cassette.close()
+    print_report(reports)
+    print(shared_scheduler().stats.report(), file=sys.stderr)
+    tracing.finish()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(reports, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the orchestration scripts against offline agents.")
+    parser.add_argument("--patterns", default="all", help=f"comma separated subset of: {', '.join(SCRIPTS)}")
+    parser.add_argument("--levels", default="1,4,16", help="comma separated concurrency levels")
+    parser.add_argument("--runs-per-slot", type=int, default=2, help="runs per level = concurrency x this")
+    parser.add_argument("--min-runs", type=int, default=8, help="minimum runs per level")
+    parser.add_argument("--latency", default="lognormal:0.05:0.5", help="time-to-first-token model, see LatencyModel.parse")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--chunk-tokens", type=int, default=4)
+    parser.add_argument("--reply-tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--quota-rpm", type=float, default=0.0,
+                        help="simulated deployment quota; calls beyond it get a 429 with Retry-After")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--replay", metavar="PATH",
+                        help="answer from recorded cassettes instead of simulated agents; '{pattern}' in PATH is replaced per pattern")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        help="use process max RSS instead of tracemalloc (lower overhead)")
+    parser.add_argument("--save", metavar="PATH", help="write the report as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved report")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,203 @@
+"""Opt-in response cache for agents whose answers depend only on their input.
+
+ResponseCache is agent middleware: attach it to an agent (for example through
+``AgentSpec(middleware=[cache])``) and every workflow builder that runs the agent benefits.
+On a hit the cached response is returned, or replayed as a stream, and the remote call is
+skipped entirely.
+
+    cache = ResponseCache(SqliteCacheBackend(".agent_cache.sqlite", max_entries=5000, ttl=86400))
+    classifier = AgentSpec(name="classifier", instructions=..., middleware=[cache])
+
+Keys are a hash of the agent's instructions plus the normalized input conversation (role and
+text, whitespace collapsed and case folded), so re-submitted or reformatted duplicates hit.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterable, Awaitable, Callable, Sequence
+
+from agent_framework import (
+    AgentMiddleware,
+    AgentResponse,
+    AgentResponseUpdate,
+    AgentRunContext,
+    ChatMessage,
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and case differences that do not change the meaning of the input."""
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def cache_key(instructions: str, messages: Sequence[ChatMessage]) -> str:
+    payload = [normalize_text(instructions)]
+    payload.extend(f"{msg.role.value}:{normalize_text(msg.text or '')}" for msg in messages)
+    return hashlib.sha256("\x1f".join(payload).encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU with optional TTL (seconds)."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self.ttl is not None and time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def close(self) -> None:
+        self._entries.clear()
+
+
+class SqliteCacheBackend:
+    """On-disk LRU with optional TTL (seconds) that survives restarts.
+
+    Lookups are single-row primary key reads on a local file, so they run inline on the
+    event loop rather than paying a thread hop per call.
+    """
+
+    def __init__(self, path: str = ".agent_cache.sqlite", max_entries: int = 10000, ttl: float | None = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+        if ttl is not None:
+            self._db.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - ttl,))
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        row = self._db.execute("SELECT value, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if self.ttl is not None and now - row[1] > self.ttl:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        self._db.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict[str, Any]) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, stored_at, used_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now, now),
+        )
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class ResponseCache(AgentMiddleware):
+    """Agent middleware that answers repeated inputs from a cache backend.
+
+    Attributes:
+        hits: Calls answered from the cache.
+        misses: Calls that went to the model (and were then stored).
+        saved_seconds: Sum of the original latencies of the cached responses that were served.
+    """
+
+    def __init__(self, backend: MemoryCacheBackend | SqliteCacheBackend | None = None, instructions: str | None = None):
+        self.backend = backend or MemoryCacheBackend()
+        self._instructions = instructions
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _key(self, context: AgentRunContext) -> str:
+        instructions = self._instructions
+        if instructions is None:
+            instructions = (getattr(context.agent, "default_options", None) or {}).get("instructions") or ""
+        # The agent name is part of the key so cached replies keep the right author_name
+        return cache_key(f"{context.agent.name}\x1f{instructions}", context.messages)
+
+    async def process(self, context: AgentRunContext, next: Callable[[AgentRunContext], Awaitable[None]]) -> None:
+        key = self._key(context)
+        cached = self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            self.saved_seconds += cached["seconds"]
+            response = AgentResponse.from_dict(cached["response"])
+            context.metadata["cache_hit"] = True
+            context.result = _replay(response) if context.is_streaming else response
+            return
+
+        self.misses += 1
+        start = time.perf_counter()
+        await next(context)
+        if context.is_streaming:
+            context.result = self._store_after_stream(key, context.result, start)
+        elif isinstance(context.result, AgentResponse):
+            self._store(key, context.result, start)
+
+    async def _store_after_stream(self, key: str, stream: AsyncIterable[AgentResponseUpdate] | None, start: float) -> AsyncIterable[AgentResponseUpdate]:
+        if stream is None:
+            return
+        updates = []
+        async for update in stream:
+            updates.append(update)
+            yield update
+        self._store(key, AgentResponse.from_agent_run_response_updates(updates), start)
+
+    def _store(self, key: str, response: AgentResponse, start: float) -> None:
+        if not response.text:
+            return
+        self.backend.set(key, {"seconds": time.perf_counter() - start, "response": response.to_dict()})
+
+    def summary(self) -> dict[str, float]:
+        calls = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / calls, 3) if calls else 0.0,
+            "saved_s": round(self.saved_seconds, 3),
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        return f"cache: {s['hits']} hits / {s['misses']} misses (hit rate {s['hit_rate']:.0%}) | {s['saved_s']}s of model time saved"
+
+
+async def _replay(response: AgentResponse) -> AsyncIterable[AgentResponseUpdate]:
+    """Stream a cached response back as one update per message."""
+    for msg in response.messages:
+        yield AgentResponseUpdate(
+            contents=list(msg.contents),
+            role=msg.role,
+            author_name=msg.author_name,
+            response_id=response.response_id,
+            message_id=msg.message_id,
+        )
@@ -0,0 +1,520 @@
+"""Record live agent traffic to a cassette file and replay it offline.
+
+Recording wraps the Azure providers so every agent they create (or restore from the registry)
+writes each model call and tool call to the cassette as it completes. Replay swaps in
+ReplayAgentProvider, whose agents answer from the cassette instead of the service: the same
+messages, tool calls and tool results, either with the recorded timing (``speed=1``) or none
+(``speed=0``), so the framework's own orchestration cost is all that is left to measure.
+
+    python -m orchestration run --record magentic.cassette magentic
+    python -m orchestration run --replay magentic.cassette --replay-speed 0 magentic
+    python -m orchestration.bench --patterns magentic --replay magentic.cassette
+
+A cassette is a text file with one line per call, ``kind <tab> agent <tab> key <tab> json``,
+appended as calls finish. Replay memory-maps it and indexes only the first three fields, so
+a long session costs a few integers per call in memory; each call's JSON is parsed when it is
+served. Calls are matched by agent and a hash of the request (role, author, text and tool
+calls of every message, call ids left out); a request that was never recorded gets the
+agent's next unused call in recorded order, which keeps runs with different user replies
+going. Failed calls are not recorded, only their successful retries, and the framework's
+handoff tools always run live since the handoff workflow intercepts them itself.
+"""
+import asyncio
+import hashlib
+import json
+import mmap
+import time
+from collections import deque
+from dataclasses import dataclass
+from importlib.metadata import PackageNotFoundError, version
+from typing import Any, AsyncIterable, Awaitable, Callable, MutableSequence, Sequence
+
+from agent_framework import (
+    BaseChatClient,
+    ChatAgent,
+    ChatContext,
+    ChatMessage,
+    ChatMiddleware,
+    ChatResponse,
+    ChatResponseUpdate,
+    FunctionInvocationContext,
+    FunctionMiddleware,
+    UsageContent,
+    use_chat_middleware,
+    use_function_invocation,
+)
+
+from .offline import current_meter
+
+FORMAT_VERSION = 1
+
+# Providers the scripts import from agent_framework_azure_ai
+AZURE_PROVIDERS = ("AzureAIProjectAgentProvider", "AzureAIAgentsProvider")
+
+# Handoff tools are answered by the handoff workflow's own function middleware
+HANDOFF_TOOL_PREFIX = "handoff_to_"
+
+
+class CassetteMiss(Exception):
+    """An agent made more model calls than the cassette recorded for it."""
+
+
+def framework_version() -> str:
+    try:
+        return version("agent-framework-core")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _arguments(arguments: Any) -> str:
+    if hasattr(arguments, "model_dump"):
+        arguments = arguments.model_dump()
+    if isinstance(arguments, str):
+        return arguments
+    return json.dumps(arguments, sort_keys=True, default=str)
+
+
+def request_key(messages: Sequence[ChatMessage], options: dict[str, Any] | None = None) -> str:
+    """Hash of what the model is asked; call ids are left out since they differ between runs."""
+    digest = hashlib.sha256()
+    response_format = (options or {}).get("response_format")
+    digest.update(getattr(response_format, "__name__", str(response_format or "")).encode("utf-8"))
+    for message in messages:
+        parts = [message.role.value, message.author_name or "", message.text or ""]
+        for content in message.contents:
+            if content.type == "function_call":
+                parts.append(f"call:{content.name}:{_arguments(content.arguments)}")
+            elif content.type == "function_result":
+                parts.append(f"result:{content.result}")
+        digest.update(("\x1f" + "\x1e".join(parts)).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def tool_key(context: FunctionInvocationContext) -> str:
+    payload = f"{context.function.name}\x1f{_arguments(context.arguments)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _jsonable(value: Any) -> Any:
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return str(value)
+
+
+@dataclass
+class CassetteStats:
+    recorded_calls: int = 0
+    recorded_tools: int = 0
+    bytes: int = 0
+    replayed: int = 0
+    exact: int = 0
+    tools_replayed: int = 0
+    tools_live: int = 0
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "recorded_calls": self.recorded_calls,
+            "recorded_tools": self.recorded_tools,
+            "kb": round(self.bytes / 1024, 1),
+            "replayed": self.replayed,
+            "exact": self.exact,
+            "in_order": self.replayed - self.exact,
+            "tools_replayed": self.tools_replayed,
+            "tools_live": self.tools_live,
+        }
+
+
+# region Recording
+
+
+class CassetteWriter:
+    """Appends calls to a cassette as they finish; one writer can serve every agent of a run."""
+
+    def __init__(self, path: str, flush_every: int = 64):
+        self.path = path
+        self.stats = CassetteStats()
+        self._flush_every = flush_every
+        self._pending = 0
+        self._file = open(path, "w", encoding="utf-8")
+        self._middleware: dict[str, list[Any]] = {}
+        self._write("H", "", "", {"version": FORMAT_VERSION, "framework": framework_version(), "created": time.time()})
+
+    def _write(self, kind: str, agent: str, key: str, payload: dict[str, Any]) -> None:
+        # json.dumps escapes tabs and newlines, so a record is always one line
+        line = f"{kind}\t{agent}\t{key}\t{json.dumps(payload, ensure_ascii=False, separators=(',', ':'))}\n"
+        self._file.write(line)
+        self.stats.bytes += len(line.encode("utf-8"))
+        self._pending += 1
+        if self._pending >= self._flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    def write_call(self, agent: str, key: str, payload: dict[str, Any]) -> None:
+        self._write("C", agent, key, payload)
+        self.stats.recorded_calls += 1
+
+    def write_tool(self, agent: str, key: str, payload: dict[str, Any]) -> None:
+        self._write("T", agent, key, payload)
+        self.stats.recorded_tools += 1
+
+    def middleware(self, agent: str) -> list[Any]:
+        """Chat and function middleware recording ``agent``; place it innermost."""
+        if agent not in self._middleware:
+            self._middleware[agent] = [_CallRecorder(self, agent), _ToolRecorder(self, agent)]
+        return self._middleware[agent]
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def report(self) -> str:
+        s = self.stats.summary()
+        return f"cassette: recorded {s['recorded_calls']} model calls and {s['recorded_tools']} tool calls ({s['kb']} KB) to {self.path}"
+
+
+class _CallRecorder(ChatMiddleware):
+    def __init__(self, writer: CassetteWriter, agent: str):
+        self.writer = writer
+        self.agent = agent
+
+    async def process(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> None:
+        key = request_key(context.messages, context.options)
+        start = time.perf_counter()
+        await next(context)
+        if context.is_streaming:
+            context.result = self._tee(context, key, start, context.result)
+            return
+        elapsed = round((time.perf_counter() - start) * 1000, 1)
+        self.writer.write_call(self.agent, key, {"ms": elapsed, "r": context.result.to_dict()})
+
+    async def _tee(self, context: ChatContext, key: str, start: float,
+                   stream: AsyncIterable[ChatResponseUpdate] | None) -> AsyncIterable[ChatResponseUpdate]:
+        updates: list[list[Any]] = []
+        try:
+            async for update in stream or ():
+                updates.append([round((time.perf_counter() - start) * 1000, 1), update.to_dict()])
+                yield update
+        except GeneratorExit:
+            # LabelOutput closes the stream once it has read the label; replay needs that much
+            if context.metadata.get("stopped_early"):
+                self.writer.write_call(self.agent, key, {"ms": round((time.perf_counter() - start) * 1000, 1), "u": updates})
+            raise
+        # Only complete streams are recorded; a cancelled one is retried or abandoned
+        elapsed = round((time.perf_counter() - start) * 1000, 1)
+        self.writer.write_call(self.agent, key, {"ms": elapsed, "u": updates})
+
+
+class _ToolRecorder(FunctionMiddleware):
+    def __init__(self, writer: CassetteWriter, agent: str):
+        self.writer = writer
+        self.agent = agent
+
+    async def process(self, context: FunctionInvocationContext, next: Callable[[FunctionInvocationContext], Awaitable[None]]) -> None:
+        if context.function.name.startswith(HANDOFF_TOOL_PREFIX):
+            await next(context)
+            return
+        start = time.perf_counter()
+        await next(context)
+        elapsed = round((time.perf_counter() - start) * 1000, 1)
+        self.writer.write_tool(self.agent, tool_key(context), {"name": context.function.name, "ms": elapsed, "r": _jsonable(context.result)})
+
+
+def recording_provider(provider: type, writer: CassetteWriter) -> type:
+    """Subclass of an agent provider whose agents record into ``writer``."""
+
+    class Recording(provider):  # type: ignore[misc, valid-type]
+        async def create_agent(self, *args: Any, **kwargs: Any) -> Any:
+            name = kwargs.get("name") or args[0]
+            kwargs["middleware"] = [*(kwargs.get("middleware") or ()), *writer.middleware(name)]
+            return await super().create_agent(*args, **kwargs)
+
+        def as_agent(self, details: Any, *args: Any, **kwargs: Any) -> Any:
+            kwargs["middleware"] = [*(kwargs.get("middleware") or ()), *writer.middleware(details.name)]
+            return super().as_agent(details, *args, **kwargs)
+
+    # AgentRegistry decides whether stored agents can be restored from the provider's class name
+    Recording.__name__ = Recording.__qualname__ = provider.__name__
+    return Recording
+
+
+# endregion
+
+# region Replay
+
+
+class _Index:
+    """Positions of one kind of record, by (agent, key) and by agent in recorded order."""
+
+    def __init__(self, reuse: bool):
+        self.reuse = reuse
+        self.spans: list[tuple[int, int]] = []
+        self.exact: dict[tuple[str, str], deque[int]] = {}
+        self.ordered: dict[str, list[int]] = {}
+        self._next: dict[str, int] = {}
+        self._used: set[int] = set()
+
+    def add(self, agent: str, key: str, span: tuple[int, int]) -> None:
+        entry = len(self.spans)
+        self.spans.append(span)
+        self.exact.setdefault((agent, key), deque()).append(entry)
+        self.ordered.setdefault(agent, []).append(entry)
+
+    def take(self, agent: str, key: str, in_order: bool = True) -> tuple[tuple[int, int], bool] | None:
+        """The span of the record to serve and whether its key matched exactly."""
+        exact = self.exact.get((agent, key))
+        while exact:
+            if self.reuse:
+                exact.rotate(-1)
+                return self.spans[exact[-1]], True
+            entry = exact.popleft()
+            if entry not in self._used:
+                self._used.add(entry)
+                return self.spans[entry], True
+        if not in_order:
+            return None
+
+        ordered = self.ordered.get(agent, [])
+        position = self._next.get(agent, 0)
+        if self.reuse:
+            if not ordered:
+                return None
+            self._next[agent] = position + 1
+            return self.spans[ordered[position % len(ordered)]], False
+        while position < len(ordered) and ordered[position] in self._used:
+            position += 1
+        self._next[agent] = position + 1
+        if position == len(ordered):
+            return None
+        self._used.add(ordered[position])
+        return self.spans[ordered[position]], False
+
+
+class Cassette:
+    """Memory-mapped cassette for replay.
+
+    With ``reuse`` recorded calls are served again once used, so one recorded session can
+    drive many concurrent benchmark runs.
+    """
+
+    def __init__(self, path: str, reuse: bool = False):
+        self.path = path
+        self.header: dict[str, Any] = {}
+        self.stats = CassetteStats()
+        self._calls = _Index(reuse)
+        self._tools = _Index(reuse)
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"cassette {path} is empty") from None
+        self._scan()
+
+    def _scan(self) -> None:
+        data, position, size = self._map, 0, len(self._map)
+        names: dict[bytes, str] = {}
+        while position < size:
+            end = data.find(b"\n", position)
+            if end < 0:
+                break  # a recording that was cut off mid-line
+            first = data.find(b"\t", position, end)
+            second = data.find(b"\t", first + 1, end)
+            third = data.find(b"\t", second + 1, end)
+            if third > 0:
+                kind = data[position:first]
+                raw_agent = data[first + 1:second]
+                agent = names.get(raw_agent) or names.setdefault(raw_agent, raw_agent.decode("utf-8"))
+                key = data[second + 1:third].decode("ascii")
+                if kind == b"C":
+                    self._calls.add(agent, key, (third + 1, end))
+                elif kind == b"T":
+                    self._tools.add(agent, key, (third + 1, end))
+                elif kind == b"H":
+                    self.header = json.loads(data[third + 1:end])
+            position = end + 1
+
+    def _load(self, span: tuple[int, int]) -> dict[str, Any]:
+        return json.loads(self._map[span[0]:span[1]])
+
+    @property
+    def calls(self) -> int:
+        return len(self._calls.spans)
+
+    def take_call(self, agent: str, key: str) -> dict[str, Any]:
+        found = self._calls.take(agent, key)
+        if found is None:
+            raise CassetteMiss(f"cassette {self.path} has no model call left for agent '{agent}'")
+        span, exact = found
+        self.stats.replayed += 1
+        self.stats.exact += exact
+        return self._load(span)
+
+    def take_tool(self, agent: str, key: str) -> dict[str, Any] | None:
+        """Only exact matches: a tool called with other arguments runs for real."""
+        found = self._tools.take(agent, key, in_order=False)
+        return self._load(found[0]) if found is not None else None
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def report(self) -> str:
+        s = self.stats.summary()
+        line = (
+            f"replay: {s['replayed']}/{self.calls} recorded model calls served ({s['exact']} exact, {s['in_order']} in recorded order) | "
+            f"{s['tools_replayed']} tool results replayed, {s['tools_live']} tools run live"
+        )
+        recorded = self.header.get("framework")
+        if recorded and recorded != framework_version():
+            line += f" | recorded with agent-framework {recorded}, running {framework_version()}"
+        return line
+
+
+def _response_updates(response: ChatResponse) -> list[ChatResponseUpdate]:
+    updates = [
+        ChatResponseUpdate(role=message.role, contents=message.contents, author_name=message.author_name,
+                           message_id=message.message_id, response_id=response.response_id)
+        for message in response.messages
+    ]
+    if response.usage_details is not None:
+        updates.append(ChatResponseUpdate(contents=[UsageContent(details=response.usage_details)], response_id=response.response_id))
+    return updates
+
+
+class _CallReplay(ChatMiddleware):
+    """Answers every model call from the cassette; the request never reaches a client."""
+
+    def __init__(self, cassette: Cassette, agent: str, speed: float):
+        self.cassette = cassette
+        self.agent = agent
+        self.speed = speed
+
+    async def process(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> None:
+        record = self.cassette.take_call(self.agent, request_key(context.messages, context.options))
+        meter = current_meter.get()
+        if meter is not None:
+            meter.calls += 1
+            meter.model_seconds += record["ms"] / 1000 * self.speed
+        if context.is_streaming:
+            context.result = self._stream(record)
+            return
+        if self.speed:
+            await asyncio.sleep(record["ms"] / 1000 * self.speed)
+        if "r" in record:
+            context.result = ChatResponse.from_dict(record["r"])
+        else:
+            updates = [ChatResponseUpdate.from_dict(update) for _, update in record["u"]]
+            context.result = ChatResponse.from_chat_response_updates(
+                updates, output_format_type=(context.options or {}).get("response_format")
+            )
+
+    async def _stream(self, record: dict[str, Any]) -> AsyncIterable[ChatResponseUpdate]:
+        if "u" in record:
+            timed = [(ms, ChatResponseUpdate.from_dict(update)) for ms, update in record["u"]]
+        else:
+            timed = [(record["ms"], update) for update in _response_updates(ChatResponse.from_dict(record["r"]))]
+        start = time.perf_counter()
+        for ms, update in timed:
+            if self.speed:
+                delay = ms / 1000 * self.speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            yield update
+
+
+class _ToolReplay(FunctionMiddleware):
+    def __init__(self, cassette: Cassette, agent: str, speed: float):
+        self.cassette = cassette
+        self.agent = agent
+        self.speed = speed
+
+    async def process(self, context: FunctionInvocationContext, next: Callable[[FunctionInvocationContext], Awaitable[None]]) -> None:
+        if context.function.name.startswith(HANDOFF_TOOL_PREFIX):
+            await next(context)
+            return
+        record = self.cassette.take_tool(self.agent, tool_key(context))
+        if record is None:
+            self.cassette.stats.tools_live += 1
+            await next(context)
+            return
+        self.cassette.stats.tools_replayed += 1
+        if self.speed:
+            await asyncio.sleep(record["ms"] / 1000 * self.speed)
+        context.result = record["r"]
+
+
+@use_function_invocation
+@use_chat_middleware
+class _UnrecordedChatClient(BaseChatClient):
+    """Behind the replay middleware; reaching it means the middleware was not attached."""
+
+    OTEL_PROVIDER_NAME = "replay"
+
+    async def _inner_get_response(self, *, messages: MutableSequence[ChatMessage], options: dict[str, Any], **kwargs: Any) -> ChatResponse:
+        raise CassetteMiss("replay agents answer only through their cassette middleware")
+
+    async def _inner_get_streaming_response(
+        self, *, messages: MutableSequence[ChatMessage], options: dict[str, Any], **kwargs: Any
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        raise CassetteMiss("replay agents answer only through their cassette middleware")
+        yield
+
+
+class ReplayAgentProvider:
+    """Drop-in replacement for the Azure agent providers whose agents answer from a cassette.
+
+    ``speed`` scales the recorded timing: 1 replays it as recorded, 0 answers immediately.
+    """
+
+    def __init__(self, cassette: Cassette, speed: float = 1.0, **kwargs: Any):
+        self.cassette = cassette
+        self.speed = speed
+        self.created: list[str] = []
+
+    async def __aenter__(self) -> "ReplayAgentProvider":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        pass
+
+    async def create_agent(
+        self,
+        name: str,
+        model: str | None = None,
+        instructions: str | None = None,
+        description: str | None = None,
+        tools: Any = None,
+        default_options: dict[str, Any] | None = None,
+        middleware: Sequence[Any] | None = None,
+        context_provider: Any = None,
+    ) -> ChatAgent:
+        self.created.append(name)
+        return ChatAgent(
+            chat_client=_UnrecordedChatClient(),
+            id=f"replay_{name}",
+            name=name,
+            description=description,
+            instructions=instructions,
+            model_id=model or "replay",
+            tools=tools,
+            default_options=default_options,
+            # Innermost, so every middleware of the live run still runs
+            middleware=[*(middleware or ()), _CallReplay(self.cassette, name, self.speed), _ToolReplay(self.cassette, name, self.speed)],
+            context_provider=context_provider,
+        )
+
+
+# endregion
+
+
+def patch_azure_providers(replace: Callable[[type], Any]) -> None:
+    """Swap the providers the scripts import from agent_framework_azure_ai for ``replace(provider)``."""
+    import agent_framework_azure_ai
+
+    for name in AZURE_PROVIDERS:
+        setattr(agent_framework_azure_ai, name, replace(getattr(agent_framework_azure_ai, name)))
@@ -0,0 +1,195 @@
+"""Durable, append-only checkpoint storage for long workflow runs.
+
+DeltaCheckpointStorage implements the framework's CheckpointStorage protocol on a local SQLite
+file. The runner checkpoints after every superstep (for Magentic, after every round), and each
+checkpoint carries the whole workflow state: the conversation, the task and progress ledgers,
+and any pending request such as a MagenticPlanReviewRequest. Rewriting all of that each round
+costs more the longer the run gets, so only the first checkpoint of a workflow (and every
+``snapshot_every``-th after it) is stored in full. Every other row is a delta against the
+previous checkpoint: changed keys, and list appends as just the new tail.
+
+    storage = DeltaCheckpointStorage(".magentic_checkpoints.sqlite")
+    workflow = MagenticBuilder()....with_checkpointing(storage).build()
+    async for event in workflow.run_stream(task): ...
+
+    # after a crash, or in a later session
+    checkpoint_id = await storage.latest_checkpoint_id()
+    async for event in workflow.run_stream(checkpoint_id=checkpoint_id): ...
+
+Resuming re-emits pending RequestInfoEvents, so an unanswered plan review is asked again.
+"""
+import json
+import os
+import sqlite3
+from typing import Any
+
+from agent_framework import WorkflowCheckpoint
+
+_SET, _DEL, _SPLICE = "set", "del", "splice"
+
+
+def diff_state(old: Any, new: Any, path: tuple = (), ops: list | None = None) -> list:
+    """Operations that turn ``old`` into ``new``: ``[op, path, ...]`` with op set, del or splice.
+
+    Dicts are compared key by key. A list that kept its prefix becomes one splice op
+    carrying only the changed tail, which is what a growing conversation produces.
+    """
+    ops = [] if ops is None else ops
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            if key not in old:
+                ops.append([_SET, [*path, key], value])
+            else:
+                diff_state(old[key], value, (*path, key), ops)
+        ops.extend([_DEL, [*path, key]] for key in old if key not in new)
+    elif isinstance(old, list) and isinstance(new, list):
+        common = 0
+        for before, after in zip(old, new):
+            if before != after:
+                break
+            common += 1
+        if common != len(old) or common != len(new):
+            ops.append([_SPLICE, list(path), common, new[common:]])
+    elif old != new or type(old) is not type(new):
+        ops.append([_SET, list(path), new])
+    return ops
+
+
+def apply_delta(state: Any, ops: list) -> Any:
+    """Apply ``diff_state`` operations in place (the root itself may be replaced)."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        if not path:
+            state = op[2] if kind == _SET else state[: op[2]] + op[3]
+            continue
+        parent = state
+        for key in path[:-1]:
+            parent = parent[key]
+        key = path[-1]
+        if kind == _SET:
+            parent[key] = op[2]
+        elif kind == _DEL:
+            del parent[key]
+        else:
+            parent[key][op[2]:] = op[3]
+    return state
+
+
+class DeltaCheckpointStorage:
+    """SQLite checkpoint store that appends one full snapshot or delta row per checkpoint.
+
+    Loading a checkpoint replays the deltas since the nearest full snapshot, so
+    ``snapshot_every`` bounds both the replay work and how much one damaged row can cost.
+    The latest materialized state of each workflow is kept in memory as the base for the
+    next delta, so a save never reads the database back.
+    """
+
+    def __init__(self, path: str = ".workflow_checkpoints.sqlite", snapshot_every: int = 25):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.bytes_written = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, checkpoint_id TEXT UNIQUE NOT NULL, workflow_id TEXT NOT NULL, "
+            "parent_id TEXT, depth INTEGER NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+            "timestamp TEXT NOT NULL, iteration INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS checkpoints_workflow ON checkpoints (workflow_id, seq)")
+        # workflow_id -> (checkpoint_id, depth since the last snapshot, materialized state)
+        self._heads: dict[str, tuple[str, int, dict[str, Any]]] = {}
+
+    async def save_checkpoint(self, checkpoint: WorkflowCheckpoint) -> str:
+        state = checkpoint.to_dict()
+        head = self._heads.get(checkpoint.workflow_id) or self._load_head(checkpoint.workflow_id)
+        if head is None or head[1] + 1 >= self.snapshot_every:
+            parent_id, depth, kind, payload = None, 0, "full", state
+        else:
+            parent_id, depth, kind, payload = head[0], head[1] + 1, "delta", diff_state(head[2], state)
+        data = json.dumps(payload, ensure_ascii=False)
+        self._db.execute(
+            "INSERT OR REPLACE INTO checkpoints "
+            "(checkpoint_id, workflow_id, parent_id, depth, kind, payload, timestamp, iteration) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (checkpoint.checkpoint_id, checkpoint.workflow_id, parent_id, depth, kind, data,
+             checkpoint.timestamp, checkpoint.iteration_count),
+        )
+        self.bytes_written += len(data)
+        self._heads[checkpoint.workflow_id] = (checkpoint.checkpoint_id, depth, state)
+        return checkpoint.checkpoint_id
+
+    async def load_checkpoint(self, checkpoint_id: str) -> WorkflowCheckpoint | None:
+        state = self._materialize(checkpoint_id)
+        return WorkflowCheckpoint.from_dict(state) if state is not None else None
+
+    async def list_checkpoint_ids(self, workflow_id: str | None = None) -> list[str]:
+        return [row[0] for row in self._select("checkpoint_id", workflow_id)]
+
+    async def list_checkpoints(self, workflow_id: str | None = None) -> list[WorkflowCheckpoint]:
+        ids = await self.list_checkpoint_ids(workflow_id)
+        return [WorkflowCheckpoint.from_dict(self._materialize(checkpoint_id)) for checkpoint_id in ids]
+
+    async def delete_checkpoint(self, checkpoint_id: str) -> bool:
+        # Later deltas are built on this row, so its descendants go with it
+        doomed = [checkpoint_id]
+        for current in doomed:
+            doomed.extend(row[0] for row in self._db.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE parent_id = ?", (current,)))
+        deleted = 0
+        for current in doomed:
+            deleted += self._db.execute("DELETE FROM checkpoints WHERE checkpoint_id = ?", (current,)).rowcount
+        for workflow_id, head in list(self._heads.items()):
+            if head[0] in doomed:
+                del self._heads[workflow_id]
+        return deleted > 0
+
+    async def latest_checkpoint_id(self, workflow_id: str | None = None) -> str | None:
+        """Most recently saved checkpoint, optionally for one workflow."""
+        rows = self._select("checkpoint_id", workflow_id, newest_first=True, limit=1)
+        return rows[0][0] if rows else None
+
+    def describe(self, workflow_id: str | None = None) -> list[dict[str, Any]]:
+        """One row per checkpoint (newest first) for listing what can be resumed."""
+        columns = "checkpoint_id, workflow_id, kind, iteration, timestamp, length(payload)"
+        return [
+            {"checkpoint_id": row[0], "workflow_id": row[1], "kind": row[2], "iteration": row[3],
+             "timestamp": row[4], "bytes": row[5]}
+            for row in self._select(columns, workflow_id, newest_first=True)
+        ]
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _select(self, columns: str, workflow_id: str | None, newest_first: bool = False, limit: int = -1) -> list[tuple]:
+        order = "DESC" if newest_first else "ASC"
+        where, params = ("WHERE workflow_id = ?", (workflow_id,)) if workflow_id is not None else ("", ())
+        return self._db.execute(
+            f"SELECT {columns} FROM checkpoints {where} ORDER BY seq {order} LIMIT ?", (*params, limit)
+        ).fetchall()
+
+    def _load_head(self, workflow_id: str) -> tuple[str, int, dict[str, Any]] | None:
+        # A resumed run keeps appending to the chain it was restored from
+        rows = self._select("checkpoint_id, depth", workflow_id, newest_first=True, limit=1)
+        if not rows:
+            return None
+        state = self._materialize(rows[0][0])
+        return (rows[0][0], rows[0][1], state) if state is not None else None
+
+    def _materialize(self, checkpoint_id: str) -> dict[str, Any] | None:
+        chain = []
+        current: str | None = checkpoint_id
+        while current is not None:
+            row = self._db.execute(
+                "SELECT parent_id, kind, payload FROM checkpoints WHERE checkpoint_id = ?", (current,)
+            ).fetchone()
+            if row is None:
+                return None
+            chain.append(row)
+            current = row[0] if row[1] == "delta" else None
+        state = json.loads(chain[-1][2])
+        for _, _, payload in reversed(chain[:-1]):
+            state = apply_delta(state, json.loads(payload))
+        return state
@@ -0,0 +1,313 @@
+"""Per-agent context policies: decide which part of a growing conversation each model call sees.
+
+Builders hand every agent the whole conversation so far, and Handoff and GroupChat agents also
+replay their own thread, so prompt tokens grow with every turn. A ContextPolicyMiddleware is chat
+middleware, so it runs on the exact message list sent to the model (thread history included)
+and trims it before each call:
+
+    last:N              the last N messages
+    from:NAME,...       only messages written by the named agents ('user' matches user turns)
+    window:TOKENS       the most recent messages that fit in a token budget
+    summary:TOKENS[:N]  once older turns exceed TOKENS, replace all but the last N with a rolling summary
+
+Policies are configured per agent name, '*' applying to agents without their own, and chain with '+':
+
+    policies = ContextPolicies.parse(["action=from:summarizer,classifier", "*=summary:3000:6"])
+    registry = AgentRegistry(client, middleware=lambda spec: policies.middleware(spec.name))
+    ...
+    print(policies.report())     # prompt tokens before/after and what the summaries cost
+
+The message that prompted the call and an in-progress tool loop after it are never trimmed,
+and a tool call is only kept together with its result.
+"""
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Sequence
+
+from agent_framework import ChatContext, ChatMessage, ChatMiddleware, ChatResponse, Role
+
+from .cache import normalize_text
+from .ratelimit import NORMAL, RateLimitScheduler
+
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the conversation below for another assistant who will continue it. Keep every fact, "
+    "decision, order number, open question and commitment; drop greetings and repetition. "
+    "Answer with the summary only."
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def message_tokens(message: ChatMessage) -> int:
+    """Rough token count (about four characters each) including tool calls and results."""
+    chars = len(message.text or "")
+    for content in message.contents:
+        if content.type == "function_call":
+            chars += len(content.name or "") + len(str(content.arguments or ""))
+        elif content.type == "function_result":
+            chars += len(str(content.result or ""))
+    return chars // 4 + 4
+
+
+def _is_tool_step(message: ChatMessage) -> bool:
+    return message.role == Role.TOOL or any(c.type in ("function_call", "function_result") for c in message.contents)
+
+
+def _split(messages: Sequence[ChatMessage]) -> tuple[list[ChatMessage], list[ChatMessage]]:
+    """History the policies may trim, and the protected tail: the prompting message and any tool loop after it."""
+    start = len(messages)
+    while start > 0 and _is_tool_step(messages[start - 1]):
+        start -= 1
+    start = max(0, start - 1)
+    return list(messages[:start]), list(messages[start:])
+
+
+def _pair_tool_steps(messages: list[ChatMessage]) -> list[ChatMessage]:
+    """Drop tool calls whose result was trimmed and results whose call was trimmed."""
+    calls = {c.call_id for m in messages for c in m.contents if c.type == "function_call"}
+    results = {c.call_id for m in messages for c in m.contents if c.type == "function_result"}
+    paired = calls & results
+    return [
+        m for m in messages
+        if not _is_tool_step(m) or all(c.call_id in paired for c in m.contents if c.type in ("function_call", "function_result"))
+    ]
+
+
+class ContextPolicy:
+    """Selects the part of the history a model call sees; the protected tail is added afterwards."""
+
+    async def apply(self, history: list[ChatMessage], context: ChatContext, stats: "ContextStats") -> list[ChatMessage]:
+        raise NotImplementedError
+
+
+@dataclass
+class LastMessages(ContextPolicy):
+    count: int
+
+    async def apply(self, history: list[ChatMessage], context: ChatContext, stats: "ContextStats") -> list[ChatMessage]:
+        return history[-self.count:] if self.count > 0 else []
+
+
+@dataclass
+class FromAgents(ContextPolicy):
+    """Only the named predecessors' messages; 'user' keeps the user's turns."""
+
+    names: frozenset[str]
+
+    async def apply(self, history: list[ChatMessage], context: ChatContext, stats: "ContextStats") -> list[ChatMessage]:
+        keep_user = "user" in self.names
+        return [
+            m for m in history
+            if m.author_name in self.names or (keep_user and m.role == Role.USER and m.author_name is None)
+        ]
+
+
+@dataclass
+class TokenWindow(ContextPolicy):
+    max_tokens: int
+
+    async def apply(self, history: list[ChatMessage], context: ChatContext, stats: "ContextStats") -> list[ChatMessage]:
+        budget = self.max_tokens - sum(message_tokens(m) for m in _split(context.messages)[1])
+        kept = len(history)
+        while kept > 0 and budget - message_tokens(history[kept - 1]) >= 0:
+            kept -= 1
+            budget -= message_tokens(history[kept])
+        return history[kept:]
+
+
+class Summarizer:
+    """Writes rolling summaries of conversation prefixes and remembers them.
+
+    A prefix that extends one already summarized only costs a summary of the new messages
+    (folded into the previous summary), and agents sharing a Summarizer share its summaries.
+    The call goes to ``client`` or, by default, the chat client of the agent being trimmed,
+    through ``scheduler`` when one is given.
+    """
+
+    def __init__(self, client: Any = None, scheduler: RateLimitScheduler | None = None,
+                 priority: int = NORMAL, max_tokens: int = 400, max_entries: int = 256):
+        self.client = client
+        self.scheduler = scheduler
+        self.priority = priority
+        self.max_tokens = max_tokens
+        self.max_entries = max_entries
+        self._summaries: dict[str, str] = {}
+
+    @staticmethod
+    def _prefix_keys(messages: Sequence[ChatMessage]) -> list[str]:
+        keys, digest = [], hashlib.sha256()
+        for message in messages:
+            digest.update(f"{message.role.value}:{message.author_name}:{normalize_text(message.text or '')}\x1f".encode("utf-8"))
+            keys.append(digest.copy().hexdigest())
+        return keys
+
+    async def summarize(self, messages: Sequence[ChatMessage], context: ChatContext, stats: "ContextStats") -> str:
+        keys = self._prefix_keys(messages)
+        done, previous = 0, None
+        for n in range(len(keys), 0, -1):
+            if keys[n - 1] in self._summaries:
+                done, previous = n, self._summaries[keys[n - 1]]
+                break
+        if done == len(messages):
+            return previous or ""
+
+        transcript = "\n".join(f"[{m.author_name or m.role.value}] {m.text}" for m in messages[done:] if m.text)
+        if previous:
+            transcript = f"Summary so far:\n{previous}\n\nNew messages:\n{transcript}"
+        client = self.client or context.chat_client
+        prompt = [ChatMessage(role=Role.USER, text=f"{SUMMARY_INSTRUCTIONS}\n\n{transcript}")]
+
+        async def call() -> ChatResponse:
+            return await client.get_response(prompt, options={"max_tokens": self.max_tokens})
+
+        estimate = message_tokens(prompt[0]) + self.max_tokens
+        if self.scheduler is not None:
+            response = await self.scheduler.run(call, self.priority, estimate)
+        else:
+            response = await call()
+        usage = response.usage_details
+        stats.summaries += 1
+        stats.summary_tokens += (usage.total_token_count if usage is not None and usage.total_token_count else estimate)
+
+        if len(self._summaries) >= self.max_entries:
+            self._summaries.pop(next(iter(self._summaries)))
+        self._summaries[keys[-1]] = response.text
+        return response.text
+
+
+@dataclass
+class RollingSummary(ContextPolicy):
+    """Once the history exceeds ``trigger_tokens``, all but the last ``keep_last`` messages become one summary."""
+
+    trigger_tokens: int
+    keep_last: int = 6
+    summarizer: Summarizer = field(default_factory=Summarizer)
+
+    async def apply(self, history: list[ChatMessage], context: ChatContext, stats: "ContextStats") -> list[ChatMessage]:
+        if len(history) <= self.keep_last or sum(message_tokens(m) for m in history) <= self.trigger_tokens:
+            return history
+        cut = len(history) - self.keep_last
+        # Do not separate a tool call from its result
+        while cut > 0 and _is_tool_step(history[cut]):
+            cut -= 1
+        older = [m for m in history[:cut] if not m.text or not m.text.startswith(SUMMARY_PREFIX)]
+        if not older:
+            return history
+        summary = await self.summarizer.summarize(older, context, stats)
+        return [ChatMessage(role=Role.USER, text=SUMMARY_PREFIX + summary), *history[cut:]]
+
+
+@dataclass
+class ContextStats:
+    calls: int = 0
+    trimmed: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+    summaries: int = 0
+    summary_tokens: int = 0
+    by_agent: dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> dict[str, Any]:
+        saved = self.tokens_before - self.tokens_after
+        return {
+            "calls": self.calls,
+            "trimmed": self.trimmed,
+            "prompt_tokens_before": self.tokens_before,
+            "prompt_tokens_after": self.tokens_after,
+            "saved_tokens": saved,
+            "saved_rate": round(saved / self.tokens_before, 3) if self.tokens_before else 0.0,
+            "summaries": self.summaries,
+            "summary_tokens": self.summary_tokens,
+            "net_saved_tokens": saved - self.summary_tokens,
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        line = (
+            f"context: {s['trimmed']}/{s['calls']} calls trimmed | ~{s['prompt_tokens_before']} -> "
+            f"~{s['prompt_tokens_after']} prompt tokens (saved ~{s['saved_tokens']}, {s['saved_rate']:.0%})"
+        )
+        if s["summaries"]:
+            line += f" | {s['summaries']} summaries cost ~{s['summary_tokens']} tokens, net ~{s['net_saved_tokens']} saved"
+        if self.by_agent:
+            line += " | by agent: " + ", ".join(f"{name} {saved}" for name, saved in sorted(self.by_agent.items(), key=lambda i: -i[1]))
+        return line
+
+
+class ContextPolicyMiddleware(ChatMiddleware):
+    """Applies an agent's policies, in order, to the history of every model call it makes."""
+
+    def __init__(self, agent: str, policies: Sequence[ContextPolicy], stats: ContextStats | None = None):
+        self.agent = agent
+        self.policies = list(policies)
+        self.stats = stats or ContextStats()
+
+    async def process(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> None:
+        history, tail = _split(context.messages)
+        before = sum(message_tokens(m) for m in history)
+        kept = history
+        for policy in self.policies:
+            kept = await policy.apply(kept, context, self.stats)
+        kept = _pair_tool_steps(kept)
+        after = sum(message_tokens(m) for m in kept)
+        tail_tokens = sum(message_tokens(m) for m in tail)
+
+        self.stats.calls += 1
+        self.stats.tokens_before += before + tail_tokens
+        self.stats.tokens_after += after + tail_tokens
+        if kept != history:
+            self.stats.trimmed += 1
+            self.stats.by_agent[self.agent] = self.stats.by_agent.get(self.agent, 0) + before - after
+            context.messages[:] = [*kept, *tail]
+            # Picked up by the tracing middleware
+            context.metadata["context_saved_tokens"] = before - after
+        await next(context)
+
+
+def parse_policy(spec: str, summarizer: Summarizer) -> ContextPolicy:
+    kind, _, arg = spec.strip().partition(":")
+    try:
+        if kind == "last":
+            return LastMessages(int(arg))
+        if kind == "from":
+            return FromAgents(frozenset(name.strip() for name in arg.split(",") if name.strip()))
+        if kind == "window":
+            return TokenWindow(int(arg))
+        if kind == "summary":
+            trigger, _, keep = arg.partition(":")
+            return RollingSummary(int(trigger), int(keep) if keep else 6, summarizer)
+    except ValueError:
+        pass
+    raise ValueError(f"invalid context policy {spec!r}; expected last:N, from:A,B, window:TOKENS or summary:TOKENS[:N]")
+
+
+class ContextPolicies:
+    """Context policies by agent name, with shared stats and a shared Summarizer."""
+
+    def __init__(self, policies: dict[str, list[ContextPolicy]] | None = None, summarizer: Summarizer | None = None):
+        self.policies = policies or {}
+        self.summarizer = summarizer or Summarizer()
+        self.stats = ContextStats()
+        self._middleware: dict[str, ContextPolicyMiddleware] = {}
+
+    @classmethod
+    def parse(cls, specs: Sequence[str], summarizer: Summarizer | None = None) -> "ContextPolicies":
+        """Build from 'AGENT=POLICY[+POLICY...]' strings; a later spec for the same agent replaces an earlier one."""
+        policies = cls(summarizer=summarizer)
+        for spec in specs:
+            agent, sep, chain = spec.partition("=")
+            if not sep or not agent.strip():
+                raise ValueError(f"invalid context spec {spec!r}; expected AGENT=POLICY[+POLICY...]")
+            policies.policies[agent.strip()] = [parse_policy(part, policies.summarizer) for part in chain.split("+") if part.strip()]
+        return policies
+
+    def middleware(self, agent: str) -> list[ContextPolicyMiddleware]:
+        """Chat middleware for ``agent``, or an empty list when no policy applies to it."""
+        policies = self.policies.get(agent, self.policies.get("*"))
+        if not policies:
+            return []
+        if agent not in self._middleware:
+            self._middleware[agent] = ContextPolicyMiddleware(agent, policies, self.stats)
+        return [self._middleware[agent]]
+
+    def report(self) -> str:
+        return self.stats.report()
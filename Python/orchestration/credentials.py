@@ -0,0 +1,237 @@
+"""Token caching credential shared by every provider and workflow in a process.
+
+AzureCliCredential shells out to ``az`` for each token it issues, which takes hundreds of
+milliseconds. CachedCredential wraps any async token credential and keeps its tokens in memory,
+and optionally in a file that later processes reuse. Concurrent requests for the same scopes
+share a single fetch, and a background task refreshes each token before it expires, so callers
+almost never wait on the subprocess.
+
+    async with shared_credential(disk_cache=".azure_token_cache.json") as credential:
+        async with AzureAIProjectAgentProvider(credential=credential) as client:
+            ...
+
+``shared_credential()`` returns one instance per process; it closes when its last user exits.
+Pass ``FakeTokenSource()`` as the source to exercise the caching without Azure.
+"""
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from azure.core.credentials import AccessToken, AccessTokenInfo
+
+# Refresh this long before expiry when the token does not say when to refresh
+DEFAULT_REFRESH_MARGIN = 300.0
+# Wait between attempts when a background refresh fails and the old token is still valid
+RETRY_INTERVAL = 30.0
+# A cached token closer to expiry than this is fetched again rather than handed out to fail in flight
+MIN_REMAINING = 60.0
+
+
+@dataclass
+class CredentialStats:
+    hits: int = 0
+    fetches: int = 0
+    merged: int = 0
+    background_refreshes: int = 0
+    refresh_failures: int = 0
+    disk_hits: int = 0
+    fetch_seconds: float = 0.0
+
+    def report(self) -> str:
+        avg = self.fetch_seconds / self.fetches * 1000 if self.fetches else 0.0
+        return (
+            f"credential: {self.hits} cached, {self.merged} merged into in-flight fetches, {self.disk_hits} from disk | "
+            f"{self.fetches} fetches ({avg:.0f} ms avg), {self.background_refreshes} in the background, "
+            f"{self.refresh_failures} failed refreshes"
+        )
+
+
+class FakeTokenSource:
+    """Local token source for tests and offline runs: numbered tokens with a fixed lifetime."""
+
+    def __init__(self, lifetime: float = 3600.0, latency: float = 0.0):
+        self.lifetime = lifetime
+        self.latency = latency
+        self.calls = 0
+
+    async def get_token(self, *scopes: str, **kwargs: Any) -> AccessToken:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return AccessToken(f"fake-token-{self.calls}", int(time.time() + self.lifetime))
+
+    async def close(self) -> None:
+        pass
+
+
+class CachedCredential:
+    """Async token credential that caches, merges and pre-refreshes the tokens of ``source``.
+
+    Implements both ``get_token`` and ``get_token_info``, so azure-core pipelines and SDK
+    clients accept it wherever they accept the wrapped credential. Requests carrying ``claims``
+    (a conditional-access challenge) always go to the source.
+    """
+
+    def __init__(self, source: Any, disk_cache: str | None = None, refresh_margin: float = DEFAULT_REFRESH_MARGIN):
+        self.source = source
+        self.disk_cache = disk_cache
+        self.refresh_margin = refresh_margin
+        self.stats = CredentialStats()
+        self._tokens: dict[str, AccessTokenInfo] = {}
+        self._inflight: dict[str, asyncio.Future[AccessTokenInfo]] = {}
+        self._refreshers: dict[str, asyncio.Task[None]] = {}
+        self._disk_loaded = False
+        self._users = 0
+
+    async def __aenter__(self) -> "CachedCredential":
+        self._users += 1
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._users -= 1
+        if self._users <= 0:
+            await self.close()
+
+    async def get_token(self, *scopes: str, claims: str | None = None, tenant_id: str | None = None,
+                        enable_cae: bool = False, **kwargs: Any) -> AccessToken:
+        options = {"claims": claims, "tenant_id": tenant_id, "enable_cae": enable_cae}
+        info = await self.get_token_info(*scopes, options={k: v for k, v in options.items() if v})
+        return AccessToken(info.token, info.expires_on)
+
+    async def get_token_info(self, *scopes: str, options: dict[str, Any] | None = None) -> AccessTokenInfo:
+        options = dict(options or {})
+        if options.get("claims"):
+            return await self._fetch(None, scopes, options)
+        key = json.dumps([sorted(scopes), options.get("tenant_id"), bool(options.get("enable_cae"))])
+        self._load_disk()
+        token = self._tokens.get(key)
+        if token is not None and token.expires_on - time.time() > MIN_REMAINING:
+            self.stats.hits += 1
+            if key not in self._refreshers:
+                # Loaded from disk: keep it fresh from now on like a fetched token
+                self._schedule_refresh(key, scopes, options, token)
+            return token
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats.merged += 1
+            return await asyncio.shield(inflight)
+        return await self._fetch(key, scopes, options)
+
+    async def _fetch(self, key: str | None, scopes: tuple[str, ...], options: dict[str, Any]) -> AccessTokenInfo:
+        """One call to the source; callers asking for the same key meanwhile await this fetch."""
+        future = asyncio.ensure_future(self._call_source(scopes, options))
+        if key is not None:
+            self._inflight[key] = future
+        try:
+            token = await asyncio.shield(future)
+        finally:
+            if key is not None and self._inflight.get(key) is future:
+                del self._inflight[key]
+        if key is not None:
+            self._tokens[key] = token
+            self._save_disk()
+            self._schedule_refresh(key, scopes, options, token)
+        return token
+
+    async def _call_source(self, scopes: tuple[str, ...], options: dict[str, Any]) -> AccessTokenInfo:
+        start = time.perf_counter()
+        if hasattr(self.source, "get_token_info"):
+            token = await self.source.get_token_info(*scopes, options=options or None)
+        else:
+            token = await self.source.get_token(*scopes, **options)
+        self.stats.fetches += 1
+        self.stats.fetch_seconds += time.perf_counter() - start
+        if isinstance(token, AccessToken):
+            token = AccessTokenInfo(token.token, token.expires_on)
+        return token
+
+    def _refresh_at(self, token: AccessTokenInfo) -> float:
+        if token.refresh_on:
+            return token.refresh_on
+        lifetime = token.expires_on - time.time()
+        # Short-lived tokens refresh at half their lifetime rather than immediately
+        return token.expires_on - min(self.refresh_margin, lifetime / 2)
+
+    def _schedule_refresh(self, key: str, scopes: tuple[str, ...], options: dict[str, Any], token: AccessTokenInfo) -> None:
+        previous = self._refreshers.pop(key, None)
+        if previous is not None and previous is not asyncio.current_task():
+            previous.cancel()
+        self._refreshers[key] = asyncio.get_running_loop().create_task(self._refresh_later(key, scopes, options, token))
+
+    async def _refresh_later(self, key: str, scopes: tuple[str, ...], options: dict[str, Any], token: AccessTokenInfo) -> None:
+        await asyncio.sleep(max(0.0, self._refresh_at(token) - time.time()))
+        while True:
+            try:
+                self.stats.background_refreshes += 1
+                await self._fetch(key, scopes, options)
+                return
+            except Exception:
+                self.stats.refresh_failures += 1
+                remaining = token.expires_on - time.time()
+                if remaining <= MIN_REMAINING:
+                    # Too close to expiry to hand out: the next caller fetches (and sees the error) in the foreground
+                    self._tokens.pop(key, None)
+                    return
+                await asyncio.sleep(min(RETRY_INTERVAL, remaining / 2))
+
+    def _load_disk(self) -> None:
+        if self._disk_loaded or not self.disk_cache:
+            return
+        self._disk_loaded = True
+        try:
+            with open(self.disk_cache, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, value in stored.items():
+            token = AccessTokenInfo(value["token"], value["expires_on"], refresh_on=value.get("refresh_on"))
+            # A token that is due for refresh is left for a fresh fetch instead
+            if key not in self._tokens and self._refresh_at(token) > now:
+                self._tokens[key] = token
+                self.stats.disk_hits += 1
+
+    def _save_disk(self) -> None:
+        if not self.disk_cache:
+            return
+        data = {
+            key: {"token": token.token, "expires_on": token.expires_on, "refresh_on": token.refresh_on}
+            for key, token in self._tokens.items()
+        }
+        # Tokens are secrets: write owner-only, and atomically so readers never see half a file
+        tmp = f"{self.disk_cache}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.disk_cache)
+
+    async def close(self) -> None:
+        for task in self._refreshers.values():
+            task.cancel()
+        await asyncio.gather(*self._refreshers.values(), return_exceptions=True)
+        self._refreshers.clear()
+        if hasattr(self.source, "close"):
+            await self.source.close()
+        if _shared.get("credential") is self:
+            del _shared["credential"]
+
+
+_shared: dict[str, CachedCredential] = {}
+
+
+def shared_credential(source_factory: Callable[[], Any] | None = None, disk_cache: str | None = None) -> CachedCredential:
+    """The process-wide CachedCredential, created on first use around AzureCliCredential by default.
+
+    Arguments only apply when the shared instance is created; later callers get it as it is.
+    """
+    credential = _shared.get("credential")
+    if credential is None:
+        if source_factory is None:
+            from azure.identity.aio import AzureCliCredential
+
+            source_factory = AzureCliCredential
+        credential = _shared["credential"] = CachedCredential(source_factory(), disk_cache=disk_cache)
+    return credential
@@ -0,0 +1,136 @@
+"""Handle workflow events as they stream in, with typed handlers and backpressure.
+
+EventDispatcher drives ``run_stream`` / ``send_responses_streaming`` for one conversation.
+Events pass through a bounded queue to handlers registered per event type; when handlers fall
+behind, the queue fills and the dispatcher stops pulling from the workflow until they catch up.
+Nothing is kept per event except the requests still waiting for an answer and the latest
+output, so memory stays flat however long the conversation runs.
+
+    dispatcher = EventDispatcher(max_queued=64)
+    dispatcher.on(AgentRunUpdateEvent, show_delta)
+    dispatcher.on(RequestInfoEvent, show_question, data_type=HandoffAgentUserRequest)
+    output = await dispatcher.converse(workflow, task, answer)   # answer(pending) -> {request_id: response}
+
+Requests raised while answers are being processed are carried into the next round, and
+requests left unanswered stay pending until a later round answers them.
+"""
+import asyncio
+import inspect
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable
+
+from agent_framework import RequestInfoEvent, WorkflowEvent, WorkflowOutputEvent
+
+Handler = Callable[[Any], Awaitable[None] | None]
+Responder = Callable[[list[RequestInfoEvent]], Awaitable[dict[str, Any]] | dict[str, Any]]
+
+_DONE = object()
+
+
+@dataclass
+class DispatchStats:
+    events: int = 0
+    rounds: int = 0
+    max_depth: int = 0
+    # Time the stream reader waited on a full queue, i.e. how long backpressure held the workflow
+    blocked_seconds: float = 0.0
+    by_type: dict[str, int] = field(default_factory=dict)
+
+    def report(self) -> str:
+        kinds = ", ".join(f"{name} {count}" for name, count in sorted(self.by_type.items(), key=lambda item: -item[1]))
+        return (
+            f"dispatch: {self.events} events in {self.rounds} rounds | queue depth max {self.max_depth} | "
+            f"{self.blocked_seconds:.3f}s blocked on slow handlers | {kinds}"
+        )
+
+
+class EventDispatcher:
+    """Typed event handlers over a bounded queue, for one conversation at a time."""
+
+    def __init__(self, max_queued: int = 64):
+        self.max_queued = max_queued
+        self._handlers: list[tuple[type, type | None, Handler]] = []
+        self.pending: dict[str, RequestInfoEvent] = {}
+        self.output: WorkflowOutputEvent | None = None
+        self.stats = DispatchStats()
+
+    def on(self, event_type: type, handler: Handler | None = None, *, data_type: type | None = None) -> Any:
+        """Register ``handler`` for events of ``event_type`` (and subclasses); usable as a decorator.
+
+        ``data_type`` narrows the match to events whose ``data`` is an instance of it, for example
+        RequestInfoEvents that carry a HandoffAgentUserRequest.
+        """
+        if handler is None:
+            def register(func: Handler) -> Handler:
+                self._handlers.append((event_type, data_type, func))
+                return func
+            return register
+        self._handlers.append((event_type, data_type, handler))
+        return handler
+
+    async def dispatch(self, event: WorkflowEvent) -> None:
+        if isinstance(event, RequestInfoEvent):
+            self.pending[event.request_id] = event
+        elif isinstance(event, WorkflowOutputEvent):
+            self.output = event
+        for event_type, data_type, handler in self._handlers:
+            if isinstance(event, event_type) and (data_type is None or isinstance(event.data, data_type)):
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    await result
+
+    async def run(self, stream: AsyncIterable[WorkflowEvent]) -> None:
+        """Consume one stream to the end, handling events in arrival order."""
+        queue: asyncio.Queue[Any] = asyncio.Queue(self.max_queued)
+        stats = self.stats
+        stats.rounds += 1
+
+        async def read() -> None:
+            try:
+                async for event in stream:
+                    if queue.full():
+                        start = time.perf_counter()
+                        await queue.put(event)
+                        stats.blocked_seconds += time.perf_counter() - start
+                    else:
+                        queue.put_nowait(event)
+                    stats.max_depth = max(stats.max_depth, queue.qsize())
+            except asyncio.CancelledError:
+                raise
+            except BaseException:
+                await queue.put(_DONE)
+                raise
+            await queue.put(_DONE)
+
+        reader = asyncio.create_task(read())
+        try:
+            while (event := await queue.get()) is not _DONE:
+                stats.events += 1
+                name = type(event).__name__
+                stats.by_type[name] = stats.by_type.get(name, 0) + 1
+                await self.dispatch(event)
+        except BaseException:
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+            raise
+        # Surfaces errors raised by the workflow stream itself
+        await reader
+
+    async def converse(self, workflow: Any, message: Any, respond: Responder) -> WorkflowOutputEvent | None:
+        """Run ``message`` and keep answering pending requests until none are left.
+
+        ``respond`` receives every pending request and returns responses by request id; an
+        empty result ends the conversation with the remaining requests unanswered.
+        """
+        await self.run(workflow.run_stream(message))
+        while self.pending:
+            responses = respond(list(self.pending.values()))
+            if inspect.isawaitable(responses):
+                responses = await responses
+            if not responses:
+                break
+            for request_id in responses:
+                self.pending.pop(request_id, None)
+            await self.run(workflow.send_responses_streaming(responses))
+        return self.output
@@ -0,0 +1,22 @@
+"""Workflow executors shared by the custom builders in this package.
+
+    dispatcher = InputDispatcher(id="pipeline_input")
+    workflow = WorkflowBuilder().set_start_executor(dispatcher).add_edge(dispatcher, runner).build()
+"""
+from agent_framework import ChatMessage, Executor, Role, WorkflowContext, handler
+
+
+class InputDispatcher(Executor):
+    """Normalizes the run input (a prompt or a conversation) to a conversation for the next executor.
+
+    The start executor runs before the first superstep, when events are only drained at the
+    end, so work that streams events should happen one hop later, where events stream live.
+    """
+
+    @handler
+    async def from_str(self, prompt: str, ctx: WorkflowContext[list[ChatMessage]]) -> None:
+        await ctx.send_message([ChatMessage(role=Role.USER, text=prompt)])
+
+    @handler
+    async def from_messages(self, messages: list[ChatMessage], ctx: WorkflowContext[list[ChatMessage]]) -> None:
+        await ctx.send_message(list(messages))
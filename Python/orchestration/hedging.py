@@ -0,0 +1,248 @@
+"""Hedged model requests: when a call is slower than usual to start answering, send it twice.
+
+Each hedged agent tracks the time to first token of its recent calls. A call that has produced
+nothing after the configured percentile of that distribution gets a duplicate request; the
+first of the two to start answering is used and the other is cancelled, which also hands its
+rate-limiter slot back. Hedging is opt-in per agent and capped globally, so at most
+``max_rate`` of all calls are duplicated, and none are while the rate limiter has a queue.
+
+    hedging = Hedging(["legal", "marketer"], max_rate=0.05, scheduler=shared_scheduler())
+    registry = AgentRegistry(client, middleware=lambda spec: [*hedging.middleware(spec.name), scheduler.middleware()])
+    ...
+    print(hedging.report())   # hedges sent, won by the duplicate, wasted, held back by the cap
+
+Calls that continue a service-side thread (options carry a conversation_id) are never hedged:
+two runs cannot share one thread. Tool calls run outside chat middleware, so they are not
+duplicated either.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Sequence
+
+from agent_framework import ChatContext, ChatMiddleware
+
+from .metrics import RollingPercentile
+from .ratelimit import RateLimitScheduler
+
+
+@dataclass
+class HedgePolicy:
+    """When to hedge: after the ``percentile`` of recent first-token times, once ``min_samples`` are known.
+
+    Until then calls are hedged after ``initial_delay`` seconds, or not at all when it is None.
+    """
+
+    percentile: float = 95.0
+    min_samples: int = 20
+    min_delay: float = 0.05
+    initial_delay: float | None = None
+    window: int = 256
+
+
+@dataclass
+class HedgeStats:
+    calls: int = 0
+    hedged: int = 0
+    won: int = 0
+    wasted: int = 0
+    capped: int = 0
+    skipped: int = 0
+    by_agent: dict[str, list[int]] = field(default_factory=dict)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 3) if self.calls else 0.0,
+            "won": self.won,
+            "wasted": self.wasted,
+            "win_rate": round(self.won / self.hedged, 3) if self.hedged else 0.0,
+            "capped": self.capped,
+            "skipped": self.skipped,
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        line = (
+            f"hedging: {s['hedged']}/{s['calls']} calls hedged ({s['hedge_rate']:.1%}) | {s['won']} won by the duplicate, "
+            f"{s['wasted']} wasted ({s['win_rate']:.0%} win rate) | {s['capped']} held back by the cap"
+        )
+        if s["skipped"]:
+            line += f" | {s['skipped']} on service threads not hedged"
+        if self.by_agent:
+            line += " | by agent (hedged/won): " + ", ".join(f"{name} {h}/{w}" for name, (h, w) in sorted(self.by_agent.items()))
+        return line
+
+
+class _Attempt:
+    """One copy of the request, running until its first update (or its response) arrives."""
+
+    def __init__(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]):
+        self.context = context
+        self.iterator: AsyncIterator[Any] | None = None
+        self.task = asyncio.create_task(self._first(next))
+
+    async def _first(self, next: Callable[[ChatContext], Awaitable[None]]) -> tuple[Any, ...]:
+        await next(self.context)
+        if not self.context.is_streaming:
+            return ()
+        self.iterator = aiter(self.context.result or _empty())
+        try:
+            return (await anext(self.iterator),)
+        except StopAsyncIteration:
+            return ()
+
+    async def cancel(self) -> None:
+        self.task.cancel()
+        await asyncio.gather(self.task, return_exceptions=True)
+        await self.close()
+
+    async def close(self) -> None:
+        aclose = getattr(self.iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def _empty() -> AsyncIterable[Any]:
+    return
+    yield
+
+
+def _fork(context: ChatContext) -> ChatContext:
+    return ChatContext(
+        chat_client=context.chat_client,
+        messages=list(context.messages),
+        options=dict(context.options) if context.options is not None else None,
+        is_streaming=context.is_streaming,
+        metadata=dict(context.metadata),
+        kwargs=dict(context.kwargs),
+    )
+
+
+class HedgingMiddleware(ChatMiddleware):
+    """Hedges one agent's model calls; created through ``Hedging.middleware``."""
+
+    def __init__(self, hedging: "Hedging", agent: str):
+        self.hedging = hedging
+        self.agent = agent
+        self.first_token = RollingPercentile(hedging.policy.window)
+
+    def delay(self) -> float | None:
+        policy = self.hedging.policy
+        if self.first_token.count < policy.min_samples:
+            return policy.initial_delay
+        return max(policy.min_delay, self.first_token.percentile(policy.percentile))
+
+    async def process(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> None:
+        if (context.options or {}).get("conversation_id"):
+            self.hedging.stats.skipped += 1
+            await next(context)
+            return
+        if context.is_streaming:
+            context.result = self._stream(context, next)
+            return
+        winner = await self._race(context, next)
+        context.metadata.update(winner.context.metadata)
+        context.result = winner.context.result
+
+    async def _stream(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> AsyncIterable[Any]:
+        winner = await self._race(context, next)
+        context.metadata.update(winner.context.metadata)
+        try:
+            for update in winner.task.result():
+                yield update
+            if winner.iterator is not None:
+                async for update in winner.iterator:
+                    yield update
+        finally:
+            await winner.close()
+
+    async def _race(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> _Attempt:
+        stats = self.hedging.stats
+        stats.calls += 1
+        start = time.monotonic()
+        primary = _Attempt(_fork(context), next)
+        delay = self.delay()
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({primary.task}, timeout=delay)
+                if not done:
+                    if self.hedging.allow():
+                        winner = await self._hedge(primary, context, next)
+                        self.first_token.record(time.monotonic() - start)
+                        return winner
+                    stats.capped += 1
+            await primary.task
+        except BaseException:
+            await primary.cancel()
+            raise
+        self.first_token.record(time.monotonic() - start)
+        return primary
+
+    async def _hedge(self, primary: _Attempt, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> _Attempt:
+        stats = self.hedging.stats
+        stats.hedged += 1
+        counts = stats.by_agent.setdefault(self.agent, [0, 0])
+        counts[0] += 1
+        hedge = _Attempt(_fork(context), next)
+        attempts = {primary.task: primary, hedge.task: hedge}
+        pending = set(attempts)
+        winner: _Attempt | None = None
+        error: BaseException | None = None
+        try:
+            # The first copy to answer wins; a copy that fails leaves the race to the other one
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and winner is None:
+                        winner = attempts[task]
+                    elif task.exception() is not None:
+                        error = error or task.exception()
+            if winner is None:
+                raise error  # type: ignore[misc]
+        except BaseException:
+            await asyncio.gather(primary.cancel(), hedge.cancel())
+            raise
+        await (primary if winner is hedge else hedge).cancel()
+        if winner is hedge:
+            stats.won += 1
+            counts[1] += 1
+        else:
+            stats.wasted += 1
+        context.metadata["hedge"] = "won" if winner is hedge else "wasted"
+        return winner
+
+
+class Hedging:
+    """Hedging for the named agents ('*' for all) under one global hedge-rate cap.
+
+    ``max_rate`` is the largest share of calls that may be duplicated (plus ``burst`` to get
+    started); with a ``scheduler``, nothing is hedged while calls are waiting in its queue.
+    """
+
+    def __init__(self, agents: Sequence[str] = ("*",), policy: HedgePolicy | None = None, max_rate: float = 0.05,
+                 burst: int = 2, scheduler: RateLimitScheduler | None = None):
+        self.agents = set(agents)
+        self.policy = policy or HedgePolicy()
+        self.max_rate = max_rate
+        self.burst = burst
+        self.scheduler = scheduler
+        self.stats = HedgeStats()
+        self._middleware: dict[str, HedgingMiddleware] = {}
+
+    def allow(self) -> bool:
+        if self.scheduler is not None and self.scheduler.queued:
+            return False
+        return self.stats.hedged + 1 <= self.max_rate * self.stats.calls + self.burst
+
+    def middleware(self, agent: str) -> list[HedgingMiddleware]:
+        """Chat middleware hedging ``agent``'s calls, or an empty list when it is not hedged."""
+        if agent not in self.agents and "*" not in self.agents:
+            return []
+        if agent not in self._middleware:
+            self._middleware[agent] = HedgingMiddleware(self, agent)
+        return [self._middleware[agent]]
+
+    def report(self) -> str:
+        return self.stats.report()
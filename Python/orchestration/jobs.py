@@ -0,0 +1,587 @@
+"""Sharded, resumable job runner: thousands of prompts through one script's workflow, in N processes.
+
+One event loop spends much of a large run parsing and rendering streams, so the runner spreads
+the prompts over worker processes. Each has its own event loop, agents, rate limiter and
+``--concurrency`` runs in flight. The prompts go into a SQLite queue in the output directory.
+Workers lease jobs from it, append results to their own JSONL shard, and mark jobs done after
+the shard is synced to disk.
+
+    python -m orchestration.jobs run --input prompts.jsonl --out runs/briefs --workers 4 --concurrency 16
+    python -m orchestration.jobs run --out runs/briefs          # resume after a crash or Ctrl-C
+    python -m orchestration.jobs status --out runs/briefs
+    python -m orchestration.jobs run --input prompts.jsonl --out /tmp/dry --offline lognormal:0.2:0.5
+
+Each input record is a JSON object; ``--field`` names the prompt (default "prompt"). A record's
+"id" becomes the job key, or else a hash of the record, so re-running with the same input
+does not add jobs twice. Results land in ``shard-NNN-PID.jsonl``, one row per job:
+{"job", "key", "worker", "attempt", "seconds", "replies": [{"agent", "text"}]}. A job that fails
+``--max-attempts`` times gets a row with "error" instead.
+
+Killing the runner loses no finished work. On the next start, rows written after the last
+acknowledgement are read back from the shards and marked done. Leases held by dead workers
+on this host are released, and a torn last line is cut off. Leases held elsewhere come back
+once they expire. Only a job whose lease ran out while it was still running can appear twice,
+so readers should keep one row per "job".
+
+The deployment quota (AZURE_AI_RPM, AZURE_AI_TPM) is split evenly between the workers. Live
+runs create the agents once in the runner, so the workers reuse them from the agent registry.
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterable, Iterator
+
+from .batch import read_jsonl
+from .metrics import LatencyStats
+from .scripts import load_script
+
+# Patterns whose workflows finish without a human answering requests
+UNATTENDED = ("concurrent", "sequential", "groupchat")
+
+PENDING, LEASED, DONE, FAILED = "pending", "leased", "done", "failed"
+
+# Worker loop timings (seconds): shard sync + acknowledgement, idle polling
+ACK_SECONDS = 0.5
+POLL_SECONDS = 0.5
+
+
+@dataclass
+class Job:
+    id: int
+    key: str
+    payload: dict[str, Any]
+    attempts: int
+
+
+class JobQueue:
+    """SQLite work queue with leases, shared by the runner and its workers (one connection each)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, isolation_level=None, timeout=60.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, payload TEXT NOT NULL, "
+            f"state TEXT NOT NULL DEFAULT '{PENDING}', attempts INTEGER NOT NULL DEFAULT 0, "
+            "lease_owner TEXT, lease_until REAL, error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id)")
+        # Bytes of each shard whose rows are already reflected in the jobs table
+        self._db.execute("CREATE TABLE IF NOT EXISTS shards (path TEXT PRIMARY KEY, acked INTEGER NOT NULL)")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._db
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def enqueue(self, jobs: Iterable[tuple[str, dict[str, Any]]]) -> int:
+        """Add (key, payload) jobs, skipping keys already queued; returns how many were new."""
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO jobs (key, payload) VALUES (?, ?)",
+                           ((key, json.dumps(payload, ensure_ascii=False)) for key, payload in jobs))
+            return db.total_changes - before
+
+    def claim(self, owner: str, limit: int, lease: float) -> list[Job]:
+        """Lease up to ``limit`` jobs: pending ones first, then ones whose lease has expired."""
+        now = time.time()
+        with self._transaction() as db:
+            ids = [row[0] for row in db.execute(f"SELECT id FROM jobs WHERE state = '{PENDING}' ORDER BY id LIMIT ?", (limit,))]
+            if len(ids) < limit:
+                ids += [row[0] for row in db.execute(
+                    f"SELECT id FROM jobs WHERE state = '{LEASED}' AND lease_until < ? LIMIT ?", (now, limit - len(ids)))]
+            if not ids:
+                return []
+            marks = ",".join("?" * len(ids))
+            rows = db.execute(
+                f"UPDATE jobs SET state = '{LEASED}', lease_owner = ?, lease_until = ?, attempts = attempts + 1 "
+                f"WHERE id IN ({marks}) RETURNING id, key, payload, attempts",
+                (owner, now + lease, *ids),
+            ).fetchall()
+        return sorted((Job(id, key, json.loads(payload), attempts) for id, key, payload, attempts in rows), key=lambda job: job.id)
+
+    def renew(self, owner: str, lease: float) -> None:
+        """Extend every lease ``owner`` holds."""
+        self._db.execute(f"UPDATE jobs SET lease_until = ? WHERE lease_owner = ? AND state = '{LEASED}'", (time.time() + lease, owner))
+
+    def complete(self, ids: Iterable[int], shard: str, acked: int) -> None:
+        """Mark jobs done whose rows end before byte ``acked`` of ``shard``."""
+        ids = list(ids)
+        with self._transaction() as db:
+            db.executemany(f"UPDATE jobs SET state = '{DONE}', lease_owner = NULL, lease_until = NULL, error = NULL WHERE id = ?",
+                           ((id,) for id in ids))
+            db.execute("INSERT OR REPLACE INTO shards (path, acked) VALUES (?, ?)", (os.path.basename(shard), acked))
+
+    def release(self, id: int, error: str, max_attempts: int) -> bool:
+        """Return a failed job to the queue, or fail it for good after ``max_attempts``; True if final."""
+        with self._transaction() as db:
+            db.execute(
+                f"UPDATE jobs SET state = CASE WHEN attempts >= ? THEN '{FAILED}' ELSE '{PENDING}' END, "
+                "lease_owner = NULL, lease_until = NULL, error = ? WHERE id = ?",
+                (max_attempts, error, id),
+            )
+            state = db.execute("SELECT state FROM jobs WHERE id = ?", (id,)).fetchone()
+        return state is not None and state[0] == FAILED
+
+    def release_dead(self, host: str) -> int:
+        """Requeue jobs leased by processes on ``host`` that are no longer running.
+
+        The interrupted attempt is not counted against the job's ``max_attempts``.
+        """
+        released = 0
+        with self._transaction() as db:
+            owners = [row[0] for row in db.execute(f"SELECT DISTINCT lease_owner FROM jobs WHERE state = '{LEASED}'")]
+            for owner in owners:
+                owner_host, _, pid = (owner or "").rpartition(":")
+                if owner_host == host and pid.isdigit() and not _alive(int(pid)):
+                    released += db.execute(
+                        f"UPDATE jobs SET state = '{PENDING}', lease_owner = NULL, lease_until = NULL, attempts = attempts - 1 "
+                        "WHERE lease_owner = ?", (owner,)
+                    ).rowcount
+        return released
+
+    def reconcile(self, out: str) -> tuple[int, int]:
+        """Mark jobs done (or failed) from shard rows written after the last acknowledgement.
+
+        A torn last line from a killed worker is cut off first. Returns (done, failed) counts.
+        """
+        acked = dict(self._db.execute("SELECT path, acked FROM shards").fetchall())
+        done: list[int] = []
+        failed: list[tuple[str, int]] = []
+        for path in sorted(glob.glob(os.path.join(out, "shard-*.jsonl"))):
+            _repair_tail(path)
+            with open(path, "rb") as f:
+                f.seek(acked.get(os.path.basename(path), 0))
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if "error" in row:
+                        failed.append((row["error"], row["job"]))
+                    else:
+                        done.append(row["job"])
+            acked[os.path.basename(path)] = os.path.getsize(path)
+        with self._transaction() as db:
+            before = db.total_changes
+            db.executemany(f"UPDATE jobs SET state = '{DONE}', lease_owner = NULL, lease_until = NULL WHERE id = ? AND state != '{DONE}'",
+                           ((id,) for id in done))
+            marked = db.total_changes - before
+            db.executemany(f"UPDATE jobs SET state = '{FAILED}', error = ? WHERE id = ? AND state NOT IN ('{DONE}', '{FAILED}')", failed)
+            failed_count = db.total_changes - before - marked
+            db.executemany("INSERT OR REPLACE INTO shards (path, acked) VALUES (?, ?)", acked.items())
+        return marked, failed_count
+
+    def counts(self) -> dict[str, int]:
+        counts = dict.fromkeys((PENDING, LEASED, DONE, FAILED), 0)
+        counts.update(self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        return counts
+
+    def failures(self, limit: int = 5) -> list[tuple[str, int]]:
+        """The most common errors of failed jobs, with how many jobs each."""
+        return self._db.execute(
+            f"SELECT error, COUNT(*) FROM jobs WHERE state = '{FAILED}' GROUP BY error ORDER BY COUNT(*) DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def open_jobs(self) -> int:
+        """Jobs not yet done or failed for good."""
+        return self._db.execute(f"SELECT COUNT(*) FROM jobs WHERE state IN ('{PENDING}', '{LEASED}')").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def _alive(pid: int) -> bool:
+    """Whether a worker process is still running; a zombie left by a hard kill counts as dead.
+
+    Without /proc (macOS, Windows) an unreaped zombie looks alive, and its leases are only
+    recovered once they expire.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+            # The state follows the command name, which may itself contain spaces and parentheses
+            state = f.read().rpartition(")")[2].split()[0]
+    except (OSError, IndexError):
+        return True
+    return state not in ("Z", "X")
+
+
+def _repair_tail(path: str) -> None:
+    """Cut a shard back to its last complete line."""
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        end = size
+        while end > 0:
+            f.seek(max(0, end - 65536))
+            chunk = f.read(end - max(0, end - 65536))
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                f.truncate(max(0, end - 65536) + newline + 1)
+                return
+            end = max(0, end - 65536)
+        f.truncate(0)
+
+
+class ShardWriter:
+    """Append-only JSONL shard of one worker; ``sync`` returns the durable size in bytes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "ab")
+
+    def write(self, row: dict[str, Any]) -> None:
+        self._file.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def sync(self) -> int:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self) -> None:
+        self.sync()
+        self._file.close()
+
+
+def queue_path(out: str) -> str:
+    return os.path.join(out, "queue.sqlite")
+
+
+def shard_path(out: str, index: int) -> str:
+    # One file per worker process, so no shard ever has two writers, even across restarts
+    return os.path.join(out, f"shard-{index:03d}-{os.getpid()}.jsonl")
+
+
+def job_key(record: dict[str, Any]) -> str:
+    if record.get("id") is not None:
+        return str(record["id"])
+    return hashlib.sha256(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+# region Worker
+
+
+@dataclass
+class WorkerConfig:
+    """Everything a worker process needs; passed to it by pickling."""
+
+    index: int
+    workers: int
+    pattern: str
+    out: str
+    field: str = "prompt"
+    concurrency: int = 8
+    lease: float = 120.0
+    max_attempts: int = 3
+    job_timeout: float | None = 600.0
+    offline: str | None = None
+
+
+@asynccontextmanager
+async def _provider(config: WorkerConfig) -> AsyncIterator[Any]:
+    if config.offline is not None:
+        from .offline import LatencyModel, OfflineAgentProvider, OfflineProfile
+
+        async with OfflineAgentProvider(OfflineProfile(latency=LatencyModel.parse(config.offline), reply_tokens=60)) as client:
+            yield client
+        return
+    from .credentials import shared_credential
+    from .scripts import azure_provider
+
+    async with (
+        shared_credential(disk_cache=os.getenv("AZURE_TOKEN_CACHE")) as credential,
+        azure_provider(config.pattern, credential) as client,
+    ):
+        yield client
+
+
+async def _run_prompt(module: Any, agents: Any, prompt: str) -> list[Any]:
+    from agent_framework import WorkflowOutputEvent
+
+    # A workflow instance cannot run concurrently, so build one per job; the agents are shared
+    workflow = module.build_workflow(agents)
+    outputs: list[Any] = []
+    async for event in workflow.run_stream(prompt):
+        if isinstance(event, WorkflowOutputEvent):
+            outputs.append(event.data)
+    return outputs[-1] if outputs else []
+
+
+async def work(config: WorkerConfig) -> LatencyStats:
+    """Lease and run jobs until the queue has none left open; returns this worker's latencies."""
+    from agent_framework import Role
+
+    module = load_script(config.pattern)
+    queue = JobQueue(queue_path(config.out))
+    shard = ShardWriter(shard_path(config.out, config.index))
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    stats = LatencyStats()
+    # One connection per worker: queue calls take turns off the event loop
+    lock = asyncio.Lock()
+
+    async def db(method: Any, *args: Any) -> Any:
+        async with lock:
+            return await asyncio.to_thread(method, *args)
+
+    in_flight: dict[int, asyncio.Task[None]] = {}
+    finished: list[int] = []
+    changed = asyncio.Event()
+
+    async def run_job(job: Job) -> None:
+        start = time.perf_counter()
+        try:
+            conversation = await asyncio.wait_for(_run_prompt(module, agents, str(job.payload[config.field])), config.job_timeout)
+        except Exception as exc:
+            stats.record(time.perf_counter() - start, ok=False)
+            error = f"{type(exc).__name__}: {exc}"
+            if await db(queue.release, job.id, error, config.max_attempts):
+                shard.write({"job": job.id, "key": job.key, "worker": config.index, "attempt": job.attempts, "error": error})
+        else:
+            seconds = time.perf_counter() - start
+            stats.record(seconds)
+            shard.write({
+                "job": job.id,
+                "key": job.key,
+                "worker": config.index,
+                "attempt": job.attempts,
+                "seconds": round(seconds, 3),
+                "replies": [{"agent": m.author_name, "text": m.text} for m in conversation if m.role == Role.ASSISTANT],
+            })
+            finished.append(job.id)
+        finally:
+            del in_flight[job.id]
+            changed.set()
+
+    async def acknowledge() -> None:
+        if finished:
+            ids = finished[:]
+            del finished[: len(ids)]
+            await db(queue.complete, ids, shard.path, shard.sync())
+
+    async def heartbeat() -> None:
+        while True:
+            await asyncio.sleep(config.lease / 3)
+            await db(queue.renew, owner, config.lease)
+
+    async with _provider(config) as client:
+        agents = await module.create_agents(client)
+        renewing = asyncio.create_task(heartbeat())
+        try:
+            while True:
+                free = config.concurrency - len(in_flight)
+                if free > 0:
+                    for job in await db(queue.claim, owner, free, config.lease):
+                        in_flight[job.id] = asyncio.create_task(run_job(job))
+                await acknowledge()
+                if not in_flight:
+                    if await db(queue.open_jobs) == 0:
+                        break
+                    await asyncio.sleep(POLL_SECONDS)
+                    continue
+                changed.clear()
+                try:
+                    await asyncio.wait_for(changed.wait(), ACK_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            await acknowledge()
+        finally:
+            renewing.cancel()
+            for task in in_flight.values():
+                task.cancel()
+            await asyncio.gather(renewing, *in_flight.values(), return_exceptions=True)
+            shard.close()
+            queue.close()
+    stats.stop()
+    return stats
+
+
+def _worker_main(config: WorkerConfig) -> None:
+    from . import tracing
+    from .startup import load_env
+
+    load_env()
+    # The deployment quota is shared: each worker's rate limiter gets its part of it
+    for name in ("AZURE_AI_RPM", "AZURE_AI_TPM"):
+        if os.getenv(name):
+            os.environ[name] = str(float(os.environ[name]) / config.workers)
+    if os.getenv("ORCHESTRATION_TRACE"):
+        os.environ["ORCHESTRATION_TRACE"] = f"{os.environ['ORCHESTRATION_TRACE']}.{config.index}"
+    try:
+        stats = asyncio.run(work(config))
+    except KeyboardInterrupt:
+        return
+    print(f"worker {config.index}: {stats.report('jobs')}", file=sys.stderr)
+    tracing.finish()
+
+
+# endregion
+
+
+async def enqueue_file(queue: JobQueue, source: str, field: str, chunk: int = 1000) -> int:
+    """Queue every record of a JSONL file that has a prompt; returns how many were new."""
+    added = 0
+    pending: list[tuple[str, dict[str, Any]]] = []
+    async for record in read_jsonl(source):
+        if record.get(field) is None:
+            print(f"Skipping record without '{field}': {json.dumps(record)[:80]}", file=sys.stderr)
+            continue
+        pending.append((job_key(record), record))
+        if len(pending) >= chunk:
+            added += queue.enqueue(pending)
+            pending.clear()
+    if pending:
+        added += queue.enqueue(pending)
+    return added
+
+
+async def prime_agents(pattern: str) -> None:
+    """Create the script's agents once so every worker restores them from the registry."""
+    from .credentials import shared_credential
+    from .scripts import azure_provider
+
+    module = load_script(pattern)
+    async with (
+        shared_credential(disk_cache=os.getenv("AZURE_TOKEN_CACHE")) as credential,
+        azure_provider(pattern, credential) as client,
+    ):
+        await module.create_agents(client)
+
+
+def format_counts(counts: dict[str, int]) -> str:
+    total = sum(counts.values())
+    return " | ".join([f"jobs: {total} total", *(f"{counts[state]} {state}" for state in (DONE, FAILED, PENDING, LEASED))])
+
+
+async def run(args: argparse.Namespace) -> int:
+    os.makedirs(args.out, exist_ok=True)
+    queue = JobQueue(queue_path(args.out))
+    if args.input:
+        added = await enqueue_file(queue, args.input, args.field)
+        print(f"queued {added} new jobs from {args.input}", file=sys.stderr)
+    recovered, failed = queue.reconcile(args.out)
+    released = queue.release_dead(socket.gethostname())
+    if recovered or failed or released:
+        print(f"resumed: {recovered} finished and {failed} failed jobs recovered from shards, "
+              f"{released} leases of stopped workers released", file=sys.stderr)
+    start_counts = queue.counts()
+    print(format_counts(start_counts), file=sys.stderr)
+    if not queue.open_jobs():
+        queue.close()
+        return 1 if start_counts[FAILED] else 0
+    if args.offline is None:
+        await prime_agents(args.pattern)
+
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for index in range(args.workers):
+        config = WorkerConfig(index, args.workers, args.pattern, args.out, args.field, args.concurrency,
+                              args.lease, args.max_attempts, args.job_timeout, args.offline)
+        process = context.Process(target=_worker_main, args=(config,), name=f"jobs-worker-{index}")
+        process.start()
+        processes.append(process)
+
+    start = time.perf_counter()
+    next_progress = start + args.progress
+    try:
+        while any(process.is_alive() for process in processes):
+            await asyncio.sleep(min(args.progress, 1.0))
+            if time.perf_counter() >= next_progress:
+                next_progress += args.progress
+                counts = queue.counts()
+                done = counts[DONE] - start_counts[DONE]
+                print(f"{format_counts(counts)} | {done / (time.perf_counter() - start) * 60:.1f} jobs/min", file=sys.stderr)
+    finally:
+        for process in processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+    elapsed = time.perf_counter() - start
+    counts = queue.counts()
+    done = counts[DONE] - start_counts[DONE]
+    print(f"{format_counts(counts)} | {done} finished in {elapsed:.1f}s with {args.workers} workers "
+          f"({done / elapsed * 60:.1f} jobs/min)", file=sys.stderr)
+    queue.close()
+    crashed = [process.name for process in processes if process.exitcode]
+    if crashed:
+        print(f"workers exited with errors: {', '.join(crashed)}", file=sys.stderr)
+    return 1 if crashed or counts[FAILED] or counts[PENDING] or counts[LEASED] else 0
+
+
+def status(args: argparse.Namespace) -> int:
+    path = queue_path(args.out)
+    if not os.path.exists(path):
+        print(f"no job queue in {args.out}", file=sys.stderr)
+        return 1
+    queue = JobQueue(path)
+    print(format_counts(queue.counts()))
+    for error, count in queue.failures():
+        print(f"  failed x{count}: {error}")
+    shards = sorted(glob.glob(os.path.join(args.out, "shard-*.jsonl")))
+    size = sum(os.path.getsize(path) for path in shards)
+    print(f"shards: {len(shards)} files, {size / 1e6:.1f} MB")
+    queue.close()
+    return 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m orchestration.jobs",
+                                     description="Run a script's workflow over many prompts in several worker processes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="queue prompts (if given) and work through the queue")
+    run_parser.add_argument("--out", required=True, help="directory for the queue and the result shards")
+    run_parser.add_argument("--input", metavar="PATH", help="JSONL file of records to queue ('-' for stdin); omit to resume")
+    run_parser.add_argument("--field", default="prompt", help="record field holding the prompt")
+    run_parser.add_argument("--pattern", choices=UNATTENDED, default="concurrent", help="script whose workflow runs each prompt")
+    run_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="jobs in flight per worker")
+    run_parser.add_argument("--lease", type=float, default=120.0, help="seconds a claimed job stays reserved without a heartbeat")
+    run_parser.add_argument("--max-attempts", type=int, default=3, help="tries before a job is marked failed")
+    run_parser.add_argument("--job-timeout", type=float, default=600.0, help="seconds before a run is abandoned as failed")
+    run_parser.add_argument("--offline", metavar="LATENCY",
+                            help="use OfflineAgentProvider with this latency model instead of Azure (see LatencyModel.parse)")
+    run_parser.add_argument("--progress", type=float, default=10.0, help="seconds between progress lines")
+
+    status_parser = commands.add_parser("status", help="count jobs by state and summarize the shards")
+    status_parser.add_argument("--out", required=True, help="directory given to run")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.command == "status":
+        return status(args)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Constrained label outputs: agents that answer with one of a fixed set of labels.
+
+A classifier only has to say "Positive", "Negative" or "Feature request", yet a free-form call
+keeps generating (and billing) until the model decides to stop. LabelOutput is chat middleware
+for such agents. It caps the call's output tokens, reads the stream only until the reply has
+spelled out a whole label, then closes it, and replaces the reply with the label's canonical
+spelling. The typed value (an Enum member, or the label string) comes back from ``value``:
+
+    class FeedbackKind(str, Enum):
+        POSITIVE = "Positive"
+        NEGATIVE = "Negative"
+        FEATURE_REQUEST = "Feature request"
+
+    labels = LabelOutput(FeedbackKind, max_tokens=16)
+    classifier = AgentSpec(name="classifier", instructions=..., middleware=[cache, labels])
+    ...
+    kind = labels.value(message)   # FeedbackKind.POSITIVE, or None for an unrecognised reply
+    print(labels.report())
+
+Matching ignores case, punctuation and markdown around the label. A reply that does not start
+with a label ("The feedback is negative.") is read to the end, which the token cap keeps short,
+and the first label it mentions is used; a reply naming none is passed through unchanged.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterable, Awaitable, Callable, Sequence
+
+from agent_framework import ChatContext, ChatMessage, ChatMiddleware, ChatResponse, ChatResponseUpdate, Role, TextContent
+
+# Key of the canonical label on the reply's text content, so it survives the agent and workflow layers
+LABEL_PROPERTY = "label"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[\W_]+", " ", text.lower()).split())
+
+
+@dataclass
+class LabelStats:
+    calls: int = 0
+    stopped_early: int = 0
+    searched: int = 0
+    unparsed: int = 0
+    labels: Counter = field(default_factory=Counter)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "stopped_early": self.stopped_early,
+            "searched": self.searched,
+            "unparsed": self.unparsed,
+            "labels": dict(self.labels.most_common()),
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        line = (
+            f"labels: {s['calls']} calls | {s['stopped_early']} stopped as soon as the label was read | "
+            f"{s['searched']} found in a longer reply | {s['unparsed']} unrecognised"
+        )
+        if s["labels"]:
+            line += " | " + ", ".join(f"{label} {count}" for label, count in s["labels"].items())
+        return line
+
+
+class LabelOutput(ChatMiddleware):
+    """Chat middleware constraining an agent's reply to one of ``labels``.
+
+    ``labels`` is an Enum class (values are the label spellings) or a sequence of strings.
+    ``max_tokens`` caps each call's output unless the options already ask for less.
+    """
+
+    def __init__(self, labels: type[Enum] | Sequence[str], max_tokens: int = 16, stats: LabelStats | None = None):
+        if isinstance(labels, type) and issubclass(labels, Enum):
+            self._values = {str(member.value): member for member in labels}
+        else:
+            self._values = {str(label): str(label) for label in labels}
+        if not self._values:
+            raise ValueError("LabelOutput needs at least one label")
+        self._forms = {_normalize(label): label for label in self._values}
+        self.max_tokens = max_tokens
+        self.stats = stats or LabelStats()
+
+    # region Decoding
+
+    def _prefix(self, text: str, complete: bool) -> tuple[str | None, bool]:
+        """(label, undecided) for a reply that should start with a label.
+
+        The label is returned once no longer label could still follow; ``undecided`` means
+        more text is needed, and (None, False) that the reply does not start with a label.
+        """
+        norm = _normalize(text)
+        if not norm:
+            return None, not complete
+        matched = [form for form in self._forms if norm == form or norm.startswith(form + " ")]
+        pending = [form for form in self._forms if form.startswith(norm) and form != norm]
+        if pending and not complete:
+            return None, True
+        if matched:
+            return self._forms[max(matched, key=len)], False
+        return None, False
+
+    def _search(self, text: str) -> str | None:
+        """The first label mentioned anywhere in ``text``, preferring the longer of two at one spot."""
+        norm = f" {_normalize(text)} "
+        found = [(norm.find(f" {form} "), -len(form), form) for form in self._forms if f" {form} " in norm]
+        return self._forms[min(found)[2]] if found else None
+
+    def decode(self, text: str) -> str | None:
+        """Canonical label for a complete reply, or None."""
+        label, _ = self._prefix(text, complete=True)
+        return label or self._search(text)
+
+    def value(self, message: ChatMessage) -> Any:
+        """Typed label of an agent reply (Enum member or string), or None when it names no label."""
+        for content in message.contents:
+            label = (getattr(content, "additional_properties", None) or {}).get(LABEL_PROPERTY)
+            if label in self._values:
+                return self._values[label]
+        # Replies restored from a cache or checkpoint may only keep their text
+        label = self.decode(message.text or "")
+        return self._values[label] if label is not None else None
+
+    # endregion
+
+    def _count(self, label: str | None, searched: bool = False) -> None:
+        if label is None:
+            self.stats.unparsed += 1
+        else:
+            self.stats.labels[label] += 1
+            if searched:
+                self.stats.searched += 1
+
+    @staticmethod
+    def _content(label: str) -> TextContent:
+        return TextContent(text=label, additional_properties={LABEL_PROPERTY: label})
+
+    async def process(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> None:
+        self.stats.calls += 1
+        cap = min(self.max_tokens, (context.options or {}).get("max_tokens") or self.max_tokens)
+        context.options = {**(context.options or {}), "max_tokens": cap}
+        if context.is_streaming:
+            context.result = self._stream(context, next)
+            return
+        await next(context)
+        response = context.result
+        if not isinstance(response, ChatResponse) or any(c.type == "function_call" for m in response.messages for c in m.contents):
+            return
+        label = self._prefix(response.text, complete=True)[0]
+        searched = label is None
+        label = label or self._search(response.text)
+        self._count(label, searched)
+        if label is not None:
+            last = response.messages[-1] if response.messages else None
+            response.messages = [ChatMessage(
+                role=Role.ASSISTANT,
+                contents=[self._content(label)],
+                author_name=last.author_name if last is not None else None,
+                message_id=last.message_id if last is not None else None,
+            )]
+            response.value = self._values[label]
+            context.metadata[LABEL_PROPERTY] = label
+
+    async def _stream(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> AsyncIterable[Any]:
+        await next(context)
+        stream = aiter(context.result or _empty())
+        held: list[ChatResponseUpdate] = []
+        text = ""
+        label: str | None = None
+        prefixed = True
+        try:
+            async for update in stream:
+                if not update.text:
+                    if not held:
+                        yield update
+                    else:
+                        held.append(update)
+                    continue
+                held.append(update)
+                text += update.text
+                if prefixed:
+                    label, prefixed = self._prefix(text, complete=False)
+                if label is not None:
+                    # Read by the cassette recorder, which keeps this truncated stream
+                    context.metadata["stopped_early"] = True
+                    self.stats.stopped_early += 1
+                    break
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+        searched = label is None
+        if label is None:
+            label = self._prefix(text, complete=True)[0] if prefixed else None
+            searched = label is None
+            label = label or self._search(text)
+        self._count(label, searched)
+        if label is None:
+            # Nothing recognisable: pass the reply through as the model wrote it
+            for update in held:
+                yield update
+            return
+        context.metadata[LABEL_PROPERTY] = label
+        first = [update for update in held if update.text][0]
+        yield ChatResponseUpdate(
+            role=Role.ASSISTANT,
+            contents=[self._content(label)],
+            author_name=first.author_name,
+            message_id=first.message_id,
+            response_id=first.response_id,
+        )
+        for update in held:
+            if not update.text:
+                yield update
+
+    def report(self) -> str:
+        return self.stats.report()
+
+
+async def _empty() -> AsyncIterable[Any]:
+    return
+    yield
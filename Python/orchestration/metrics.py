@@ -0,0 +1,86 @@
+"""Latency and throughput bookkeeping."""
+import bisect
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of the samples (0.0 when there are none)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+@dataclass
+class LatencyStats:
+    """Collects per-item latencies (seconds) and derives throughput and percentiles."""
+
+    samples: list[float] = field(default_factory=list)
+    failures: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    finished: float | None = None
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        self.samples.append(seconds)
+        if not ok:
+            self.failures += 1
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> dict[str, float]:
+        elapsed = self.elapsed
+        return {
+            "count": self.count,
+            "failures": self.failures,
+            "elapsed_s": round(elapsed, 3),
+            "per_min": round(self.count / elapsed * 60, 1) if elapsed > 0 else 0.0,
+            "p50_ms": round(percentile(self.samples, 50) * 1000, 1),
+            "p99_ms": round(percentile(self.samples, 99) * 1000, 1),
+        }
+
+    def report(self, label: str = "records") -> str:
+        s = self.summary()
+        return (
+            f"{s['count']} {label} ({s['failures']} failed) in {s['elapsed_s']}s | "
+            f"{s['per_min']} {label}/min | p50 {s['p50_ms']} ms | p99 {s['p99_ms']} ms"
+        )
+
+
+class RollingPercentile:
+    """Percentiles over the most recent ``window`` samples, kept sorted as they arrive."""
+
+    def __init__(self, window: int = 256):
+        self.window = window
+        self._recent: deque[float] = deque()
+        self._sorted: list[float] = []
+
+    def record(self, value: float) -> None:
+        if len(self._recent) == self.window:
+            old = self._recent.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._recent.append(value)
+        bisect.insort(self._sorted, value)
+
+    @property
+    def count(self) -> int:
+        return len(self._sorted)
+
+    def percentile(self, pct: float) -> float:
+        if not self._sorted:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * len(self._sorted)))
+        return self._sorted[min(rank, len(self._sorted)) - 1]
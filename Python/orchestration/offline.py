@@ -0,0 +1,411 @@
+"""Offline stand-in for AzureAIProjectAgentProvider / AzureAIAgentsProvider.
+
+OfflineAgentProvider.create_agent has the same signature as the Azure providers but returns a
+ChatAgent backed by OfflineChatClient, which never leaves the process. Replies are scripted per
+agent or rendered from a template, with configurable latency, streaming chunk rate, tool-call
+emission and injected errors (see OfflineProfile). The client also understands the framework's
+own protocol prompts (group chat speaker selection, Magentic progress ledger, handoff tools) so
+every orchestration pattern in this folder runs end to end without Azure.
+"""
+import asyncio
+import contextvars
+import json
+import random
+import re
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterable, MutableSequence, Sequence
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any
+
+from agent_framework import (
+    AIFunction,
+    BaseChatClient,
+    ChatAgent,
+    ChatMessage,
+    ChatResponse,
+    ChatResponseUpdate,
+    FunctionCallContent,
+    Role,
+    TextContent,
+    UsageContent,
+    UsageDetails,
+    use_chat_middleware,
+    use_function_invocation,
+)
+from agent_framework.exceptions import ServiceResponseException
+
+
+@dataclass
+class LatencyModel:
+    """Latency distribution in seconds: fixed, uniform, normal or lognormal."""
+
+    kind: str = "fixed"
+    mean: float = 0.0
+    spread: float = 0.0
+
+    @classmethod
+    def fixed(cls, seconds: float) -> "LatencyModel":
+        return cls("fixed", seconds)
+
+    @classmethod
+    def uniform(cls, low: float, high: float) -> "LatencyModel":
+        return cls("uniform", (low + high) / 2, (high - low) / 2)
+
+    @classmethod
+    def lognormal(cls, median: float, sigma: float = 0.5) -> "LatencyModel":
+        """Heavy-tailed model; median in seconds, sigma of the underlying normal."""
+        return cls("lognormal", median, sigma)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Parse "0.2", "uniform:0.1:0.3", "normal:0.2:0.05" or "lognormal:0.2:0.6"."""
+        parts = spec.split(":")
+        if len(parts) == 1:
+            return cls.fixed(float(parts[0]))
+        kind, a, b = parts[0], float(parts[1]), float(parts[2])
+        if kind == "uniform":
+            return cls.uniform(a, b)
+        if kind in ("normal", "lognormal"):
+            return cls(kind, a, b)
+        raise ValueError(f"Unknown latency model '{kind}'")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.mean
+        elif self.kind == "uniform":
+            value = rng.uniform(self.mean - self.spread, self.mean + self.spread)
+        elif self.kind == "normal":
+            value = rng.gauss(self.mean, self.spread)
+        elif self.kind == "lognormal":
+            value = self.mean * rng.lognormvariate(0.0, self.spread) if self.mean > 0 else 0.0
+        else:
+            raise ValueError(f"Unknown latency model '{self.kind}'")
+        return max(0.0, value)
+
+
+@dataclass
+class OfflineProfile:
+    """Behaviour of every agent created by an OfflineAgentProvider.
+
+    Attributes:
+        latency: Time to first token for each model call.
+        tokens_per_second: Streaming rate after the first token (0 streams instantly).
+        chunk_tokens: Tokens per streamed chunk.
+        reply_tokens: Pad templated replies to roughly this many tokens (0 leaves them as is).
+        template: Reply template; receives {agent} and {input} (the last user text, shortened).
+        replies: Scripted replies per agent name, either a list cycled in order or a
+            callable(agent_name, messages) -> str.
+        tool_call_rate: Probability that an agent with function tools calls one on a fresh turn.
+        handoff_rate: Probability that an agent with only handoff tools hands off.
+        error_rate: Probability that a call raises ServiceResponseException.
+        quota_rpm: Requests per minute the simulated deployment accepts across all agents of a
+            provider; further calls fail with a 429 carrying Retry-After (0 means no quota).
+        magentic_rounds: Progress-ledger rounds before a Magentic task is reported satisfied.
+        provision_latency: Simulated create_agent round trip.
+        seed: Seed for the shared random generator (None for non-deterministic runs).
+    """
+
+    latency: LatencyModel = field(default_factory=lambda: LatencyModel.fixed(0.05))
+    tokens_per_second: float = 400.0
+    chunk_tokens: int = 4
+    reply_tokens: int = 0
+    template: str = "{agent}: {input}"
+    replies: dict[str, Any] = field(default_factory=dict)
+    tool_call_rate: float = 1.0
+    handoff_rate: float = 1.0
+    error_rate: float = 0.0
+    quota_rpm: float = 0.0
+    magentic_rounds: int = 2
+    provision_latency: LatencyModel = field(default_factory=lambda: LatencyModel.fixed(0.0))
+    seed: int | None = None
+
+
+@dataclass
+class SimulationMeter:
+    """Accumulates simulated model time and tokens for the run that installs it in current_meter."""
+
+    calls: int = 0
+    model_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+# Set per workflow run so the benchmark can separate model time from orchestration time.
+# Tasks spawned by the workflow runner copy the context, so they all feed the same meter.
+current_meter: contextvars.ContextVar[SimulationMeter | None] = contextvars.ContextVar("offline_meter", default=None)
+
+
+class OfflineThrottleError(Exception):
+    """Simulated HTTP 429, shaped like the SDK errors (``status_code`` and ``response.headers``)."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded; retry after {retry_after:.2f}s")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after-ms": str(int(retry_after * 1000))})
+
+
+class OfflineQuota:
+    """Sliding one-minute window of accepted requests, shared by the clients of one provider."""
+
+    def __init__(self, rpm: float):
+        self.rpm = rpm
+        self._accepted: deque[float] = deque()
+
+    def check(self) -> None:
+        now = time.monotonic()
+        while self._accepted and now - self._accepted[0] >= 60.0:
+            self._accepted.popleft()
+        if len(self._accepted) >= self.rpm:
+            raise OfflineThrottleError(60.0 - (now - self._accepted[0]))
+        self._accepted.append(now)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _last_user_text(messages: Sequence[ChatMessage]) -> str:
+    for msg in reversed(messages):
+        if msg.role == Role.USER and msg.text:
+            return msg.text
+    # Context policies may leave only other agents' replies
+    return next((msg.text for msg in reversed(messages) if msg.text), "")
+
+
+def _fill_schema(schema: dict[str, Any], defs: dict[str, Any]) -> Any:
+    """Minimal value satisfying a (pydantic-generated) JSON schema."""
+    if "$ref" in schema:
+        return _fill_schema(defs[schema["$ref"].split("/")[-1]], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        return _fill_schema(schema["anyOf"][0], defs)
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: _fill_schema(prop, defs) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return []
+    return {"string": "", "boolean": False, "integer": 0, "number": 0.0, "null": None}.get(kind, None)
+
+
+@use_function_invocation
+@use_chat_middleware
+class OfflineChatClient(BaseChatClient):
+    """Chat client that fabricates replies locally according to an OfflineProfile."""
+
+    OTEL_PROVIDER_NAME = "offline"
+
+    def __init__(self, agent_name: str, profile: OfflineProfile, rng: random.Random,
+                 quota: OfflineQuota | None = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.agent_name = agent_name
+        self.profile = profile
+        self._rng = rng
+        self._quota = quota
+        self._turn = 0
+
+    # region Reply selection
+
+    def _reply(self, messages: Sequence[ChatMessage], options: dict[str, Any]) -> ChatMessage:
+        last = messages[-1] if messages else None
+        user_text = _last_user_text(messages)
+
+        response_format = options.get("response_format")
+        if isinstance(response_format, type) and hasattr(response_format, "model_json_schema"):
+            return self._text(json.dumps(self._structured_reply(response_format, messages, user_text)))
+        if '"is_request_satisfied"' in user_text:
+            return self._text(json.dumps(self._progress_ledger(messages, user_text)))
+
+        # After a tool result, summarise it instead of calling another tool
+        if last is not None and last.role != Role.TOOL:
+            call = self._maybe_tool_call(options.get("tools") or [], user_text)
+            if call is not None:
+                return ChatMessage(role=Role.ASSISTANT, contents=[call], author_name=self.agent_name)
+
+        scripted = self.profile.replies.get(self.agent_name)
+        if callable(scripted):
+            text = scripted(self.agent_name, messages)
+        elif scripted:
+            text = scripted[self._turn % len(scripted)]
+        else:
+            snippet = " ".join(user_text.split())[:80]
+            if last is not None and last.role == Role.TOOL:
+                snippet = " ".join(str(c.result) for c in last.contents if c.type == "function_result")[:80]
+            text = self.profile.template.format(agent=self.agent_name, input=snippet)
+        self._turn += 1
+        padding = self.profile.reply_tokens - estimate_tokens(text)
+        if padding > 0:
+            text += " " + " ".join(["lorem"] * padding)
+        return self._text(text)
+
+    def _cap(self, reply: ChatMessage, options: dict[str, Any]) -> ChatMessage:
+        """Cut the reply at the request's max_tokens, as a deployment would."""
+        limit = options.get("max_tokens")
+        if limit and reply.text and estimate_tokens(reply.text) > limit:
+            return self._text(reply.text[: limit * 4])
+        return reply
+
+    def _text(self, text: str) -> ChatMessage:
+        return ChatMessage(role=Role.ASSISTANT, text=text, author_name=self.agent_name)
+
+    def _maybe_tool_call(self, tools: Sequence[Any], user_text: str) -> FunctionCallContent | None:
+        functions = [t for t in tools if isinstance(t, AIFunction)]
+        handoffs = [t for t in functions if t.name.startswith("handoff_to_")]
+        regular = [t for t in functions if not t.name.startswith("handoff_to_")]
+
+        if regular and self._rng.random() < self.profile.tool_call_rate:
+            tool = regular[0]
+            digits = re.search(r"\d{3,}", user_text)
+            arguments = {
+                name: (digits.group(0) if digits else "1001") if prop.get("type") == "string" else _fill_schema(prop, {})
+                for name, prop in tool.parameters().get("properties", {}).items()
+            }
+            return FunctionCallContent(call_id=f"call_{uuid.uuid4().hex[:8]}", name=tool.name, arguments=arguments)
+
+        if handoffs and not regular and self._rng.random() < self.profile.handoff_rate:
+            # Prefer a target whose name appears in the request ("return" -> handoff_to_returnAgent)
+            lowered = user_text.lower()
+            target = next(
+                (t for t in handoffs if t.name[len("handoff_to_"):].lower().removesuffix("agent") in lowered),
+                handoffs[0],
+            )
+            return FunctionCallContent(call_id=f"call_{uuid.uuid4().hex[:8]}", name=target.name, arguments={})
+        return None
+
+    def _structured_reply(self, model: type, messages: Sequence[ChatMessage], user_text: str) -> dict[str, Any]:
+        schema = model.model_json_schema()  # type: ignore[attr-defined]
+        value = _fill_schema(schema, schema.get("$defs", {}))
+        if {"terminate", "next_speaker"} <= set(value):
+            # Group chat agent orchestrator: let every participant speak once, in listed order
+            names = re.findall(r"^(\w[\w-]*): ", user_text.split("descriptions:", 1)[-1], re.MULTILINE)
+            spoken = sum(1 for m in messages if m.role == Role.ASSISTANT and m.author_name in names)
+            done = not names or spoken >= len(names)
+            value.update(
+                terminate=done,
+                reason="offline round-robin",
+                next_speaker=None if done else names[spoken % len(names)],
+                final_message="Offline group chat complete." if done else None,
+            )
+        return value
+
+    def _progress_ledger(self, messages: Sequence[ChatMessage], user_text: str) -> dict[str, Any]:
+        match = re.search(r"select from: ([^)]+)\)", user_text)
+        names = [n.strip() for n in match.group(1).split(",")] if match else [self.agent_name]
+        rounds = sum(1 for m in messages if m.role == Role.ASSISTANT and m.author_name in names)
+        satisfied = rounds >= self.profile.magentic_rounds
+        return {
+            "is_request_satisfied": {"reason": "offline", "answer": satisfied},
+            "is_in_loop": {"reason": "offline", "answer": False},
+            "is_progress_being_made": {"reason": "offline", "answer": True},
+            "next_speaker": {"reason": "offline", "answer": names[rounds % len(names)]},
+            "instruction_or_question": {"reason": "offline", "answer": "Continue with the next step."},
+        }
+
+    # endregion
+
+    def _before_call(self) -> float:
+        if self._rng.random() < self.profile.error_rate:
+            raise ServiceResponseException(f"Injected offline error for agent '{self.agent_name}'")
+        if self._quota is not None:
+            try:
+                self._quota.check()
+            except OfflineThrottleError as exc:
+                raise ServiceResponseException(f"Offline quota exceeded for agent '{self.agent_name}'", inner_exception=exc) from exc
+        return self.profile.latency.sample(self._rng)
+
+    def _stream_delay(self, tokens: int) -> float:
+        return tokens / self.profile.tokens_per_second if self.profile.tokens_per_second > 0 else 0.0
+
+    def _meter(self, seconds: float, messages: Sequence[ChatMessage], reply: ChatMessage) -> UsageDetails:
+        prompt = sum(estimate_tokens(m.text or "") for m in messages)
+        completion = estimate_tokens(reply.text or "") if reply.text else 8
+        meter = current_meter.get()
+        if meter is not None:
+            meter.calls += 1
+            meter.model_seconds += seconds
+            meter.prompt_tokens += prompt
+            meter.completion_tokens += completion
+        return UsageDetails(input_token_count=prompt, output_token_count=completion, total_token_count=prompt + completion)
+
+    async def _inner_get_response(
+        self, *, messages: MutableSequence[ChatMessage], options: dict[str, Any], **kwargs: Any
+    ) -> ChatResponse:
+        first_token = self._before_call()
+        reply = self._cap(self._reply(messages, options), options)
+        seconds = first_token + self._stream_delay(estimate_tokens(reply.text or ""))
+        await asyncio.sleep(seconds)
+        usage = self._meter(seconds, messages, reply)
+        return ChatResponse(messages=[reply], response_id=f"offline_{uuid.uuid4().hex[:12]}", usage_details=usage)
+
+    async def _inner_get_streaming_response(
+        self, *, messages: MutableSequence[ChatMessage], options: dict[str, Any], **kwargs: Any
+    ) -> AsyncIterable[ChatResponseUpdate]:
+        start = time.perf_counter()
+        first_token = self._before_call()
+        reply = self._cap(self._reply(messages, options), options)
+        message_id = f"offline_msg_{uuid.uuid4().hex[:12]}"
+        await asyncio.sleep(first_token)
+
+        if not reply.text:
+            yield ChatResponseUpdate(role=Role.ASSISTANT, contents=reply.contents, message_id=message_id)
+        else:
+            words = reply.text.split(" ")
+            step = max(1, self.profile.chunk_tokens)
+            for i in range(0, len(words), step):
+                if i:
+                    await asyncio.sleep(self._stream_delay(step))
+                chunk = " ".join(words[i : i + step]) + (" " if i + step < len(words) else "")
+                yield ChatResponseUpdate(
+                    role=Role.ASSISTANT, contents=[TextContent(text=chunk)], author_name=self.agent_name, message_id=message_id
+                )
+        usage = self._meter(time.perf_counter() - start, messages, reply)
+        yield ChatResponseUpdate(role=Role.ASSISTANT, contents=[UsageContent(details=usage)], message_id=message_id)
+
+
+class OfflineAgentProvider:
+    """Drop-in replacement for the Azure agent providers that creates offline agents."""
+
+    def __init__(self, profile: OfflineProfile | None = None, **kwargs: Any):
+        self.profile = profile or OfflineProfile()
+        self._rng = random.Random(self.profile.seed)
+        self._quota = OfflineQuota(self.profile.quota_rpm) if self.profile.quota_rpm else None
+        self.created: list[str] = []
+
+    async def __aenter__(self) -> "OfflineAgentProvider":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        pass
+
+    async def create_agent(
+        self,
+        name: str,
+        model: str | None = None,
+        instructions: str | None = None,
+        description: str | None = None,
+        tools: Any = None,
+        default_options: dict[str, Any] | None = None,
+        middleware: Sequence[Any] | None = None,
+        context_provider: Any = None,
+    ) -> ChatAgent:
+        await asyncio.sleep(self.profile.provision_latency.sample(self._rng))
+        self.created.append(name)
+        return ChatAgent(
+            chat_client=OfflineChatClient(name, self.profile, self._rng, self._quota),
+            id=f"offline_{name}",
+            name=name,
+            description=description,
+            instructions=instructions,
+            model_id=model or "offline",
+            tools=tools,
+            default_options=default_options,
+            middleware=middleware,
+            context_provider=context_provider,
+        )
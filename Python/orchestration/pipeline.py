@@ -0,0 +1,219 @@
+"""Dependency-aware pipelines: stages run as soon as the outputs they read are ready.
+
+SequentialBuilder runs every participant after the previous one, even when a stage never looks
+at its predecessor's reply. PipelineBuilder takes the dependencies instead: each stage names the
+earlier stages whose replies it reads ("input" is the original prompt, and the default), and a
+single executor starts every stage the moment its inputs are done, so independent stages overlap.
+
+    workflow = (
+        PipelineBuilder(stats)
+        .stage(summarizer)                                   # reads the input
+        .stage(classifier)                                   # reads the input, runs alongside
+        .stage(action, reads=["summarizer", "classifier"])   # starts when both are done
+        .build()
+    )
+
+The output is a PipelineConversation: the same ``[prompt, replies...]`` list SequentialBuilder
+produces (stages in declaration order), plus per-stage timings and the critical path, the chain
+of stages that determined the wall time, next to the sequential baseline (the sum of stage times).
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Sequence
+
+from agent_framework import (
+    AgentProtocol,
+    AgentResponse,
+    AgentRunUpdateEvent,
+    ChatMessage,
+    Executor,
+    ExecutorInvokedEvent,
+    Role,
+    Workflow,
+    WorkflowBuilder,
+    WorkflowContext,
+    handler,
+)
+from typing_extensions import Never
+
+from .executors import InputDispatcher
+
+INPUT = "input"
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    agent: AgentProtocol
+    reads: tuple[str, ...] = (INPUT,)
+
+
+class PipelineConversation(list):
+    """list[ChatMessage] output with the timing of each stage.
+
+    Attributes:
+        spans: Stage name to (start, end) seconds since the run began.
+        critical_path: Stages, in order, whose chain ended last and so set the wall time.
+    """
+
+    def __init__(self, messages: Sequence[ChatMessage], spans: dict[str, tuple[float, float]], critical_path: list[str]):
+        super().__init__(messages)
+        self.spans = spans
+        self.critical_path = critical_path
+
+    @property
+    def wall_seconds(self) -> float:
+        return max((end for _, end in self.spans.values()), default=0.0)
+
+    @property
+    def critical_seconds(self) -> float:
+        return sum(self.spans[name][1] - self.spans[name][0] for name in self.critical_path)
+
+    @property
+    def sequential_seconds(self) -> float:
+        """What the same stage times would add up to run one after another."""
+        return sum(end - start for start, end in self.spans.values())
+
+    def report(self) -> str:
+        speedup = self.sequential_seconds / self.wall_seconds if self.wall_seconds else 1.0
+        return (
+            f"pipeline: {self.wall_seconds:.2f}s wall | critical path {' -> '.join(self.critical_path)} "
+            f"{self.critical_seconds:.2f}s | sequential baseline {self.sequential_seconds:.2f}s ({speedup:.2f}x)"
+        )
+
+
+@dataclass
+class PipelineStats:
+    """Totals over many pipeline runs, for batch reports."""
+
+    runs: int = 0
+    wall_seconds: float = 0.0
+    critical_seconds: float = 0.0
+    sequential_seconds: float = 0.0
+    critical_paths: dict[str, int] = field(default_factory=dict)
+
+    def record(self, output: PipelineConversation) -> None:
+        self.runs += 1
+        self.wall_seconds += output.wall_seconds
+        self.critical_seconds += output.critical_seconds
+        self.sequential_seconds += output.sequential_seconds
+        path = " -> ".join(output.critical_path)
+        self.critical_paths[path] = self.critical_paths.get(path, 0) + 1
+
+    def summary(self) -> dict[str, Any]:
+        runs = self.runs or 1
+        return {
+            "runs": self.runs,
+            "avg_wall_s": round(self.wall_seconds / runs, 3),
+            "avg_critical_path_s": round(self.critical_seconds / runs, 3),
+            "avg_sequential_s": round(self.sequential_seconds / runs, 3),
+            "speedup": round(self.sequential_seconds / self.wall_seconds, 2) if self.wall_seconds else 1.0,
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        paths = ", ".join(f"{path} x{count}" for path, count in sorted(self.critical_paths.items(), key=lambda i: -i[1]))
+        return (
+            f"pipeline: {s['runs']} runs | avg {s['avg_wall_s']}s wall, critical path {s['avg_critical_path_s']}s, "
+            f"sequential baseline {s['avg_sequential_s']}s ({s['speedup']}x) | critical paths: {paths or 'none'}"
+        )
+
+
+def _critical_path(stages: Sequence[Stage], spans: dict[str, tuple[float, float]]) -> list[str]:
+    """Walk back from the stage that finished last through the input that finished last."""
+    if not spans:
+        return []
+    by_name = {stage.name: stage for stage in stages}
+    name: str | None = max(spans, key=lambda n: spans[n][1])
+    path = []
+    while name is not None:
+        path.append(name)
+        inputs = [read for read in by_name[name].reads if read in spans]
+        name = max(inputs, key=lambda n: spans[n][1]) if inputs else None
+    return path[::-1]
+
+
+class PipelineExecutor(Executor):
+    """Runs the stages as a dependency graph and yields one PipelineConversation."""
+
+    def __init__(self, stages: Sequence[Stage], stats: PipelineStats | None = None, id: str = "pipeline"):
+        super().__init__(id=id)
+        self._stages = list(stages)
+        self._stats = stats
+
+    @handler
+    async def run_pipeline(self, conversation: list[ChatMessage], ctx: WorkflowContext[Never, list[ChatMessage]]) -> None:
+        prompt = [m for m in conversation if m.role == Role.USER]
+        start = time.perf_counter()
+        done: dict[str, asyncio.Future[list[ChatMessage]]] = {
+            stage.name: asyncio.get_running_loop().create_future() for stage in self._stages
+        }
+        spans: dict[str, tuple[float, float]] = {}
+
+        async def run_stage(stage: Stage) -> None:
+            inputs: list[ChatMessage] = []
+            for read in stage.reads:
+                inputs.extend(prompt if read == INPUT else await done[read])
+            began = time.perf_counter() - start
+            if ctx.is_streaming():
+                # Stages share this executor's invocation; mark each one so time-to-first-token
+                # is measured from when the stage started rather than from the start of the run
+                await ctx.add_event(ExecutorInvokedEvent(stage.name))
+            response = await self._call(stage, inputs, ctx)
+            spans[stage.name] = (began, time.perf_counter() - start)
+            done[stage.name].set_result(list(response.messages))
+
+        tasks = [asyncio.create_task(run_stage(stage)) for stage in self._stages]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        messages = list(conversation)
+        for stage in self._stages:
+            messages.extend(done[stage.name].result())
+        output = PipelineConversation(messages, spans, _critical_path(self._stages, spans))
+        if self._stats is not None:
+            self._stats.record(output)
+        await ctx.yield_output(output)
+
+    async def _call(self, stage: Stage, conversation: list[ChatMessage], ctx: WorkflowContext[Any, Any]) -> AgentResponse:
+        agent = stage.agent
+        if not ctx.is_streaming():
+            return await agent.run(conversation)
+        updates = []
+        async for update in agent.run_stream(conversation):
+            updates.append(update)
+            await ctx.add_event(AgentRunUpdateEvent(stage.name, update))
+        return AgentResponse.from_agent_run_response_updates(updates)
+
+
+class PipelineBuilder:
+    """Declares stages and what they read; ``build`` returns a Workflow like SequentialBuilder's."""
+
+    def __init__(self, stats: PipelineStats | None = None):
+        self._stages: list[Stage] = []
+        self._stats = stats
+
+    def stage(self, agent: AgentProtocol, reads: Sequence[str] = (INPUT,), name: str | None = None) -> "PipelineBuilder":
+        """Add a stage reading the replies of the named earlier stages ("input" for the prompt)."""
+        name = name or agent.name or agent.id
+        known = {INPUT, *(stage.name for stage in self._stages)}
+        if name in known:
+            raise ValueError(f"duplicate pipeline stage {name!r}")
+        unknown = [read for read in reads if read not in known]
+        if unknown:
+            raise ValueError(f"stage {name!r} reads {unknown}, which are not earlier stages (known: {sorted(known)})")
+        self._stages.append(Stage(name, agent, tuple(reads) or (INPUT,)))
+        return self
+
+    def build(self) -> Workflow:
+        if not self._stages:
+            raise ValueError("a pipeline needs at least one stage")
+        dispatcher = InputDispatcher(id="pipeline_input")
+        pipeline = PipelineExecutor(self._stages, self._stats)
+        return WorkflowBuilder().set_start_executor(dispatcher).add_edge(dispatcher, pipeline).build()
@@ -0,0 +1,333 @@
+"""Plan reuse and policy-based plan review for Magentic workflows.
+
+PlanCache remembers approved plans keyed by their task and finds them again for similar tasks
+(cosine similarity over word counts). PlanCachingManager is a StandardMagenticManager that
+consults the cache before planning. It reuses a plan verbatim for a near-identical task, or
+hands the closest one to the model as a starting point. PlanReviewPolicy answers
+MagenticPlanReviewRequests: it approves cached or low-risk plans on its own, asks a human
+otherwise, and applies a default action when nobody answers in time.
+
+    plans = PlanCache(".magentic_plans.sqlite")
+    manager = PlanCachingManager(manager_agent, plans, max_round_count=10)
+    workflow = MagenticBuilder().participants([...]).with_standard_manager(manager).with_plan_review().build()
+    policy = PlanReviewPolicy(manager, auto_approve={"cached", "low-risk"}, timeout=60, default="approve")
+
+    # for each RequestInfoEvent carrying a MagenticPlanReviewRequest
+    decision = await policy.review(event.data, ask=lambda: prompt_with_timeout("> ", policy.timeout))
+"""
+import asyncio
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Sequence
+
+from agent_framework import ChatMessage, MagenticPlanReviewRequest, MagenticPlanReviewResponse, Role, StandardMagenticManager
+from agent_framework._workflows._magentic import MAGENTIC_MANAGER_NAME, MagenticContext, _MagenticTaskLedger, _team_block
+
+from .routing import tokenize
+
+REUSE_HINT = """
+
+A plan was approved earlier for a similar task. Reuse the steps that still apply and adapt the rest:
+
+{plan}
+"""
+
+
+def similarity(a: Counter[str], b: Counter[str]) -> float:
+    """Cosine similarity of two word-count vectors."""
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[word] for word, count in a.items())
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+
+@dataclass
+class CachedPlan:
+    task: str
+    facts: str
+    plan: str
+    score: float = 1.0
+
+
+class PlanCache:
+    """Approved plans in a SQLite file (":memory:" for a per-process cache).
+
+    Lookups scan every stored task, which is fine for the hundreds of distinct tasks a
+    team accumulates; ``max_entries`` evicts the least recently used beyond that.
+    """
+
+    def __init__(self, path: str = ".magentic_plans.sqlite", threshold: float = 0.8, max_entries: int = 1000):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            "task TEXT PRIMARY KEY, words TEXT NOT NULL, facts TEXT NOT NULL, plan TEXT NOT NULL, "
+            "approved_at REAL NOT NULL, used_at REAL NOT NULL, uses INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def lookup(self, task: str) -> CachedPlan | None:
+        """Closest approved plan with similarity at or above ``threshold``."""
+        words = Counter(tokenize(task))
+        best: CachedPlan | None = None
+        for stored_task, stored_words, facts, plan in self._db.execute("SELECT task, words, facts, plan FROM plans"):
+            score = similarity(words, Counter(json.loads(stored_words)))
+            if score >= self.threshold and (best is None or score > best.score):
+                best = CachedPlan(stored_task, facts, plan, score)
+        if best is not None:
+            self._db.execute("UPDATE plans SET used_at = ?, uses = uses + 1 WHERE task = ?", (time.time(), best.task))
+        return best
+
+    def store(self, task: str, facts: str, plan: str) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT INTO plans (task, words, facts, plan, approved_at, used_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(task) DO UPDATE SET facts = excluded.facts, plan = excluded.plan, approved_at = excluded.approved_at",
+            (task, json.dumps(Counter(tokenize(task))), facts, plan, now, now),
+        )
+        self._db.execute(
+            "DELETE FROM plans WHERE task IN (SELECT task FROM plans ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class PlanCachingManager(StandardMagenticManager):
+    """StandardMagenticManager that starts from an approved plan for a similar task.
+
+    At or above ``reuse_threshold`` the cached facts and plan are used as they are and both
+    planning calls are skipped; between the cache threshold and that, the cached plan is added
+    to the planning prompt. ``plan_source`` records where the current plan came from.
+    """
+
+    def __init__(self, agent: Any, cache: PlanCache, reuse_threshold: float = 0.97, **kwargs: Any):
+        super().__init__(agent, **kwargs)
+        self.cache = cache
+        self.reuse_threshold = reuse_threshold
+        self.plan_source = "model"
+        self.cached: CachedPlan | None = None
+        self.task: str | None = None
+
+    async def plan(self, magentic_context: MagenticContext) -> ChatMessage:
+        self.task = magentic_context.task
+        self.cached = self.cache.lookup(magentic_context.task)
+        if self.cached is None:
+            self.plan_source = "model"
+            return await super().plan(magentic_context)
+        if self.cached.score < self.reuse_threshold:
+            self.plan_source = "seeded"
+            base_prompt = self.task_ledger_plan_prompt
+            self.task_ledger_plan_prompt = base_prompt + REUSE_HINT.replace("{plan}", self.cached.plan.replace("{", "{{").replace("}", "}}"))
+            try:
+                return await super().plan(magentic_context)
+            finally:
+                self.task_ledger_plan_prompt = base_prompt
+
+        # Near-identical task: the same ledger the model would have produced, without the two calls
+        self.plan_source = "cached"
+        team_text = _team_block(magentic_context.participant_descriptions)
+        facts_user = ChatMessage(role=Role.USER, text=self.task_ledger_facts_prompt.format(task=magentic_context.task))
+        facts_msg = ChatMessage(role=Role.ASSISTANT, text=self.cached.facts)
+        plan_user = ChatMessage(role=Role.USER, text=self.task_ledger_plan_prompt.format(team=team_text))
+        plan_msg = ChatMessage(role=Role.ASSISTANT, text=self.cached.plan)
+        self.task_ledger = _MagenticTaskLedger(facts=facts_msg, plan=plan_msg)
+        magentic_context.chat_history.extend([facts_user, facts_msg, plan_user, plan_msg])
+        combined = self.task_ledger_full_prompt.format(
+            task=magentic_context.task, team=team_text, facts=facts_msg.text, plan=plan_msg.text
+        )
+        return ChatMessage(role=Role.ASSISTANT, text=combined, author_name=MAGENTIC_MANAGER_NAME)
+
+    async def replan(self, magentic_context: MagenticContext) -> ChatMessage:
+        self.plan_source = "model"
+        return await super().replan(magentic_context)
+
+    def on_checkpoint_save(self) -> dict[str, Any]:
+        state = super().on_checkpoint_save()
+        state.update(task=self.task, plan_source=self.plan_source)
+        return state
+
+    def on_checkpoint_restore(self, state: dict[str, Any]) -> None:
+        super().on_checkpoint_restore(state)
+        self.task = state.get("task")
+        self.plan_source = state.get("plan_source", "model")
+
+    def remember_approved(self) -> None:
+        """Store the current task ledger as the approved plan for the current task."""
+        if self.task is not None and self.task_ledger is not None:
+            self.cache.store(self.task, self.task_ledger.facts.text, self.task_ledger.plan.text)
+
+
+_STEP = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+", re.MULTILINE)
+DEFAULT_RISKY_PATTERNS = (
+    r"\bdelet(e|ing)\b", r"\bdrop\b", r"\bdeploy", r"\bpurchas", r"\bpay(ment)?\b", r"\bsend (an? )?e-?mail",
+    r"\bcredential", r"\bpassword", r"\bproduction\b",
+)
+
+
+def plan_steps(text: str) -> int:
+    """Bullet or numbered lines in a plan."""
+    return len(_STEP.findall(text))
+
+
+def is_low_risk(text: str, max_steps: int = 8, risky_patterns: Sequence[str] = DEFAULT_RISKY_PATTERNS) -> bool:
+    """A short plan that mentions none of the risky actions."""
+    if plan_steps(text) > max_steps:
+        return False
+    return not any(re.search(pattern, text, re.IGNORECASE) for pattern in risky_patterns)
+
+
+# Approvals that vouch for the plan itself, and so may be cached for later runs
+REVIEWED = ("human", "low-risk")
+
+
+@dataclass
+class ReviewDecision:
+    response: MagenticPlanReviewResponse | None
+    reason: str
+
+    @property
+    def abort(self) -> bool:
+        return self.response is None
+
+
+@dataclass
+class ReviewStats:
+    by_reason: dict[str, int] = field(default_factory=dict)
+    waited_seconds: float = 0.0
+
+    def report(self) -> str:
+        total = sum(self.by_reason.values())
+        reasons = ", ".join(f"{reason} {count}" for reason, count in self.by_reason.items()) or "none"
+        return f"plan review: {total} reviews ({reasons}) | {self.waited_seconds:.1f}s waiting on a human"
+
+
+class PlanReviewPolicy:
+    """Decide plan reviews without a human where the policy allows.
+
+    ``auto_approve`` may contain "cached" (the plan was reused from the cache) and "low-risk"
+    (``is_low_risk`` holds for the plan text). Replans after a stall always go to the human.
+    A human answer that does not arrive within ``timeout`` seconds (0 to never ask) falls back
+    to ``default``: "approve" or "abort". Plans a human or the low-risk check approved are stored
+    in the manager's cache; one approved only because nobody answered is not, so it is never
+    auto-approved as "cached" later.
+    """
+
+    def __init__(
+        self,
+        manager: PlanCachingManager | None = None,
+        auto_approve: set[str] | frozenset[str] = frozenset(),
+        timeout: float | None = None,
+        default: str = "approve",
+        max_steps: int = 8,
+        risky_patterns: Sequence[str] = DEFAULT_RISKY_PATTERNS,
+    ):
+        if default not in ("approve", "abort"):
+            raise ValueError(f"default must be 'approve' or 'abort', not '{default}'")
+        self.manager = manager
+        self.auto_approve = set(auto_approve)
+        self.timeout = timeout
+        self.default = default
+        self.max_steps = max_steps
+        self.risky_patterns = risky_patterns
+        self.stats = ReviewStats()
+
+    def automatic(self, request: MagenticPlanReviewRequest) -> str | None:
+        """Reason to approve without asking, or None."""
+        if request.is_stalled:
+            return None
+        if "cached" in self.auto_approve and self.manager is not None and self.manager.plan_source == "cached":
+            return "cached"
+        if "low-risk" in self.auto_approve and is_low_risk(request.plan.text or "", self.max_steps, self.risky_patterns):
+            return "low-risk"
+        return None
+
+    async def review(self, request: MagenticPlanReviewRequest, ask: Callable[[], Awaitable[str | None]] | None = None) -> ReviewDecision:
+        """Approve automatically, or ask; ``ask`` returns the human's reply, or None on timeout."""
+        reason = self.automatic(request)
+        if reason is not None:
+            return self._approve(reason)
+        reply = None
+        if ask is not None and self.timeout != 0:
+            start = time.perf_counter()
+            reply = await ask()
+            self.stats.waited_seconds += time.perf_counter() - start
+        if reply is None:
+            if self.default == "abort":
+                return self._count(ReviewDecision(None, "timeout-abort"))
+            return self._approve("timeout-approve")
+        if reply.strip() == "":
+            return self._approve("human")
+        return self._count(ReviewDecision(request.revise(reply), "human-revise"))
+
+    def _approve(self, reason: str) -> ReviewDecision:
+        if self.manager is not None and reason in REVIEWED:
+            self.manager.remember_approved()
+        return self._count(ReviewDecision(MagenticPlanReviewResponse.approve(), reason))
+
+    def _count(self, decision: ReviewDecision) -> ReviewDecision:
+        self.stats.by_reason[decision.reason] = self.stats.by_reason.get(decision.reason, 0) + 1
+        return decision
+
+
+async def prompt_with_timeout(prompt: str = "> ", timeout: float | None = None) -> str | None:
+    """One line from stdin, or None on timeout or end of input.
+
+    The read happens on a daemon thread, so a prompt nobody answers does not keep the
+    process alive the way a default-executor ``input`` call would. A read left over from an
+    earlier prompt that timed out cannot be cancelled; the line it returns was meant for that
+    prompt, so it is dropped and this prompt waits for the next one.
+    """
+    global _pending_line
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    try:
+        if _pending_line is not None and not _pending_line.done():
+            stale = await _wait_until(_pending_line, deadline)
+            if stale is None:
+                return None
+            print("(ignored a reply to an earlier prompt)")
+            sys.stdout.write(prompt)
+            sys.stdout.flush()
+        _pending_line = _read_line(loop)
+        return await _wait_until(_pending_line, deadline)
+    except asyncio.TimeoutError:
+        return None
+
+
+def _read_line(loop: asyncio.AbstractEventLoop) -> "asyncio.Future[str | None]":
+    future: asyncio.Future[str | None] = loop.create_future()
+
+    def read() -> None:
+        line = sys.stdin.readline()
+        result = line.rstrip("\n") if line else None
+        loop.call_soon_threadsafe(lambda: future.done() or future.set_result(result))
+
+    threading.Thread(target=read, daemon=True).start()
+    return future
+
+
+async def _wait_until(future: "asyncio.Future[str | None]", deadline: float | None) -> str | None:
+    timeout = None if deadline is None else max(0.0, deadline - asyncio.get_running_loop().time())
+    return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+
+_pending_line: asyncio.Future[str | None] | None = None
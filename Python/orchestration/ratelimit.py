@@ -0,0 +1,480 @@
+"""One scheduler for every model call in the process, so 429s are handled once instead of per agent.
+
+RateLimitScheduler admits calls in priority order (interactive turns before background batch
+work) against requests-per-minute and tokens-per-minute token buckets and an adaptive
+concurrency limit. The limit grows by one per round of successful calls and halves on
+throttling (AIMD). A ``Retry-After`` from the service pauses admission for everyone, and
+throttled calls are retried by the scheduler, not by each agent.
+
+It plugs in as chat middleware, so each model request an agent makes (including tool-call
+follow-ups) passes through it:
+
+    scheduler = shared_scheduler()          # AZURE_AI_RPM / AZURE_AI_TPM / AZURE_AI_MAX_CONCURRENCY
+    registry = AgentRegistry(client, middleware=[scheduler.middleware(INTERACTIVE)])
+    ...
+    print(scheduler.stats.report(), file=sys.stderr)
+
+Token use is estimated from the prompt before admission and corrected from the reported usage
+afterwards, so the TPM bucket tracks what the deployment actually counted.
+
+The SDK clients would otherwise retry a 429 on their own before the scheduler sees it, so open
+the Azure providers through ``scheduled_provider``, which builds their clients without that:
+
+    async with scheduled_provider(AzureAIProjectAgentProvider, credential) as client:
+        ...
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, TypeVar
+
+from agent_framework import ChatContext, ChatMiddleware, ChatResponse, ChatResponseUpdate
+
+from .metrics import LatencyStats
+
+T = TypeVar("T")
+
+# Lower runs first
+INTERACTIVE = 0
+NORMAL = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BATCH: "batch"}
+
+# Completion tokens assumed for a call that does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 500
+
+
+class TokenBucket:
+    """Refills continuously at ``per_minute / 60`` per second, holding at most ``burst``.
+
+    The level may go negative when actual usage turns out higher than reserved; later callers
+    then wait for the debt to be repaid.
+    """
+
+    def __init__(self, per_minute: float, burst: float | None = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken (requests larger than the bucket wait for a full one)."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.level -= amount
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) the difference between estimated and actual use."""
+        self.level = min(self.capacity, self.level - amount)
+
+
+def throttle_delay(exc: BaseException) -> float | None:
+    """Seconds the service asked us to wait if ``exc`` is (or wraps) a 429, 0.0 if it gave no hint.
+
+    None means the error is not throttling. The framework wraps SDK errors in
+    ServiceResponseException, so the cause chain is searched for the HTTP error.
+    """
+    seen = 0
+    while exc is not None and seen < 5:
+        response = getattr(exc, "response", None)
+        status = getattr(exc, "status_code", None) or getattr(response, "status_code", None)
+        if status == 429:
+            headers = getattr(response, "headers", None) or getattr(exc, "headers", None) or {}
+            return _retry_after(headers)
+        exc = exc.__cause__ or exc.__context__
+        seen += 1
+    return None
+
+
+def _retry_after(headers: Any) -> float:
+    value = headers.get("retry-after-ms") or headers.get("Retry-After-Ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+
+
+@dataclass
+class Ticket:
+    """An admitted call: returned by ``acquire`` and handed back to ``release``."""
+
+    priority: int
+    tokens: int
+    started: float
+    waited: float = 0.0
+
+
+@dataclass
+class SchedulerStats:
+    calls: int = 0
+    throttled: int = 0
+    retries: int = 0
+    gave_up: int = 0
+    paused_seconds: float = 0.0
+    max_queued: int = 0
+    tokens_reserved: int = 0
+    tokens_used: int = 0
+    waits: dict[int, LatencyStats] = field(default_factory=dict)
+
+    def wait_stats(self, priority: int) -> LatencyStats:
+        return self.waits.setdefault(priority, LatencyStats())
+
+    def summary(self, scheduler: "RateLimitScheduler | None" = None) -> dict[str, Any]:
+        # Every attempt is admitted separately, so calls includes the retries
+        summary: dict[str, Any] = {
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "throttle_rate": round(self.throttled / self.calls, 3) if self.calls else 0.0,
+            "retries": self.retries,
+            "gave_up": self.gave_up,
+            "paused_s": round(self.paused_seconds, 3),
+            "max_queued": self.max_queued,
+            "tokens_used": self.tokens_used,
+            "wait": {
+                PRIORITY_NAMES.get(priority, str(priority)): {
+                    "count": stats.count,
+                    "p50_ms": stats.summary()["p50_ms"],
+                    "p99_ms": stats.summary()["p99_ms"],
+                }
+                for priority, stats in sorted(self.waits.items())
+            },
+        }
+        if scheduler is not None:
+            summary.update(queued=scheduler.queued, in_flight=scheduler.in_flight, concurrency_limit=round(scheduler.limit, 1))
+        return summary
+
+    def report(self) -> str:
+        s = self.summary()
+        waits = ", ".join(f"{name} p50 {w['p50_ms']} / p99 {w['p99_ms']} ms" for name, w in s["wait"].items())
+        return (
+            f"ratelimit: {s['calls']} calls | {s['throttled']} throttled ({s['throttle_rate']:.1%}), {s['retries']} retried, "
+            f"{s['gave_up']} gave up | {s['paused_s']}s paused by Retry-After | queue max {s['max_queued']} | "
+            f"wait {waits or 'none'} | {s['tokens_used']} tokens"
+        )
+
+
+class RateLimitScheduler:
+    """Priority admission against RPM/TPM buckets and an AIMD concurrency limit, with retries on 429."""
+
+    def __init__(
+        self,
+        rpm: float | None = None,
+        tpm: float | None = None,
+        max_concurrency: int = 256,
+        min_concurrency: int = 1,
+        max_retries: int = 6,
+        backoff: float = 1.0,
+    ):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # Starts wide open; the first throttle sets the real level
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.stats = SchedulerStats()
+        self._waiting: list[tuple[int, int, asyncio.Future[float], int]] = []
+        self._order = itertools.count()
+        self._paused_until = 0.0
+        self._last_cut = 0.0
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._middleware: dict[int, RateLimitMiddleware] = {}
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future, _ in self._waiting if not future.done())
+
+    def middleware(self, priority: int = NORMAL) -> "RateLimitMiddleware":
+        """Chat middleware that sends an agent's model calls through this scheduler at ``priority``."""
+        if priority not in self._middleware:
+            self._middleware[priority] = RateLimitMiddleware(self, priority)
+        return self._middleware[priority]
+
+    async def acquire(self, priority: int = NORMAL, tokens: int = 1) -> Ticket:
+        """Wait until a call of ``tokens`` estimated tokens may start."""
+        future: asyncio.Future[float] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._order), future, tokens))
+        self.stats.max_queued = max(self.stats.max_queued, len(self._waiting))
+        queued_at = time.monotonic()
+        self._pump()
+        try:
+            started = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller gave up: hand the slot back
+                self.release(Ticket(priority, tokens, future.result()), failed=True)
+            raise
+        self.stats.wait_stats(priority).record(started - queued_at)
+        return Ticket(priority, tokens, started, started - queued_at)
+
+    def release(self, ticket: Ticket, *, used_tokens: int | None = None, throttled: bool = False,
+                failed: bool = False, retry_after: float = 0.0) -> None:
+        """Return a slot; successes widen the concurrency limit, throttles halve it, other failures leave it."""
+        now = time.monotonic()
+        self.in_flight -= 1
+        if throttled:
+            self.stats.throttled += 1
+            # Calls already in flight when the limit was cut report the same overload; cut once
+            if ticket.started >= self._last_cut:
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                self._last_cut = now
+            if retry_after > 0 and now + retry_after > self._paused_until:
+                self.stats.paused_seconds += now + retry_after - max(now, self._paused_until)
+                self._paused_until = now + retry_after
+        elif not failed:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            if used_tokens is not None:
+                self.stats.tokens_used += used_tokens
+                if self.tokens is not None:
+                    self.tokens.adjust(used_tokens - ticket.tokens)
+        self._pump()
+
+    def _pump(self) -> None:
+        """Admit waiting calls in priority order while concurrency and both buckets allow."""
+        now = time.monotonic()
+        while self._waiting:
+            priority, _, future, tokens = self._waiting[0]
+            if future.done():
+                heapq.heappop(self._waiting)
+                continue
+            if self.in_flight >= max(self.min_concurrency, int(self.limit)):
+                return
+            delay = self._paused_until - now
+            if self.requests is not None:
+                delay = max(delay, self.requests.delay(1, now))
+            if self.tokens is not None:
+                delay = max(delay, self.tokens.delay(tokens, now))
+            if delay > 0:
+                # Lower priorities do not overtake: the budget is kept for the head of the queue
+                self._wake_in(delay)
+                return
+            heapq.heappop(self._waiting)
+            if self.requests is not None:
+                self.requests.take(1, now)
+            if self.tokens is not None:
+                self.tokens.take(tokens, now)
+            self.in_flight += 1
+            self.stats.calls += 1
+            self.stats.tokens_reserved += tokens
+            future.set_result(now)
+
+    def _wake_in(self, delay: float) -> None:
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._pump)
+
+    async def retry_wait(self, attempt: int, retry_after: float) -> bool:
+        """After a throttled attempt: False when out of retries, else wait (if the service gave no Retry-After)."""
+        if attempt >= self.max_retries:
+            self.stats.gave_up += 1
+            return False
+        self.stats.retries += 1
+        if retry_after <= 0:
+            # No hint from the service: exponential backoff with full jitter
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        return True
+
+    async def run(self, call: Callable[[], Awaitable[T]], priority: int = NORMAL, tokens: int = 1,
+                  usage: Callable[[T], int | None] | None = None, record: dict[str, Any] | None = None) -> T:
+        """Run ``call`` under the scheduler, retrying it while the service throttles.
+
+        ``record`` (for example a middleware context's metadata) receives the total
+        ``queue_seconds`` spent waiting for admission and the number of ``retries``.
+        """
+        for attempt in itertools.count():
+            ticket = await self.acquire(priority, tokens)
+            _note(record, ticket, attempt)
+            try:
+                result = await call()
+            except Exception as exc:
+                delay = throttle_delay(exc)
+                self.release(ticket, throttled=delay is not None, failed=delay is None, retry_after=delay or 0.0)
+                if delay is None or not await self.retry_wait(attempt, delay):
+                    raise
+                continue
+            except BaseException:
+                self.release(ticket, failed=True)
+                raise
+            self.release(ticket, used_tokens=usage(result) if usage is not None else None)
+            return result
+
+
+def _note(record: dict[str, Any] | None, ticket: Ticket, attempt: int) -> None:
+    if record is not None:
+        record["queue_seconds"] = record.get("queue_seconds", 0.0) + ticket.waited
+        record["retries"] = attempt
+
+
+def estimate_tokens(context: ChatContext) -> int:
+    """Prompt tokens (about four characters each) plus the completion budget of the call."""
+    prompt = sum(len(msg.text or "") for msg in context.messages) // 4 + 1
+    options = context.options or {}
+    completion = options.get("max_tokens") or options.get("max_output_tokens") or DEFAULT_COMPLETION_TOKENS
+    return prompt + int(completion)
+
+
+def _usage_tokens(usage: Any) -> int | None:
+    if usage is None:
+        return None
+    total = usage.total_token_count
+    if total is None and usage.input_token_count is not None:
+        total = usage.input_token_count + (usage.output_token_count or 0)
+    return total
+
+
+class RateLimitMiddleware(ChatMiddleware):
+    """Chat middleware that routes every model request of an agent through a RateLimitScheduler.
+
+    Streaming calls hold their slot until the stream ends; a throttled stream is retried only
+    if it failed before yielding anything.
+    """
+
+    def __init__(self, scheduler: RateLimitScheduler, priority: int = NORMAL):
+        self.scheduler = scheduler
+        self.priority = priority
+
+    async def process(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> None:
+        tokens = estimate_tokens(context)
+        if context.is_streaming:
+            context.result = self._stream(context, next, tokens)
+            return
+
+        async def call() -> ChatResponse | None:
+            await next(context)
+            return context.result
+
+        await self.scheduler.run(
+            call, self.priority, tokens,
+            usage=lambda result: _usage_tokens(result.usage_details) if isinstance(result, ChatResponse) else None,
+            record=context.metadata,
+        )
+
+    async def _stream(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]],
+                      tokens: int) -> AsyncIterable[ChatResponseUpdate]:
+        scheduler = self.scheduler
+        for attempt in itertools.count():
+            ticket = await scheduler.acquire(self.priority, tokens)
+            _note(context.metadata, ticket, attempt)
+            yielded = False
+            used = None
+            try:
+                await next(context)
+                async for update in context.result or ():
+                    for content in update.contents:
+                        if content.type == "usage":
+                            used = _usage_tokens(content.details)
+                    yielded = True
+                    yield update
+            except Exception as exc:
+                delay = None if yielded else throttle_delay(exc)
+                scheduler.release(ticket, throttled=delay is not None, failed=delay is None, retry_after=delay or 0.0)
+                if delay is None or not await scheduler.retry_wait(attempt, delay):
+                    raise
+                continue
+            except GeneratorExit:
+                # The consumer stopped reading (LabelOutput does once it has its label): the call worked
+                scheduler.release(ticket, used_tokens=used)
+                raise
+            except BaseException:
+                scheduler.release(ticket, failed=True)
+                raise
+            scheduler.release(ticket, used_tokens=used)
+            return
+
+
+@asynccontextmanager
+async def scheduled_provider(provider: Any, credential: Any) -> AsyncIterator[Any]:
+    """Open an agent provider whose SDK clients leave throttled (429) calls to the scheduler.
+
+    The Projects provider's OpenAI client gets ``max_retries=0``. The Agents provider's
+    azure-core client keeps its retry policy for everything except 429. Any other provider
+    (an offline or replaying stand-in) is opened with the credential as it is.
+    """
+    from agent_framework_azure_ai._agent_provider import AzureAIAgentsProvider
+    from agent_framework_azure_ai._project_provider import AzureAIProjectAgentProvider
+
+    # Without an endpoint the provider itself reports what is missing
+    endpoint = os.getenv("AZURE_AI_PROJECT_ENDPOINT")
+    if endpoint and isinstance(provider, type) and issubclass(provider, AzureAIProjectAgentProvider):
+        from azure.ai.projects.aio import AIProjectClient
+
+        class ProjectClient(AIProjectClient):
+            def get_openai_client(self, **kwargs: Any) -> Any:
+                kwargs.setdefault("max_retries", 0)
+                return super().get_openai_client(**kwargs)
+
+        sdk_client = ProjectClient(endpoint=endpoint, credential=credential,
+                                   retry_policy=_no_throttle_retry_policy())
+        async with sdk_client, provider(project_client=sdk_client) as opened:
+            yield opened
+    elif endpoint and isinstance(provider, type) and issubclass(provider, AzureAIAgentsProvider):
+        from azure.ai.agents.aio import AgentsClient
+
+        sdk_client = AgentsClient(endpoint=endpoint, credential=credential,
+                                  retry_policy=_no_throttle_retry_policy())
+        async with sdk_client, provider(agents_client=sdk_client) as opened:
+            yield opened
+    else:
+        async with provider(credential=credential) as opened:
+            yield opened
+
+
+def _no_throttle_retry_policy() -> Any:
+    from azure.core.pipeline.policies import AsyncRetryPolicy
+
+    class NoThrottleRetryPolicy(AsyncRetryPolicy):
+        def is_retry(self, settings: Any, response: Any) -> bool:
+            if response.http_response.status_code == 429:
+                return False
+            return super().is_retry(settings, response)
+
+    return NoThrottleRetryPolicy()
+
+
+def _env_number(name: str) -> float | None:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+_shared: dict[str, RateLimitScheduler] = {}
+
+
+def shared_scheduler() -> RateLimitScheduler:
+    """The process-wide scheduler, configured on first use from AZURE_AI_RPM, AZURE_AI_TPM and
+    AZURE_AI_MAX_CONCURRENCY (the deployment's quota; unset means no fixed budget)."""
+    scheduler = _shared.get("scheduler")
+    if scheduler is None:
+        max_concurrency = _env_number("AZURE_AI_MAX_CONCURRENCY")
+        scheduler = _shared["scheduler"] = RateLimitScheduler(
+            rpm=_env_number("AZURE_AI_RPM"),
+            tpm=_env_number("AZURE_AI_TPM"),
+            max_concurrency=int(max_concurrency) if max_concurrency else 256,
+        )
+    return scheduler
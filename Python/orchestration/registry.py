@@ -0,0 +1,269 @@
+"""Local registry of provisioned agents so unchanged definitions are not re-created on every start.
+
+Each AgentSpec is fingerprinted from its name, instructions, description, tool signatures,
+model deployment and project endpoint. When the fingerprint is already in the registry file,
+the stored remote identity is wrapped with the provider's ``as_agent`` (no HTTP call).
+New or changed specs are created concurrently and recorded for the next run.
+
+The file is ``.agent_registry.json`` unless ``AGENT_REGISTRY_PATH`` names another; set
+``AGENT_REGISTRY_REFRESH=1`` to re-create every agent regardless. A restored agent that was
+deleted on the service fails on its first call, which also drops its entry, so the next run
+creates it again.
+"""
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncIterable, Awaitable, Callable, Sequence
+
+from agent_framework import ChatContext, ChatMiddleware
+
+DEFAULT_REGISTRY_PATH = ".agent_registry.json"
+
+
+@dataclass(frozen=True)
+class AgentSpec:
+    """Declarative agent definition, mirroring the arguments of ``create_agent``.
+
+    Middleware runs locally, so it is passed to the agent but not part of the fingerprint.
+    """
+
+    name: str
+    instructions: str
+    description: str | None = None
+    tools: Any = None
+    model: str | None = None
+    middleware: Any = field(default=None, compare=False)
+
+    def with_middleware(self, middleware: Sequence[Any]) -> "AgentSpec":
+        """Copy with ``middleware`` placed before (outside) the spec's own."""
+        own = [] if self.middleware is None else list(self.middleware) if isinstance(self.middleware, (list, tuple)) else [self.middleware]
+        return replace(self, middleware=[*middleware, *own])
+
+    @property
+    def tool_list(self) -> list[Any]:
+        if self.tools is None:
+            return []
+        return list(self.tools) if isinstance(self.tools, (list, tuple)) else [self.tools]
+
+    def create_kwargs(self) -> dict[str, Any]:
+        kwargs: dict[str, Any] = {"name": self.name, "instructions": self.instructions}
+        if self.description is not None:
+            kwargs["description"] = self.description
+        if self.tools is not None:
+            kwargs["tools"] = self.tools
+        if self.model is not None:
+            kwargs["model"] = self.model
+        if self.middleware is not None:
+            kwargs["middleware"] = self.middleware
+        return kwargs
+
+    def fingerprint(self, provider: str = "", endpoint: str = "") -> str:
+        payload = {
+            "provider": provider,
+            "endpoint": endpoint,
+            "model": self.model or os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME"),
+            "name": self.name,
+            "instructions": self.instructions,
+            "description": self.description,
+            "tools": [_tool_signature(tool) for tool in self.tool_list],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _tool_signature(tool: Any) -> str:
+    """Stable description of a tool: callable signature + docstring, or the tool's serialized form."""
+    if inspect.isfunction(tool) or inspect.ismethod(tool):
+        return f"{tool.__qualname__}{inspect.signature(tool)}|{inspect.getdoc(tool) or ''}"
+    if hasattr(tool, "to_dict"):
+        return f"{type(tool).__name__}:{json.dumps(tool.to_dict(), sort_keys=True, default=str)}"
+    return f"{type(tool).__name__}:{tool!r}"
+
+
+def _not_found(exc: BaseException) -> bool:
+    """Whether the error, or one it was raised from, is the service's 404."""
+    while exc is not None:
+        if getattr(exc, "status_code", None) == 404:
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class _DeletedAgentGuard(ChatMiddleware):
+    """Drops a restored agent's registry entry when the service no longer knows the agent."""
+
+    def __init__(self, registry: "AgentRegistry", key: str, name: str):
+        self._registry = registry
+        self._key = key
+        self._name = name
+
+    async def process(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> None:
+        if context.is_streaming:
+            context.result = self._stream(context, next)
+            return
+        try:
+            await next(context)
+        except Exception as exc:
+            self._check(exc)
+            raise
+
+    async def _stream(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> AsyncIterable[Any]:
+        try:
+            await next(context)
+            async for update in context.result or ():
+                yield update
+        except Exception as exc:
+            self._check(exc)
+            raise
+
+    def _check(self, exc: BaseException) -> None:
+        if _not_found(exc) and self._registry._forget(self._key):
+            print(f"Agent '{self._name}' no longer exists on the service; it will be re-created on the next run", file=sys.stderr)
+
+
+class AgentRegistry:
+    """Reuses already-provisioned remote agents for unchanged AgentSpecs.
+
+    Works with ``AzureAIProjectAgentProvider`` and ``AzureAIAgentsProvider``. Any other provider
+    (for example a local stand-in) is simply asked to ``create_agent`` every time.
+    Set ``AGENT_REGISTRY_REFRESH=1`` (or pass refresh=True) to force re-creation.
+    ``middleware`` is attached to every agent it returns, outside the spec's own middleware,
+    for example tracing and a shared rate limiter. It may also be a function of the spec, for
+    middleware that differs per agent.
+    """
+
+    def __init__(self, client: Any, path: str | None = None, refresh: bool | None = None,
+                 middleware: Sequence[Any] | Callable[[AgentSpec], Sequence[Any]] | None = None):
+        self._client = client
+        self._middleware = middleware if callable(middleware) else list(middleware or ())
+        self._provider = type(client).__name__
+        self._endpoint = os.getenv("AZURE_AI_PROJECT_ENDPOINT", "")
+        self._path = path or os.getenv("AGENT_REGISTRY_PATH", DEFAULT_REGISTRY_PATH)
+        self._refresh = refresh if refresh is not None else os.getenv("AGENT_REGISTRY_REFRESH") == "1"
+        self._entries: dict[str, dict[str, Any]] = self._load()
+        # This process's changes, replayed onto the file's current contents when saving
+        self._recorded: set[str] = set()
+        self._dropped: set[str] = set()
+        self.created = 0
+        self.reused = 0
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        try:
+            with open(self._path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self) -> None:
+        # Other processes may have recorded agents since this one loaded the file: merge into
+        # what is there now, and write through a per-process file so writers never share one
+        merged = {k: v for k, v in self._load().items() if k not in self._dropped}
+        merged.update((k, self._entries[k]) for k in self._recorded if k in self._entries)
+        self._entries = merged
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._path)
+
+    @property
+    def _supports_restore(self) -> bool:
+        return self._provider in ("AzureAIProjectAgentProvider", "AzureAIAgentsProvider")
+
+    async def ensure(self, specs: Sequence[AgentSpec]) -> list[Any]:
+        """Return one agent per spec, creating only new or changed definitions (concurrently)."""
+        agents: list[Any] = [None] * len(specs)
+        to_create: list[tuple[int, AgentSpec, str]] = []
+
+        if callable(self._middleware):
+            specs = [spec.with_middleware(self._middleware(spec)) for spec in specs]
+        elif self._middleware:
+            specs = [spec.with_middleware(self._middleware) for spec in specs]
+        for i, spec in enumerate(specs):
+            key = spec.fingerprint(self._provider, self._endpoint)
+            entry = self._entries.get(key)
+            if entry is not None and self._supports_restore and not self._refresh:
+                agents[i] = self._restore(spec.with_middleware([_DeletedAgentGuard(self, key, spec.name)]), entry)
+                self.reused += 1
+            else:
+                to_create.append((i, spec, key))
+
+        if to_create:
+            created = await asyncio.gather(*(self._client.create_agent(**spec.create_kwargs()) for _, spec, _ in to_create))
+            for (i, spec, key), agent in zip(to_create, created):
+                agents[i] = agent
+                if self._supports_restore:
+                    self._record(spec, key, agent)
+            self.created += len(to_create)
+            if self._supports_restore:
+                self._save()
+
+        return agents
+
+    def _record(self, spec: AgentSpec, key: str, agent: Any) -> None:
+        # Drop stale definitions of the same agent on the same project so the file does not grow
+        # with every edit; entries written before endpoints were stored count as this project's
+        stale = [
+            k for k, v in self._entries.items()
+            if v["name"] == spec.name and v["provider"] == self._provider and v.get("endpoint", self._endpoint) == self._endpoint
+        ]
+        for old_key in stale:
+            del self._entries[old_key]
+            self._recorded.discard(old_key)
+            self._dropped.add(old_key)
+        chat_client = getattr(agent, "chat_client", None)
+        self._recorded.add(key)
+        self._dropped.discard(key)
+        self._entries[key] = {
+            "provider": self._provider,
+            "endpoint": self._endpoint,
+            "name": spec.name,
+            "id": agent.id,
+            "version": getattr(chat_client, "agent_version", None),
+            "model": spec.model or os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME"),
+            "created_at": int(time.time()),
+        }
+
+    def _forget(self, key: str) -> bool:
+        """Drop an entry (from the file too); False when it was already gone."""
+        if self._entries.pop(key, None) is None:
+            return False
+        self._recorded.discard(key)
+        self._dropped.add(key)
+        self._save()
+        return True
+
+    def _restore(self, spec: AgentSpec, entry: dict[str, Any]) -> Any:
+        """Wrap a stored remote agent in a local ChatAgent without calling the service."""
+        if self._provider == "AzureAIProjectAgentProvider":
+            from azure.ai.projects.models import AgentVersionDetails
+
+            details = AgentVersionDetails(
+                {
+                    "id": entry["id"],
+                    "name": entry["name"],
+                    "version": entry["version"],
+                    "description": spec.description,
+                    "created_at": entry["created_at"],
+                    "definition": {"kind": "prompt", "model": entry["model"], "instructions": spec.instructions},
+                }
+            )
+            return self._client.as_agent(details, tools=spec.tools, middleware=spec.middleware)
+
+        from azure.ai.agents.models import Agent
+
+        remote = Agent(
+            {
+                "id": entry["id"],
+                "name": entry["name"],
+                "description": spec.description,
+                "model": entry["model"],
+                "instructions": spec.instructions,
+                "created_at": entry["created_at"],
+                "tools": [],
+            }
+        )
+        return self._client.as_agent(remote, tools=spec.tools, middleware=spec.middleware)
@@ -0,0 +1,256 @@
+"""Fast-path routing for Handoff workflows: skip the triage model call for obvious requests.
+
+TriageFastPath is agent middleware for the triage agent. When fresh user input arrives it asks
+a local TriageRouter (regex rules, optionally backed by a small naive Bayes classifier) for a
+specialist. If the router is confident and the handoff graph lets triage reach that specialist,
+the middleware answers with the same handoff tool call the model would have made, so the
+HandoffBuilder routes the conversation without a model round trip. Otherwise triage runs as usual.
+
+    router = TriageRouter(
+        [KeywordRule("returnAgent", [r"\\breturn\\b"]), KeywordRule("orderAgent", [r"order\\s*#?\\d{4,}"])],
+        threshold=0.8,
+    )
+    fast_path = TriageFastPath(router)
+    AgentSpec(name="triageAgent", ..., middleware=[fast_path])
+
+Only targets that the triage agent has a handoff tool for are considered, so ``add_handoff``
+restrictions still hold.
+"""
+import math
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, Sequence
+
+from agent_framework import (
+    AgentMiddleware,
+    AgentResponse,
+    AgentResponseUpdate,
+    AgentRunContext,
+    ChatMessage,
+    FunctionCallContent,
+    FunctionResultContent,
+    Role,
+)
+from agent_framework._workflows._handoff import HANDOFF_FUNCTION_RESULT_KEY, get_handoff_tool_name
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+@dataclass
+class RouteDecision:
+    target: str | None
+    confidence: float
+    source: str
+
+
+@dataclass
+class KeywordRule:
+    """Route to ``target`` when any pattern matches (case-insensitive regex)."""
+
+    target: str
+    patterns: Sequence[str]
+    confidence: float = 0.95
+
+    def __post_init__(self) -> None:
+        self._compiled = [re.compile(pattern, re.IGNORECASE) for pattern in self.patterns]
+
+    def matches(self, text: str) -> bool:
+        return any(regex.search(text) for regex in self._compiled)
+
+
+class NaiveBayesClassifier:
+    """Multinomial naive Bayes over word tokens; small enough to train at startup."""
+
+    def __init__(self, examples: Iterable[tuple[str, str]] = (), alpha: float = 1.0):
+        self.alpha = alpha
+        self._words: dict[str, Counter[str]] = {}
+        self._docs: Counter[str] = Counter()
+        self._vocab: set[str] = set()
+        self.fit(examples)
+
+    def fit(self, examples: Iterable[tuple[str, str]]) -> "NaiveBayesClassifier":
+        for text, label in examples:
+            tokens = tokenize(text)
+            self._docs[label] += 1
+            self._words.setdefault(label, Counter()).update(tokens)
+            self._vocab.update(tokens)
+        return self
+
+    def predict_proba(self, text: str, labels: Iterable[str] | None = None) -> dict[str, float]:
+        """Posterior over ``labels`` (default: every trained label)."""
+        candidates = [label for label in (labels or self._docs) if label in self._docs]
+        if not candidates:
+            return {}
+        tokens = tokenize(text)
+        total_docs = sum(self._docs[label] for label in candidates)
+        vocab = len(self._vocab) or 1
+        scores = {}
+        for label in candidates:
+            words = self._words[label]
+            denominator = sum(words.values()) + self.alpha * vocab
+            score = math.log(self._docs[label] / total_docs)
+            score += sum(math.log((words[token] + self.alpha) / denominator) for token in tokens)
+            scores[label] = score
+        top = max(scores.values())
+        exp = {label: math.exp(score - top) for label, score in scores.items()}
+        norm = sum(exp.values())
+        return {label: value / norm for label, value in exp.items()}
+
+
+class TriageRouter:
+    """Rules first, then the optional classifier; a decision below ``threshold`` routes nowhere."""
+
+    def __init__(self, rules: Sequence[KeywordRule] = (), classifier: NaiveBayesClassifier | None = None, threshold: float = 0.8):
+        self.rules = list(rules)
+        self.classifier = classifier
+        self.threshold = threshold
+
+    def route(self, text: str, allowed: Iterable[str]) -> RouteDecision:
+        allowed = set(allowed)
+        for rule in self.rules:
+            if rule.target in allowed and rule.matches(text):
+                target = rule.target if rule.confidence >= self.threshold else None
+                return RouteDecision(target, rule.confidence, "rule")
+        if self.classifier is not None:
+            # Scored over every trained label, so "none of the specialists" examples can win
+            proba = self.classifier.predict_proba(text)
+            if proba:
+                label, confidence = max(proba.items(), key=lambda item: item[1])
+                target = label if label in allowed and confidence >= self.threshold else None
+                return RouteDecision(target, confidence, "classifier")
+        return RouteDecision(None, 0.0, "none")
+
+
+def evaluate_router(router: TriageRouter, examples: Iterable[tuple[str, str]], allowed: Iterable[str]) -> dict[str, float]:
+    """Coverage (share fast-routed) and accuracy (share of fast routes that hit the expected target).
+
+    Examples whose expected target is not a specialist (for example "triage") count as correct
+    when the router defers.
+    """
+    allowed = set(allowed)
+    total = routed = correct = deferred_ok = 0
+    for text, expected in examples:
+        total += 1
+        decision = router.route(text, allowed)
+        if decision.target is None:
+            deferred_ok += expected not in allowed
+            continue
+        routed += 1
+        correct += decision.target == expected
+    return {
+        "examples": total,
+        "coverage": round(routed / total, 3) if total else 0.0,
+        "accuracy": round(correct / routed, 3) if routed else 0.0,
+        "overall": round((correct + deferred_ok) / total, 3) if total else 0.0,
+    }
+
+
+@dataclass
+class RouterStats:
+    fast_routed: int = 0
+    fell_back: int = 0
+    triage_seconds: float = 0.0
+    router_seconds: float = 0.0
+    by_target: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def seconds_per_triage(self) -> float | None:
+        return self.triage_seconds / self.fell_back if self.fell_back else None
+
+    def report(self, triage_seconds: float | None = None) -> str:
+        decisions = self.fast_routed + self.fell_back
+        targets = ", ".join(f"{target} {count}" for target, count in self.by_target.items()) or "none"
+        line = f"fast path: {self.fast_routed}/{decisions} triage turns routed locally ({targets}), {self.fell_back} went to triage"
+        per_call = triage_seconds if triage_seconds is not None else self.seconds_per_triage
+        if per_call is not None and self.fast_routed:
+            saved = self.fast_routed * per_call - self.router_seconds
+            line += f" | ~{saved:.2f}s saved at {per_call * 1000:.0f} ms per triage call"
+        return line
+
+
+class TriageFastPath(AgentMiddleware):
+    """Agent middleware that replaces the triage model call with a local handoff when confident."""
+
+    def __init__(self, router: TriageRouter, stats: RouterStats | None = None):
+        self.router = router
+        self.stats = stats or RouterStats()
+
+    async def process(self, context: AgentRunContext, next: Callable[[AgentRunContext], Awaitable[None]]) -> None:
+        start = time.perf_counter()
+        decision = self._decide(context)
+        if decision is None or decision.target is None:
+            await next(context)
+            self.stats.fell_back += 1
+            if context.is_streaming:
+                context.result = self._time_stream(context.result, start)
+            else:
+                self.stats.triage_seconds += time.perf_counter() - start
+            return
+
+        self.stats.fast_routed += 1
+        self.stats.router_seconds += time.perf_counter() - start
+        self.stats.by_target[decision.target] = self.stats.by_target.get(decision.target, 0) + 1
+        response = _handoff_response(context.agent.name, decision)
+        context.metadata["fast_path"] = decision.target
+        context.result = _as_stream(response) if context.is_streaming else response
+
+    def _decide(self, context: AgentRunContext) -> RouteDecision | None:
+        # Only fresh user input is routed; when a specialist hands back, triage decides itself
+        if not context.messages or context.messages[-1].role != Role.USER:
+            return None
+        allowed = _handoff_targets(context.agent)
+        if not allowed:
+            return None
+        return self.router.route(context.messages[-1].text or "", allowed)
+
+    async def _time_stream(self, stream: AsyncIterable[AgentResponseUpdate] | None, start: float) -> AsyncIterable[AgentResponseUpdate]:
+        if stream is None:
+            return
+        async for update in stream:
+            yield update
+        self.stats.triage_seconds += time.perf_counter() - start
+
+
+def _handoff_targets(agent: Any) -> set[str]:
+    """Specialists this agent may hand off to, read from the handoff tools HandoffBuilder attached."""
+    prefix = get_handoff_tool_name("")
+    tools = (getattr(agent, "default_options", None) or {}).get("tools") or []
+    return {tool.name[len(prefix):] for tool in tools if getattr(tool, "name", "").startswith(prefix)}
+
+
+def _handoff_response(author: str | None, decision: RouteDecision) -> AgentResponse:
+    """The messages a model-issued handoff tool call produces, so HandoffBuilder routes identically."""
+    call_id = f"fastpath_{uuid.uuid4().hex[:12]}"
+    reason = f"{decision.source} match ({decision.confidence:.2f})"
+    return AgentResponse(
+        messages=[
+            ChatMessage(
+                role=Role.ASSISTANT,
+                author_name=author,
+                contents=[FunctionCallContent(call_id=call_id, name=get_handoff_tool_name(decision.target), arguments={"context": reason})],
+            ),
+            ChatMessage(
+                role=Role.TOOL,
+                contents=[FunctionResultContent(call_id=call_id, result={HANDOFF_FUNCTION_RESULT_KEY: decision.target})],
+            ),
+        ],
+        response_id=call_id,
+    )
+
+
+async def _as_stream(response: AgentResponse) -> AsyncIterable[AgentResponseUpdate]:
+    for i, msg in enumerate(response.messages):
+        yield AgentResponseUpdate(
+            contents=list(msg.contents),
+            role=msg.role,
+            author_name=msg.author_name,
+            response_id=response.response_id,
+            message_id=f"{response.response_id}_{i}",
+        )
@@ -0,0 +1,60 @@
+"""Load the sample scripts in this folder as modules, keyed by orchestration pattern.
+
+Every script exposes ``create_agents(client)``, ``build_workflow(agents)`` and its sample
+input, so tools such as the benchmark can reuse exactly the workflows the scripts run.
+"""
+import importlib.util
+import os
+import sys
+from types import ModuleType
+from typing import Any
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = {
+    "sequential": "agents.py",
+    "concurrent": "agents-Concurrent.py",
+    "groupchat": "agents-GroupChat.py",
+    "magentic": "agents-Magentic.py",
+    "handoff": "agents-Handoff.py",
+    "handoff-autonomous": "agents-HandoffAutonomous.py",
+}
+
+# Azure provider each script creates its agents with, where it is not the Projects provider
+AZURE_PROVIDERS = {"groupchat": "AzureAIAgentsProvider", "concurrent": "AzureAIAgentsProvider"}
+
+_loaded: dict[str, ModuleType] = {}
+
+
+def load_script(pattern: str) -> ModuleType:
+    """Import the script for a pattern once (its ``__main__`` block does not run)."""
+    if pattern not in SCRIPTS:
+        raise ValueError(f"Unknown pattern '{pattern}'. Choose from: {', '.join(SCRIPTS)}")
+    if pattern not in _loaded:
+        if SCRIPTS_DIR not in sys.path:
+            sys.path.insert(0, SCRIPTS_DIR)
+        module_name = f"orchestration_script_{pattern.replace('-', '_')}"
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPTS_DIR, SCRIPTS[pattern]))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded[pattern] = module
+    return _loaded[pattern]
+
+
+def sample_input(pattern: str, module: ModuleType) -> str:
+    """The prompt the script itself sends to its workflow."""
+    if pattern == "sequential":
+        return f"Customer feedback: {module.feedback}"
+    return module.task
+
+
+def azure_provider(pattern: str, credential: Any) -> Any:
+    """The Azure provider the script for ``pattern`` uses, unopened (use it with ``async with``).
+
+    Its SDK clients leave throttled calls to the rate-limit scheduler, as in the scripts.
+    """
+    import agent_framework_azure_ai
+
+    from .ratelimit import scheduled_provider
+
+    return scheduled_provider(getattr(agent_framework_azure_ai, AZURE_PROVIDERS.get(pattern, "AzureAIProjectAgentProvider")), credential)
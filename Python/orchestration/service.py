@@ -0,0 +1,458 @@
+"""Resident service that hosts every orchestration pattern behind a local HTTP API.
+
+Imports, credentials and agents are set up once at startup; each job then only builds a fresh
+workflow over the shared agents. Runs execute concurrently, limited per pattern, and their
+events are streamed back as NDJSON. Human-in-the-loop requests (Handoff questions, Magentic
+plan reviews) do not block anything: the run pauses, releases its slot, and continues once
+a client posts the answer.
+
+    python -m orchestration.service --listen 127.0.0.1:8080 --limit magentic=2
+    python -m orchestration.service --listen unix:///tmp/orchestration.sock --offline
+
+    POST   /workflows/{pattern}/runs            {"input": "...", "stream": true}
+    GET    /runs/{run_id}                       status, pending requests, output
+    GET    /runs/{run_id}/events?after=SEQ      NDJSON until the run finishes or waits for input
+    POST   /runs/{run_id}/requests/{request_id} {"text": "..."} | {"terminate": true} | {"approve": true} | {"revise": "..."}
+    DELETE /runs/{run_id}                       cancel
+    GET    /workflows                           patterns, limits and load
+    GET    /health                              liveness, and the model-call rate limiter's queue and throttling
+
+Event streams end when the run completes or starts waiting for input; after answering,
+clients continue with ``?after=`` the last ``seq`` they saw.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+from agent_framework import (
+    AgentResponse,
+    AgentRunUpdateEvent,
+    ChatMessage,
+    ExecutorFailedEvent,
+    HandoffAgentUserRequest,
+    MagenticPlanReviewRequest,
+    RequestInfoEvent,
+    WorkflowEvent,
+    WorkflowFailedEvent,
+    WorkflowOutputEvent,
+)
+
+from .dispatch import EventDispatcher
+from .ratelimit import shared_scheduler
+from .scripts import SCRIPTS, azure_provider, load_script
+
+FINISHED = ("completed", "incomplete", "failed", "cancelled")
+
+
+def _message(msg: ChatMessage) -> dict[str, Any]:
+    return {"author": msg.author_name, "role": msg.role.value, "text": msg.text}
+
+
+def _output(data: Any) -> Any:
+    if isinstance(data, ChatMessage):
+        return _message(data)
+    if isinstance(data, AgentResponse):
+        return [_message(msg) for msg in data.messages]
+    if isinstance(data, list):
+        return [_output(item) for item in data]
+    return data if isinstance(data, (str, int, float, bool, dict)) or data is None else str(data)
+
+
+def describe_request(event: RequestInfoEvent) -> dict[str, Any]:
+    """What a client needs to answer a request, and which answers it accepts."""
+    record: dict[str, Any] = {"request_id": event.request_id, "source": event.source_executor_id, "kind": type(event.data).__name__}
+    if isinstance(event.data, HandoffAgentUserRequest):
+        record["messages"] = [_message(msg) for msg in event.data.agent_response.messages[-3:]]
+        record["answers"] = ["text", "terminate"]
+    elif isinstance(event.data, MagenticPlanReviewRequest):
+        record["plan"] = event.data.plan.text
+        record["is_stalled"] = event.data.is_stalled
+        record["answers"] = ["approve", "revise"]
+    return record
+
+
+def decode_answer(event: RequestInfoEvent, body: dict[str, Any]) -> Any:
+    """The typed response for a request from its JSON answer; ValueError if it does not fit."""
+    if isinstance(event.data, HandoffAgentUserRequest):
+        if body.get("terminate"):
+            return HandoffAgentUserRequest.terminate()
+        if isinstance(body.get("text"), str):
+            return HandoffAgentUserRequest.create_response(body["text"])
+    elif isinstance(event.data, MagenticPlanReviewRequest):
+        if body.get("approve"):
+            return event.data.approve()
+        if isinstance(body.get("revise"), str):
+            return event.data.revise(body["revise"])
+    raise ValueError(f"Cannot answer a {type(event.data).__name__} with {sorted(body)}")
+
+
+def event_record(event: WorkflowEvent) -> dict[str, Any] | None:
+    """JSON record streamed to clients, or None for framework bookkeeping events."""
+    if isinstance(event, AgentRunUpdateEvent):
+        text = event.data.text
+        return {"type": "delta", "executor": event.executor_id, "message_id": event.data.message_id, "text": text} if text else None
+    if isinstance(event, RequestInfoEvent):
+        return {"type": "request", **describe_request(event)}
+    if isinstance(event, WorkflowOutputEvent):
+        return {"type": "output", "data": _output(event.data)}
+    if isinstance(event, WorkflowFailedEvent):
+        return {"type": "failed", "error": f"{event.details.error_type}: {event.details.message}", "executor": event.details.executor_id}
+    if isinstance(event, ExecutorFailedEvent):
+        return {"type": "executor_failed", "executor": event.executor_id}
+    return None
+
+
+@dataclass
+class Run:
+    """One job: its buffered event records, pending requests and final state."""
+
+    pattern: str
+    input: str
+    max_events: int = 10000
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    created: float = field(default_factory=time.time)
+    finished: float | None = None
+    output: Any = None
+    error: str | None = None
+    pending: dict[str, RequestInfoEvent] = field(default_factory=dict)
+    answers: dict[str, Any] = field(default_factory=dict)
+    task: asyncio.Task[None] | None = None
+    holds_slot: bool = False
+
+    def __post_init__(self) -> None:
+        self.events: deque[dict[str, Any]] = deque(maxlen=self.max_events)
+        self.next_seq = 0
+        self._changed = asyncio.Condition()
+        self._answered = asyncio.Event()
+
+    async def publish(self, record: dict[str, Any]) -> None:
+        record["seq"] = self.next_seq
+        self.next_seq += 1
+        self.events.append(record)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def set_status(self, status: str, error: str | None = None) -> None:
+        self.status = status
+        self.error = error
+        if status in FINISHED:
+            self.finished = time.time()
+            self._answered.set()
+        await self.publish({"type": "status", "status": status, **({"error": error} if error else {})})
+
+    async def follow(self, after: int = 0):
+        """Records with seq >= ``after``, live, until the run finishes or waits for input."""
+        seq = after
+        while True:
+            first = self.next_seq - len(self.events)
+            if seq < first:
+                # The buffer only holds the last max_events records
+                yield {"type": "gap", "missed": first - seq, "seq": seq}
+                seq = first
+            while seq < self.next_seq:
+                yield self.events[seq - first]
+                seq += 1
+            if self.status in FINISHED or self.status == "waiting":
+                return
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.next_seq > seq or self.status in FINISHED)
+
+    def answer(self, request_id: str, body: dict[str, Any]) -> None:
+        if self.status != "waiting" or request_id not in self.pending:
+            raise KeyError(request_id)
+        self.answers[request_id] = decode_answer(self.pending[request_id], body)
+        if len(self.answers) == len(self.pending):
+            # Followers that connect right after answering must wait for the resumed events
+            self.status = "queued"
+            self._answered.set()
+
+    async def wait_for_answers(self) -> dict[str, Any]:
+        await self._answered.wait()
+        self._answered.clear()
+        answers, self.answers = self.answers, {}
+        return answers
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "run_id": self.id,
+            "pattern": self.pattern,
+            "status": self.status,
+            "created": self.created,
+            "seconds": round((self.finished or time.time()) - self.created, 3),
+            "events": self.next_seq,
+            "pending": [describe_request(event) for event in self.pending.values()],
+            "output": self.output,
+            "error": self.error,
+        }
+
+
+@dataclass
+class HostedWorkflow:
+    pattern: str
+    module: Any
+    agents: Any
+    limit: int
+    slots: asyncio.Semaphore
+    running: int = 0
+    waiting: int = 0
+    completed: int = 0
+
+    def build(self) -> Any:
+        return self.module.build_workflow(self.agents)
+
+
+class OrchestrationService:
+    """Holds the hosted workflows and the runs; the HTTP layer is a thin wrapper around it."""
+
+    def __init__(self, max_finished: int = 1000, max_events: int = 10000):
+        self.workflows: dict[str, HostedWorkflow] = {}
+        self.runs: OrderedDict[str, Run] = OrderedDict()
+        self.max_finished = max_finished
+        self.max_events = max_events
+        self._stack = contextlib.AsyncExitStack()
+
+    async def start(self, patterns: list[str], limits: dict[str, int], default_limit: int, offline: bool = False) -> None:
+        """Create every pattern's agents once; clients stay open until ``close``."""
+        credential = None
+        if not offline:
+            from .credentials import shared_credential
+
+            credential = await self._stack.enter_async_context(shared_credential())
+        for pattern in patterns:
+            module = load_script(pattern)
+            if offline:
+                from .offline import OfflineAgentProvider
+
+                client = await self._stack.enter_async_context(OfflineAgentProvider())
+            else:
+                client = await self._stack.enter_async_context(azure_provider(pattern, credential))
+            limit = limits.get(pattern, default_limit)
+            self.workflows[pattern] = HostedWorkflow(pattern, module, await module.create_agents(client), limit, asyncio.Semaphore(limit))
+
+    async def close(self) -> None:
+        for run in self.runs.values():
+            if run.task is not None and not run.task.done():
+                run.task.cancel()
+        await asyncio.gather(*(run.task for run in self.runs.values() if run.task is not None), return_exceptions=True)
+        await self._stack.aclose()
+
+    def submit(self, pattern: str, message: str) -> Run:
+        hosted = self.workflows[pattern]
+        run = Run(pattern, message, max_events=self.max_events)
+        self.runs[run.id] = run
+        run.task = asyncio.create_task(self._drive(run, hosted))
+        self._evict()
+        return run
+
+    async def cancel(self, run: Run) -> None:
+        if run.task is not None and not run.task.done():
+            run.task.cancel()
+            await asyncio.gather(run.task, return_exceptions=True)
+
+    async def _drive(self, run: Run, hosted: HostedWorkflow) -> None:
+        async def forward(event: WorkflowEvent) -> None:
+            record = event_record(event)
+            if record is not None:
+                if record["type"] == "output":
+                    run.output = record["data"]
+                await run.publish(record)
+
+        async def answer(pending: list[RequestInfoEvent]) -> dict[str, Any]:
+            # Waiting for a human must not hold one of the pattern's slots
+            run.pending = {event.request_id: event for event in pending}
+            self._release(run, hosted)
+            hosted.waiting += 1
+            await run.set_status("waiting")
+            try:
+                answers = await run.wait_for_answers()
+            finally:
+                hosted.waiting -= 1
+            await self._acquire(run, hosted)
+            run.pending = {}
+            await run.set_status("running")
+            return answers
+
+        try:
+            await self._acquire(run, hosted)
+            await run.set_status("running")
+            dispatcher = EventDispatcher()
+            dispatcher.on(WorkflowEvent, forward)
+            output = await dispatcher.converse(hosted.build(), run.input, answer)
+            hosted.completed += 1
+            await run.set_status("completed" if output is not None else "incomplete")
+        except asyncio.CancelledError:
+            await run.set_status("cancelled")
+        except Exception as exc:
+            await run.set_status("failed", f"{type(exc).__name__}: {exc}")
+        finally:
+            run.pending = {}
+            self._release(run, hosted)
+
+    async def _acquire(self, run: Run, hosted: HostedWorkflow) -> None:
+        await hosted.slots.acquire()
+        run.holds_slot = True
+        hosted.running += 1
+
+    def _release(self, run: Run, hosted: HostedWorkflow) -> None:
+        if run.holds_slot:
+            run.holds_slot = False
+            hosted.running -= 1
+            hosted.slots.release()
+
+    def _evict(self) -> None:
+        finished = [run_id for run_id, run in self.runs.items() if run.status in FINISHED]
+        for run_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self.runs[run_id]
+
+    def load(self) -> dict[str, Any]:
+        return {
+            pattern: {"limit": hosted.limit, "running": hosted.running, "waiting": hosted.waiting, "completed": hosted.completed}
+            for pattern, hosted in self.workflows.items()
+        }
+
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({"error": message}, status=status)
+
+
+async def _json_object(request: web.Request) -> dict[str, Any]:
+    """The request's JSON body, which must be an object; anything else is a 400."""
+    try:
+        body = await request.json()
+    except json.JSONDecodeError as exc:
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"body is not valid JSON: {exc}"}), content_type="application/json")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "body must be a JSON object"}), content_type="application/json")
+    return body
+
+
+def _after(request: web.Request) -> int:
+    """The ``?after=`` event sequence number, a non-negative integer; anything else is a 400."""
+    try:
+        after = int(request.query.get("after", 0))
+    except ValueError:
+        after = -1
+    if after < 0:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "'after' must be a non-negative integer"}), content_type="application/json")
+    return after
+
+
+async def _stream(request: web.Request, run: Run, after: int) -> web.StreamResponse:
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    await response.prepare(request)
+    async for record in run.follow(after):
+        await response.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+    await response.write_eof()
+    return response
+
+
+def create_app(service: OrchestrationService) -> web.Application:
+    routes = web.RouteTableDef()
+
+    def find_run(request: web.Request) -> Run:
+        run = service.runs.get(request.match_info["run_id"])
+        if run is None:
+            raise web.HTTPNotFound(text=json.dumps({"error": "unknown run"}), content_type="application/json")
+        return run
+
+    @routes.get("/health")
+    async def health(request: web.Request) -> web.Response:
+        scheduler = shared_scheduler()
+        return web.json_response({"ok": True, "runs": len(service.runs), "ratelimit": scheduler.stats.summary(scheduler)})
+
+    @routes.get("/workflows")
+    async def workflows(request: web.Request) -> web.Response:
+        return web.json_response(service.load())
+
+    @routes.post("/workflows/{pattern}/runs")
+    async def submit(request: web.Request) -> web.StreamResponse:
+        pattern = request.match_info["pattern"]
+        if pattern not in service.workflows:
+            return _error(404, f"pattern '{pattern}' is not hosted; choose from {', '.join(service.workflows)}")
+        body = await _json_object(request)
+        if not isinstance(body.get("input"), str) or not body["input"].strip():
+            return _error(400, "'input' must be a non-empty string")
+        run = service.submit(pattern, body["input"])
+        if body.get("stream"):
+            return await _stream(request, run, 0)
+        return web.json_response(run.summary(), status=202)
+
+    @routes.get("/runs/{run_id}")
+    async def status(request: web.Request) -> web.Response:
+        return web.json_response(find_run(request).summary())
+
+    @routes.get("/runs/{run_id}/events")
+    async def events(request: web.Request) -> web.StreamResponse:
+        return await _stream(request, find_run(request), _after(request))
+
+    @routes.post("/runs/{run_id}/requests/{request_id}")
+    async def respond(request: web.Request) -> web.Response:
+        run = find_run(request)
+        body = await _json_object(request)
+        try:
+            run.answer(request.match_info["request_id"], body)
+        except KeyError:
+            return _error(409, "no such pending request; the run may have moved on")
+        except ValueError as exc:
+            return _error(400, str(exc))
+        return web.json_response(run.summary(), status=202)
+
+    @routes.delete("/runs/{run_id}")
+    async def cancel(request: web.Request) -> web.Response:
+        run = find_run(request)
+        await service.cancel(run)
+        return web.json_response(run.summary())
+
+    app = web.Application()
+    app.add_routes(routes)
+    return app
+
+
+async def serve(args: argparse.Namespace) -> None:
+    patterns = list(SCRIPTS) if args.patterns == "all" else args.patterns.split(",")
+    limits = {pattern: int(limit) for pattern, limit in (item.split("=", 1) for item in args.limit)}
+    service = OrchestrationService(max_finished=args.max_finished)
+    start = time.perf_counter()
+    await service.start(patterns, limits, args.default_limit, offline=args.offline)
+    print(f"Loaded {', '.join(patterns)} in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    runner = web.AppRunner(create_app(service))
+    await runner.setup()
+    if args.listen.startswith("unix://"):
+        site: web.BaseSite = web.UnixSite(runner, args.listen[len("unix://"):])
+    else:
+        host, port = args.listen.rsplit(":", 1)
+        site = web.TCPSite(runner, host, int(port))
+    await site.start()
+    print(f"Listening on {args.listen}", file=sys.stderr)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+        await runner.cleanup()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Host every orchestration pattern behind a local HTTP API.")
+    parser.add_argument("--listen", default="127.0.0.1:8080", help="host:port, or unix:///path for a Unix socket")
+    parser.add_argument("--patterns", default="all", help=f"comma separated subset of: {', '.join(SCRIPTS)}")
+    parser.add_argument("--limit", action="append", default=[], metavar="PATTERN=N",
+                        help="concurrent runs allowed for one pattern (repeatable)")
+    parser.add_argument("--default-limit", type=int, default=16, help="concurrent runs per pattern without --limit")
+    parser.add_argument("--max-finished", type=int, default=1000, help="finished runs kept for status queries")
+    parser.add_argument("--offline", action="store_true", help="serve offline agents instead of Azure ones")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(parse_args()))
@@ -0,0 +1,207 @@
+"""Single-flight agent calls: identical requests in flight at the same time share one model call.
+
+SingleFlight is agent middleware. The first call for a given agent, instructions, thread history
+and input starts the real run; identical calls arriving before it finishes subscribe to it
+instead of starting their own. Non-streaming subscribers all receive the same response;
+streaming subscribers each get the full stream, replayed from the start for late joiners.
+
+    flight = SingleFlight()
+    classifier = AgentSpec(name="classifier", instructions=..., middleware=[cache, flight])
+    ...
+    print(flight.report())
+
+The shared run belongs to no single caller. A subscriber that is cancelled only drops its own
+interest; the run is cancelled once every subscriber is gone. Unlike ResponseCache nothing is
+kept after the run finishes, so this also suits agents whose answers must be fresh.
+Runs on service-side threads are never merged, since each one appends to its own thread.
+"""
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable
+
+from agent_framework import AgentMiddleware, AgentResponse, AgentRunContext, ChatMessage
+
+
+def _fingerprint(message: ChatMessage) -> str:
+    parts = [message.role.value, message.author_name or "", message.text or ""]
+    for content in message.contents:
+        if content.type == "function_call":
+            parts.append(f"call:{content.call_id}:{content.name}:{content.arguments}")
+        elif content.type == "function_result":
+            parts.append(f"result:{content.call_id}:{content.result}")
+    return "\x1e".join(parts)
+
+
+@dataclass
+class _Flight:
+    """One shared run and the subscribers waiting on it."""
+
+    key: str
+    streaming: bool
+    waiters: int = 0
+    peak: int = 0
+    updates: list[Any] = field(default_factory=list)
+    finished: bool = False
+    error: BaseException | None = None
+    task: asyncio.Task | None = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def publish(self, update: Any) -> None:
+        self.updates.append(update)
+        self._wake()
+
+    def finish(self) -> None:
+        self.finished = True
+        self._wake()
+
+    def _wake(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self) -> AsyncIterable[Any]:
+        """Every update from the first, then the rest as they are published."""
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.updates):
+                yield self.updates[sent]
+                sent += 1
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+@dataclass
+class SingleFlightStats:
+    calls: int = 0
+    merged: int = 0
+    runs: int = 0
+    bypassed: int = 0
+    cancelled: int = 0
+    peak_waiters: int = 0
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "runs": self.runs,
+            "merged": self.merged,
+            "merge_rate": round(self.merged / self.calls, 3) if self.calls else 0.0,
+            "peak_waiters": self.peak_waiters,
+            "cancelled": self.cancelled,
+            "bypassed": self.bypassed,
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        line = (
+            f"single-flight: {s['calls']} calls | {s['merged']} merged into in-flight runs ({s['merge_rate']:.0%} "
+            f"fewer model runs) | up to {s['peak_waiters']} callers on one run"
+        )
+        if s["cancelled"]:
+            line += f" | {s['cancelled']} shared runs cancelled after every caller left"
+        if s["bypassed"]:
+            line += f" | {s['bypassed']} on service threads not merged"
+        return line
+
+
+class SingleFlight(AgentMiddleware):
+    """Agent middleware merging concurrent identical calls; one instance can serve many agents."""
+
+    def __init__(self, stats: SingleFlightStats | None = None):
+        self.stats = stats or SingleFlightStats()
+        self._flights: dict[str, _Flight] = {}
+
+    async def _key(self, context: AgentRunContext) -> str | None:
+        thread = context.thread
+        if thread is not None and thread.service_thread_id:
+            return None
+        digest = hashlib.sha256()
+        instructions = (getattr(context.agent, "default_options", None) or {}).get("instructions") or ""
+        digest.update(f"{context.agent.name}\x1f{context.agent.id}\x1f{instructions}\x1f{context.is_streaming}".encode("utf-8"))
+        # Extra run arguments change the call; the framework's own plumbing does not
+        extra = {k: v for k, v in context.kwargs.items() if not k.startswith("_") and k != "middleware"}
+        digest.update(repr(sorted(extra.items())).encode("utf-8"))
+        history = await thread.message_store.list_messages() if thread is not None and thread.message_store else []
+        for message in [*history, *context.messages]:
+            digest.update(b"\x1f" + _fingerprint(message).encode("utf-8"))
+        return digest.hexdigest()
+
+    async def process(self, context: AgentRunContext, next: Callable[[AgentRunContext], Awaitable[None]]) -> None:
+        self.stats.calls += 1
+        key = await self._key(context)
+        if key is None:
+            self.stats.bypassed += 1
+            await next(context)
+            return
+
+        flight = self._flights.get(key)
+        joined = flight is not None
+        if flight is None:
+            flight = self._flights[key] = _Flight(key, context.is_streaming)
+            flight.task = asyncio.create_task(self._run(flight, context, next))
+            # Streaming subscribers get the error through the flight; keep asyncio from reporting it again
+            flight.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self.stats.runs += 1
+        else:
+            self.stats.merged += 1
+        flight.waiters += 1
+        flight.peak = max(flight.peak, flight.waiters)
+        self.stats.peak_waiters = max(self.stats.peak_waiters, flight.peak)
+        context.metadata["single_flight"] = "joined" if joined else "leader"
+
+        if context.is_streaming:
+            context.result = self._subscribe(flight, context)
+            return
+        try:
+            response = await asyncio.shield(flight.task)
+        finally:
+            self._leave(flight)
+        if joined:
+            await self._record_in_thread(context, response.messages)
+        context.result = response
+
+    async def _run(self, flight: _Flight, context: AgentRunContext, next: Callable[[AgentRunContext], Awaitable[None]]) -> AgentResponse | None:
+        try:
+            await next(context)
+            if not flight.streaming:
+                return context.result
+            async for update in context.result or ():
+                flight.publish(update)
+            return None
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            # Calls arriving from now on start a new run
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            flight.finish()
+
+    async def _subscribe(self, flight: _Flight, context: AgentRunContext) -> AsyncIterable[Any]:
+        try:
+            async for update in flight.follow():
+                yield update
+        finally:
+            self._leave(flight)
+        if context.metadata.get("single_flight") == "joined":
+            response = AgentResponse.from_agent_run_response_updates(flight.updates)
+            await self._record_in_thread(context, response.messages)
+
+    def _leave(self, flight: _Flight) -> None:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            self.stats.cancelled += 1
+            flight.task.cancel()
+
+    @staticmethod
+    async def _record_in_thread(context: AgentRunContext, response_messages: list[ChatMessage]) -> None:
+        """Give a merged caller's thread the turn the shared run added to the leader's thread."""
+        if context.thread is not None:
+            await context.thread.on_new_messages(context.messages)
+            await context.thread.on_new_messages(response_messages)
+
+    def report(self) -> str:
+        return self.stats.report()
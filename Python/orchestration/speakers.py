@@ -0,0 +1,229 @@
+"""Local speaker selection for GroupChat, with the orchestrator agent as a fallback.
+
+``with_agent_orchestrator`` spends a model round trip on every turn just to pick the next
+speaker. LocalFirstGroupChatBuilder asks a local selector first and only invokes the
+orchestrator agent when the selector has no answer:
+
+    selector = StateMachineSelector({None: "Researcher", "Researcher": "Writer", "Writer": FINISH})
+    workflow = (
+        LocalFirstGroupChatBuilder()
+        .with_local_selector(selector, fallback=orchestrator_agent, stats=stats)
+        .participants([researcher, writer])
+        .build()
+    )
+
+A selector is any callable ``(GroupChatState) -> str | FINISH | None``: a participant name,
+FINISH to end the conversation, or None to defer to the orchestrator agent.
+"""
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Sequence
+
+from agent_framework import AgentBasedGroupChatOrchestrator, ChatAgent, ChatMessage, Executor, GroupChatBuilder, GroupChatState, Role
+from agent_framework._workflows._base_group_chat_orchestrator import ParticipantRegistry
+from agent_framework._workflows._group_chat import AgentOrchestrationOutput
+
+
+class _Finish:
+    def __repr__(self) -> str:
+        return "FINISH"
+
+
+# Returned by a selector to end the conversation without asking the orchestrator agent
+FINISH = _Finish()
+
+Selection = str | _Finish | None
+SpeakerSelector = Callable[[GroupChatState], Selection]
+
+
+def last_speaker(state: GroupChatState) -> str | None:
+    """Name of the participant that spoke last, or None before anyone has."""
+    for msg in reversed(state.conversation):
+        if msg.role == Role.ASSISTANT and msg.author_name in state.participants:
+            return msg.author_name
+    return None
+
+
+def last_message(state: GroupChatState) -> ChatMessage | None:
+    return state.conversation[-1] if state.conversation else None
+
+
+class RoundRobinSelector:
+    """Participants take turns in a fixed order; FINISH after ``max_turns`` turns if set."""
+
+    def __init__(self, order: Sequence[str] | None = None, max_turns: int | None = None):
+        self.order = list(order) if order else None
+        self.max_turns = max_turns
+
+    def __call__(self, state: GroupChatState) -> Selection:
+        if self.max_turns is not None and state.current_round >= self.max_turns:
+            return FINISH
+        order = self.order or list(state.participants)
+        return order[state.current_round % len(order)]
+
+
+class StateMachineSelector:
+    """Next speaker as a function of the last speaker (None is the start state).
+
+    States missing from the table defer to the fallback orchestrator.
+    """
+
+    def __init__(self, transitions: dict[str | None, str | _Finish]):
+        self.transitions = dict(transitions)
+
+    def __call__(self, state: GroupChatState) -> Selection:
+        return self.transitions.get(last_speaker(state))
+
+
+@dataclass
+class Rule:
+    """One row of a RuleTableSelector: when ``when(state)`` holds, ``speaker`` goes next."""
+
+    when: Callable[[GroupChatState], bool]
+    speaker: str | _Finish
+    name: str = ""
+
+
+class RuleTableSelector:
+    """First matching rule wins; no match defers to the fallback orchestrator."""
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+        self.matches: dict[str, int] = {}
+
+    def __call__(self, state: GroupChatState) -> Selection:
+        for i, rule in enumerate(self.rules):
+            if rule.when(state):
+                key = rule.name or f"rule {i}"
+                self.matches[key] = self.matches.get(key, 0) + 1
+                return rule.speaker
+        return None
+
+
+# Predicates for rule tables
+def at_start(state: GroupChatState) -> bool:
+    return last_speaker(state) is None
+
+
+def spoke_last(name: str) -> Callable[[GroupChatState], bool]:
+    return lambda state: last_speaker(state) == name
+
+
+def last_message_matches(pattern: str) -> Callable[[GroupChatState], bool]:
+    regex = re.compile(pattern, re.IGNORECASE)
+    return lambda state: bool((msg := last_message(state)) and regex.search(msg.text or ""))
+
+
+def last_message_longer_than(chars: int) -> Callable[[GroupChatState], bool]:
+    return lambda state: bool((msg := last_message(state)) and len(msg.text or "") > chars)
+
+
+def all_of(*predicates: Callable[[GroupChatState], bool]) -> Callable[[GroupChatState], bool]:
+    return lambda state: all(predicate(state) for predicate in predicates)
+
+
+@dataclass
+class SelectionStats:
+    """Orchestrator calls made and avoided, accumulated across conversations."""
+
+    conversations: int = 0
+    local: int = 0
+    fallback: int = 0
+    fallback_seconds: float = 0.0
+    local_seconds: float = 0.0
+    by_speaker: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def seconds_per_call(self) -> float | None:
+        """Measured latency of one orchestrator agent call (None until one has been made)."""
+        return self.fallback_seconds / self.fallback if self.fallback else None
+
+    def saved_seconds(self, call_seconds: float | None = None) -> float | None:
+        """Wall-clock saved by the local decisions, priced at the measured (or given) call latency."""
+        per_call = call_seconds if call_seconds is not None else self.seconds_per_call
+        if per_call is None:
+            return None
+        return self.local * per_call - self.local_seconds
+
+    def report(self, call_seconds: float | None = None) -> str:
+        conversations = max(self.conversations, 1)
+        decisions = self.local + self.fallback
+        line = (
+            f"speaker selection: {self.local}/{decisions} decisions local, {self.local} orchestrator calls avoided "
+            f"({self.local / conversations:.1f} per conversation), {self.fallback} fell back to the orchestrator agent"
+        )
+        saved = self.saved_seconds(call_seconds)
+        if saved is not None:
+            per_call = call_seconds if call_seconds is not None else self.seconds_per_call
+            line += f" | ~{saved / conversations:.2f}s saved per conversation at {per_call * 1000:.0f} ms per call"
+        return line
+
+
+class LocalFirstGroupChatOrchestrator(AgentBasedGroupChatOrchestrator):
+    """Agent-based orchestrator that consults a local selector before calling its agent.
+
+    Messages from locally decided turns stay queued for the agent, so when it is consulted it
+    still sees everything said since its last call.
+    """
+
+    def __init__(self, selector: SpeakerSelector, agent: ChatAgent, participant_registry: ParticipantRegistry, stats: SelectionStats | None = None, **kwargs):
+        super().__init__(agent, participant_registry, **kwargs)
+        self._selector = selector
+        self.stats = stats or SelectionStats()
+        self.stats.conversations += 1
+
+    async def _invoke_agent(self) -> AgentOrchestrationOutput:
+        start = time.perf_counter()
+        state = GroupChatState(
+            current_round=self._round_index,
+            participants=self._participant_registry.participants,
+            conversation=self._get_conversation(),
+        )
+        choice = self._selector(state)
+        if choice is FINISH:
+            self.stats.local += 1
+            self.stats.local_seconds += time.perf_counter() - start
+            return AgentOrchestrationOutput(
+                terminate=True, reason="local selector", next_speaker=None, final_message="Conversation complete."
+            )
+        if choice is not None:
+            if choice not in self._participant_registry.participants:
+                raise RuntimeError(f"Local speaker selector returned unknown participant '{choice}'.")
+            self.stats.local += 1
+            self.stats.local_seconds += time.perf_counter() - start
+            self.stats.by_speaker[choice] = self.stats.by_speaker.get(choice, 0) + 1
+            return AgentOrchestrationOutput(terminate=False, reason="local selector", next_speaker=choice, final_message=None)
+
+        output = await super()._invoke_agent()
+        self.stats.fallback += 1
+        self.stats.fallback_seconds += time.perf_counter() - start
+        return output
+
+
+class LocalFirstGroupChatBuilder(GroupChatBuilder):
+    """GroupChatBuilder that adds ``with_local_selector`` next to ``with_agent_orchestrator``."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._local_selector: SpeakerSelector | None = None
+        self._selection_stats: SelectionStats | None = None
+
+    def with_local_selector(self, selector: SpeakerSelector, fallback: ChatAgent, stats: SelectionStats | None = None) -> "LocalFirstGroupChatBuilder":
+        """Pick speakers locally, calling ``fallback`` only when the selector returns None."""
+        self.with_agent_orchestrator(fallback)
+        self._local_selector = selector
+        self._selection_stats = stats
+        return self
+
+    def _resolve_orchestrator(self, participants: Sequence[Executor]) -> Executor:
+        if self._local_selector is None:
+            return super()._resolve_orchestrator(participants)
+        return LocalFirstGroupChatOrchestrator(
+            self._local_selector,
+            self._agent_orchestrator,
+            ParticipantRegistry(participants),
+            stats=self._selection_stats,
+            max_rounds=self._max_rounds,
+            termination_condition=self._termination_condition,
+        )
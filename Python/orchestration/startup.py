@@ -0,0 +1,119 @@
+"""Startup helpers: load ``.env`` once, time the startup phases, and benchmark import times.
+
+The scripts call ``load_env()`` instead of ``load_dotenv()`` so a process that loads several
+of them (the CLI, the benchmark, the service) parses ``.env`` only once.
+
+    timer = StartupTimer()
+    with timer.phase("import"):
+        module = load_script("sequential")
+    ...
+    print(timer.report(), file=sys.stderr)
+
+``import_times`` runs imports in fresh interpreters, since a module is only slow the first time.
+"""
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+_env_loaded: list[str | None] = []
+
+
+def load_env(path: str | None = None) -> None:
+    """Load ``.env`` into os.environ (without overriding it) the first time this is called."""
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv(path)
+    _env_loaded.append(path)
+
+
+@dataclass
+class StartupTimer:
+    """Wall-clock time per startup phase, measured from when the timer is created."""
+
+    start: float = field(default_factory=time.perf_counter)
+    phases: list[tuple[str, float, float]] = field(default_factory=list)
+    first_event: float | None = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, begin - self.start, time.perf_counter() - begin))
+
+    def mark_first_event(self) -> None:
+        if self.first_event is None:
+            self.first_event = time.perf_counter() - self.start
+
+    def report(self) -> str:
+        lines = ["startup:"]
+        for name, offset, seconds in self.phases:
+            lines.append(f"  {name:<22} {seconds * 1000:>8.0f} ms   (at {offset * 1000:.0f} ms)")
+        if self.first_event is not None:
+            lines.append(f"  {'first event':<22} {self.first_event * 1000:>8.0f} ms   after start")
+        return "\n".join(lines)
+
+
+@dataclass
+class ImportTiming:
+    target: str
+    seconds: list[float]
+    heaviest: list[tuple[str, float]]
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.seconds)
+
+
+# Each pattern imports its script; 'cli' is the entry point itself, which must stay cheap
+IMPORT_TARGETS = {
+    "cli": "import orchestration.__main__",
+    "agent_framework": "import agent_framework",
+    "azure_ai": "import agent_framework_azure_ai",
+}
+
+
+def _script_statement(pattern: str) -> str:
+    return f"from orchestration.scripts import load_script; load_script({pattern!r})"
+
+
+def import_statement(target: str) -> str:
+    return IMPORT_TARGETS.get(target) or _script_statement(target)
+
+
+def import_times(target: str, repeat: int = 3, cwd: str | None = None) -> ImportTiming:
+    """Time ``target``'s imports in ``repeat`` fresh interpreters, with the heaviest modules of the last one."""
+    statement = import_statement(target)
+    seconds = []
+    heaviest: list[tuple[str, float]] = []
+    for _ in range(repeat):
+        code = f"import time; _t = time.perf_counter(); {statement}; print(time.perf_counter() - _t)"
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True, text=True, cwd=cwd, check=True,
+        )
+        seconds.append(float(result.stdout.strip().splitlines()[-1]))
+        heaviest = _heaviest(result.stderr)
+    return ImportTiming(target, seconds, heaviest)
+
+
+def _heaviest(importtime_log: str, top: int = 5) -> list[tuple[str, float]]:
+    """Top-level packages by cumulative import time from ``-X importtime`` output."""
+    totals: dict[str, float] = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            # Nested imports are already counted in their top-level parent
+            continue
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0.0) + int(cumulative) / 1e6
+    return sorted(totals.items(), key=lambda item: -item[1])[:top]
@@ -0,0 +1,238 @@
+"""Live rendering of agent deltas with per-agent time-to-first-token.
+
+StreamRenderer consumes workflow events and forwards each AgentRunUpdateEvent delta to a sink,
+grouped by executor and message id. Sinks buffer records in memory and a background task
+writes them out in batches, so a chatty stream costs one write per batch rather than one
+``print(..., flush=True)`` per chunk.
+
+    async with open_sink("-") as sink:          # terminal; or "out.jsonl", "tcp://host:port", "unix:///tmp/s"
+        renderer = StreamRenderer(sink)
+        async for event in workflow.run_stream(task):
+            renderer.handle(event)
+        renderer.finish()
+    print(renderer.report(), file=sys.stderr)
+
+Time-to-first-token is measured from the ExecutorInvokedEvent of each agent turn (or from the
+renderer's creation for executors that do not report invocations) to its first text delta.
+"""
+import asyncio
+import json
+import sys
+import time
+from typing import Any
+
+from agent_framework import AgentRunUpdateEvent, ExecutorInvokedEvent, WorkflowEvent
+
+from .metrics import percentile
+
+
+class BufferedSink:
+    """Base sink: ``write`` only appends to a buffer; a background task flushes it.
+
+    A flush happens every ``interval`` seconds, or sooner once ``max_bytes`` are buffered.
+    Use as an async context manager so the final flush and close are not skipped.
+    """
+
+    def __init__(self, max_bytes: int = 8192, interval: float = 0.05):
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._buffer: list[str] = []
+        self._buffered = 0
+        self._wakeup = asyncio.Event()
+        self._flusher: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> "BufferedSink":
+        await self.open()
+        self._flusher = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+        await self.flush()
+        await self.close()
+
+    def write(self, record: dict[str, Any]) -> None:
+        text = self.format(record)
+        if not text:
+            return
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.max_bytes:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        data = "".join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+        await self._write_out(data)
+
+    def format(self, record: dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    async def open(self) -> None:
+        pass
+
+    async def _write_out(self, data: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class TerminalSink(BufferedSink):
+    """Human readable output on stdout: a ``- executor:`` header whenever the speaker changes."""
+
+    def __init__(self, max_bytes: int = 8192, interval: float = 0.05):
+        super().__init__(max_bytes, interval)
+        self._last_key: tuple[str, str | None] | None = None
+
+    def format(self, record: dict[str, Any]) -> str:
+        if record["type"] != "delta":
+            return ""
+        key = (record["executor"], record["message_id"])
+        if key == self._last_key:
+            return record["text"]
+        header = "\n\n" if self._last_key is not None else ""
+        self._last_key = key
+        return f"{header}- {record['executor']}: {record['text']}"
+
+    async def _write_out(self, data: str) -> None:
+        sys.stdout.write(data)
+        sys.stdout.flush()
+
+    async def close(self) -> None:
+        if self._last_key is not None:
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+
+
+class JsonlSink(BufferedSink):
+    """One JSON record per delta, appended to a file."""
+
+    def __init__(self, path: str, max_bytes: int = 65536, interval: float = 0.2):
+        super().__init__(max_bytes, interval)
+        self.path = path
+        self._file: Any = None
+
+    async def open(self) -> None:
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    async def _write_out(self, data: str) -> None:
+        await asyncio.to_thread(self._file.write, data)
+
+    async def close(self) -> None:
+        self._file.close()
+
+
+class SocketSink(BufferedSink):
+    """JSON records over a TCP (``tcp://host:port``) or Unix (``unix:///path``) stream socket."""
+
+    def __init__(self, address: str, max_bytes: int = 65536, interval: float = 0.05):
+        super().__init__(max_bytes, interval)
+        self.address = address
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def open(self) -> None:
+        if self.address.startswith("unix://"):
+            _, self._writer = await asyncio.open_unix_connection(self.address[len("unix://"):])
+        else:
+            host, port = self.address[len("tcp://"):].rsplit(":", 1)
+            _, self._writer = await asyncio.open_connection(host, int(port))
+
+    async def _write_out(self, data: str) -> None:
+        self._writer.write(data.encode("utf-8"))
+        await self._writer.drain()
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+def open_sink(target: str = "-") -> BufferedSink:
+    """Sink for a target: "-" for the terminal, tcp:// or unix:// for a socket, otherwise a JSONL path."""
+    if target == "-":
+        return TerminalSink()
+    if target.startswith(("tcp://", "unix://")):
+        return SocketSink(target)
+    return JsonlSink(target)
+
+
+class StreamRenderer:
+    """Forwards agent deltas to a sink and measures time-to-first-token per agent."""
+
+    def __init__(self, sink: BufferedSink):
+        self.sink = sink
+        self.started = time.perf_counter()
+        self.ttft: dict[str, list[float]] = {}
+        self.chars: dict[str, int] = {}
+        self._waiting: dict[str, float] = {}
+        self._seen: set[str] = set()
+
+    def handle(self, event: WorkflowEvent) -> bool:
+        """Render the event if it is agent output; returns False for events it ignores."""
+        now = time.perf_counter()
+        if isinstance(event, ExecutorInvokedEvent):
+            self._waiting[event.executor_id] = now
+            self._seen.add(event.executor_id)
+            return False
+        if not isinstance(event, AgentRunUpdateEvent):
+            return False
+        text = event.data.text
+        if not text:
+            return True
+        executor = event.executor_id
+        invoked = self._waiting.pop(executor, None)
+        if invoked is None and executor not in self._seen:
+            # Executors that do not emit invocation events are timed from the start of the run
+            invoked = self.started
+            self._seen.add(executor)
+        if invoked is not None:
+            self.ttft.setdefault(executor, []).append(now - invoked)
+        self.chars[executor] = self.chars.get(executor, 0) + len(text)
+        self.sink.write({
+            "type": "delta",
+            "executor": executor,
+            "message_id": event.data.message_id,
+            "text": text,
+            "t": round(now - self.started, 4),
+        })
+        return True
+
+    def finish(self) -> None:
+        """Append one summary record per agent (ignored by the terminal sink)."""
+        for executor, stats in self.summary().items():
+            self.sink.write({"type": "ttft", "executor": executor, **stats})
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {
+            executor: {
+                "turns": len(samples),
+                "ttft_first_ms": round(samples[0] * 1000, 1),
+                "ttft_p50_ms": round(percentile(samples, 50) * 1000, 1),
+                "ttft_max_ms": round(max(samples) * 1000, 1),
+                "chars": self.chars.get(executor, 0),
+            }
+            for executor, samples in self.ttft.items()
+        }
+
+    def report(self) -> str:
+        lines = ["time to first token:"]
+        for executor, s in self.summary().items():
+            lines.append(
+                f"  {executor:<24} turns {s['turns']:>3} | first {s['ttft_first_ms']} ms | "
+                f"p50 {s['ttft_p50_ms']} ms | max {s['ttft_max_ms']} ms | {s['chars']} chars"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,432 @@
+"""Termination conditions that bound a workflow run's time, tokens, cost and turns.
+
+The builders' own termination callables receive the whole conversation and rescan it on every
+check. Here each condition is updated once per finished agent turn and checked in constant
+time, and conditions compose with ``|`` (stop when any is met) and ``&`` (when all are):
+
+    termination = Termination(MaxTurns(4, "Researcher", "Writer") | MaxWallClock(60) | MaxTokens(20_000))
+    workflow = GroupChatBuilder()...with_termination_condition(termination).build()
+    workflow = termination.watch(workflow)
+
+    registry = AgentRegistry(client, middleware=[turn_meter(), ...])   # feeds every agent turn in
+
+GroupChatBuilder and HandoffBuilder take the Termination itself as their termination
+condition; for MagenticBuilder wrap the manager with ``termination.manager(manager)``, which
+stops at the next progress ledger without another model call. ``watch`` starts the clock and
+turns the run's output into a TerminatedConversation, so the WorkflowOutputEvent carries
+``reason`` (None when the workflow finished on its own) and the run's totals.
+
+Token counts come from the usage the model reports, or are estimated from the text when it
+reports none. Conditions see the turns of the run they belong to, even when the agents are
+shared by concurrent runs, so build one Termination per workflow.
+"""
+import contextvars
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterable, Awaitable, Callable, Sequence
+
+from agent_framework import (
+    AgentMiddleware,
+    AgentRunContext,
+    ChatMessage,
+    MagenticContext,
+    MagenticManagerBase,
+    Role,
+    WorkflowOutputEvent,
+)
+from agent_framework._workflows._magentic import MAGENTIC_MANAGER_NAME, MagenticProgressLedger, MagenticProgressLedgerItem
+
+from .context import message_tokens
+
+# Default price per 1K input and output tokens for MaxCost
+DEFAULT_PRICES = (0.0025, 0.01)
+
+
+@dataclass
+class Turn:
+    """One finished agent run."""
+
+    agent: str
+    prompt_tokens: int
+    completion_tokens: int
+    text: str
+
+
+class Condition:
+    """Updated by ``observe`` once per turn; ``check`` returns why the run should stop, or None."""
+
+    def observe(self, turn: Turn) -> None:
+        pass
+
+    def check(self, elapsed: float) -> str | None:
+        raise NotImplementedError
+
+    def __or__(self, other: "Condition") -> "AnyOf":
+        return AnyOf(self, other)
+
+    def __and__(self, other: "Condition") -> "AllOf":
+        return AllOf(self, other)
+
+
+class AnyOf(Condition):
+    def __init__(self, *conditions: Condition):
+        # Flattened so long chains of | stay one level deep
+        self.conditions = [c for condition in conditions for c in (condition.conditions if isinstance(condition, AnyOf) else [condition])]
+
+    def observe(self, turn: Turn) -> None:
+        for condition in self.conditions:
+            condition.observe(turn)
+
+    def check(self, elapsed: float) -> str | None:
+        for condition in self.conditions:
+            reason = condition.check(elapsed)
+            if reason is not None:
+                return reason
+        return None
+
+
+class AllOf(Condition):
+    def __init__(self, *conditions: Condition):
+        self.conditions = [c for condition in conditions for c in (condition.conditions if isinstance(condition, AllOf) else [condition])]
+
+    def observe(self, turn: Turn) -> None:
+        for condition in self.conditions:
+            condition.observe(turn)
+
+    def check(self, elapsed: float) -> str | None:
+        reasons = []
+        for condition in self.conditions:
+            reason = condition.check(elapsed)
+            if reason is None:
+                return None
+            reasons.append(reason)
+        return " and ".join(reasons)
+
+
+class MaxWallClock(Condition):
+    """Seconds since the run started, including time spent waiting on people."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def check(self, elapsed: float) -> str | None:
+        if elapsed >= self.seconds:
+            return f"wall clock {elapsed:.1f}s reached the {self.seconds:g}s limit"
+        return None
+
+
+class MaxTokens(Condition):
+    """Prompt plus completion tokens over every model call of the run."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+
+    def observe(self, turn: Turn) -> None:
+        self.used += turn.prompt_tokens + turn.completion_tokens
+
+    def check(self, elapsed: float) -> str | None:
+        if self.used >= self.limit:
+            return f"{self.used} tokens used, limit {self.limit}"
+        return None
+
+
+class MaxCost(Condition):
+    """Dollars spent, at ``input_per_1k`` and ``output_per_1k`` per thousand tokens."""
+
+    def __init__(self, dollars: float, input_per_1k: float = DEFAULT_PRICES[0], output_per_1k: float = DEFAULT_PRICES[1]):
+        self.dollars = dollars
+        self.input_per_1k = input_per_1k
+        self.output_per_1k = output_per_1k
+        self.spent = 0.0
+
+    def observe(self, turn: Turn) -> None:
+        self.spent += (turn.prompt_tokens * self.input_per_1k + turn.completion_tokens * self.output_per_1k) / 1000
+
+    def check(self, elapsed: float) -> str | None:
+        if self.spent >= self.dollars:
+            return f"${self.spent:.4f} spent, limit ${self.dollars:g}"
+        return None
+
+
+class MaxTurns(Condition):
+    """Turns taken by the named agents together, or by every agent when none are named."""
+
+    def __init__(self, limit: int, *agents: str):
+        self.limit = limit
+        self.agents = frozenset(agents)
+        self.turns = 0
+
+    def observe(self, turn: Turn) -> None:
+        if not self.agents or turn.agent in self.agents:
+            self.turns += 1
+
+    def check(self, elapsed: float) -> str | None:
+        if self.turns >= self.limit:
+            who = "/".join(sorted(self.agents)) if self.agents else "all agents"
+            return f"{who} took {self.turns} turns, limit {self.limit}"
+        return None
+
+
+class TextMentions(Condition):
+    """The latest turn (of the named agents, if any) contains ``phrase``, ignoring case."""
+
+    def __init__(self, phrase: str, *agents: str):
+        self.phrase = phrase.casefold()
+        self.agents = frozenset(agents)
+        self.said_by: str | None = None
+
+    def observe(self, turn: Turn) -> None:
+        if not self.agents or turn.agent in self.agents:
+            self.said_by = turn.agent if self.phrase in turn.text.casefold() else None
+
+    def check(self, elapsed: float) -> str | None:
+        if self.said_by is not None:
+            return f"{self.said_by} said '{self.phrase}'"
+        return None
+
+
+def limits(max_seconds: float | None = None, max_tokens: int | None = None, max_cost: float | None = None,
+           prices: tuple[float, float] = DEFAULT_PRICES, max_turns: Sequence[str] = ()) -> list[Condition]:
+    """Conditions for the usual command line limits; ``max_turns`` entries are 'AGENT=N' or 'N' for all agents."""
+    conditions: list[Condition] = []
+    if max_seconds is not None:
+        conditions.append(MaxWallClock(max_seconds))
+    if max_tokens is not None:
+        conditions.append(MaxTokens(max_tokens))
+    if max_cost is not None:
+        conditions.append(MaxCost(max_cost, *prices))
+    for spec in max_turns:
+        agent, _, count = spec.rpartition("=")
+        try:
+            conditions.append(MaxTurns(int(count), *([agent] if agent else [])))
+        except ValueError:
+            raise ValueError(f"bad turn limit {spec!r}; expected AGENT=N or N") from None
+    return conditions
+
+
+def parse_prices(spec: str) -> tuple[float, float]:
+    """'IN:OUT' dollars per 1K input and output tokens."""
+    try:
+        prompt, completion = spec.split(":")
+        return float(prompt), float(completion)
+    except ValueError:
+        raise ValueError(f"bad token prices {spec!r}; expected IN:OUT per 1K tokens, e.g. 0.0025:0.01") from None
+
+
+class TerminatedConversation(list):
+    """list[ChatMessage] workflow output with why and when the run stopped.
+
+    Attributes:
+        reason: The condition that ended the run, or None if the workflow finished on its own.
+        totals: Turns, tokens, cost estimate inputs and seconds of the run.
+    """
+
+    def __init__(self, messages: Sequence[ChatMessage], reason: str | None, totals: dict[str, Any]):
+        super().__init__(messages)
+        self.reason = reason
+        self.totals = totals
+
+    def report(self) -> str:
+        t = self.totals
+        ended = f"stopped: {self.reason}" if self.reason else "finished on its own"
+        return (
+            f"termination: {ended} | {t['turns']} turns, {t['prompt_tokens'] + t['completion_tokens']} tokens "
+            f"({t['prompt_tokens']} in, {t['completion_tokens']} out), {t['seconds']:.1f}s"
+        )
+
+
+_current: contextvars.ContextVar["Termination | None"] = contextvars.ContextVar("termination", default=None)
+
+
+class Termination:
+    """The conditions of one workflow run, usable as a GroupChat or Handoff termination condition."""
+
+    def __init__(self, condition: Condition):
+        self.condition = condition
+        self.reason: str | None = None
+        self.turns = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._started: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started if self._started is not None else 0.0
+
+    def observe(self, turn: Turn) -> None:
+        self.turns += 1
+        self.prompt_tokens += turn.prompt_tokens
+        self.completion_tokens += turn.completion_tokens
+        self.condition.observe(turn)
+
+    def check(self) -> str | None:
+        """Why the run should stop; once a condition is met the run stays stopped."""
+        if self.reason is None:
+            self.reason = self.condition.check(self.elapsed)
+        return self.reason
+
+    def __call__(self, conversation: list[ChatMessage]) -> bool:
+        # The builders pass the conversation; everything needed was already counted turn by turn
+        return self.check() is not None
+
+    def totals(self) -> dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "seconds": round(self.elapsed, 3),
+        }
+
+    def watch(self, workflow: Any) -> "WatchedWorkflow":
+        """Run ``workflow`` with this Termination receiving its turns and labelling its output."""
+        return WatchedWorkflow(workflow, self)
+
+    def manager(self, manager: MagenticManagerBase) -> "TerminatingManager":
+        """Magentic manager that ends the run at the next progress check once a condition is met."""
+        return TerminatingManager(manager, self)
+
+
+class WatchedWorkflow:
+    """Workflow wrapper that starts the clock and scopes agent turns to one Termination."""
+
+    def __init__(self, workflow: Any, termination: Termination):
+        self._workflow = workflow
+        self._termination = termination
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._workflow, name)
+
+    def run_stream(self, *args: Any, **kwargs: Any) -> AsyncIterable[Any]:
+        return self._round(self._workflow.run_stream(*args, **kwargs))
+
+    def send_responses_streaming(self, *args: Any, **kwargs: Any) -> AsyncIterable[Any]:
+        return self._round(self._workflow.send_responses_streaming(*args, **kwargs))
+
+    async def _round(self, stream: AsyncIterable[Any]) -> AsyncIterable[Any]:
+        termination = self._termination
+        if termination._started is None:
+            termination._started = time.monotonic()
+        iterator = stream.__aiter__()
+        while True:
+            # Set only while the workflow is running, like the tracer's current span
+            previous = _current.set(termination)
+            try:
+                event = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _current.reset(previous)
+            if isinstance(event, WorkflowOutputEvent) and isinstance(event.data, list):
+                event.data = TerminatedConversation(event.data, termination.reason, termination.totals())
+            yield event
+
+
+class TerminatingManager(MagenticManagerBase):
+    """Delegates to a Magentic manager until a condition is met, then reports the task as done."""
+
+    def __init__(self, manager: MagenticManagerBase, termination: Termination):
+        super().__init__(
+            max_stall_count=manager.max_stall_count,
+            max_reset_count=manager.max_reset_count,
+            max_round_count=manager.max_round_count,
+        )
+        self.inner = manager
+        self.termination = termination
+        self.task_ledger_full_prompt = manager.task_ledger_full_prompt
+
+    def __getattr__(self, name: str) -> Any:
+        # plan_source, task_ledger and the like come from the wrapped manager
+        return getattr(self.inner, name)
+
+    async def plan(self, magentic_context: MagenticContext) -> ChatMessage:
+        return await self.inner.plan(magentic_context)
+
+    async def replan(self, magentic_context: MagenticContext) -> ChatMessage:
+        return await self.inner.replan(magentic_context)
+
+    async def create_progress_ledger(self, magentic_context: MagenticContext) -> MagenticProgressLedger:
+        reason = self.termination.check()
+        if reason is None:
+            return await self.inner.create_progress_ledger(magentic_context)
+        stop = MagenticProgressLedgerItem(reason=reason, answer=True)
+        return MagenticProgressLedger(
+            is_request_satisfied=stop,
+            is_in_loop=MagenticProgressLedgerItem(reason=reason, answer=False),
+            is_progress_being_made=MagenticProgressLedgerItem(reason=reason, answer=False),
+            next_speaker=MagenticProgressLedgerItem(reason=reason, answer=""),
+            instruction_or_question=MagenticProgressLedgerItem(reason=reason, answer=""),
+        )
+
+    async def prepare_final_answer(self, magentic_context: MagenticContext) -> ChatMessage:
+        if self.termination.reason is None:
+            return await self.inner.prepare_final_answer(magentic_context)
+        # No model call: the budget is spent, so hand back the latest participant answer as it stands
+        latest = next(
+            (m.text for m in reversed(magentic_context.chat_history) if m.role == Role.ASSISTANT and m.author_name != MAGENTIC_MANAGER_NAME and m.text),
+            "",
+        )
+        text = f"Stopped before the task was complete ({self.termination.reason})."
+        return ChatMessage(role=Role.ASSISTANT, text=f"{text}\n\n{latest}" if latest else text, author_name=MAGENTIC_MANAGER_NAME)
+
+    def on_checkpoint_save(self) -> dict[str, Any]:
+        return self.inner.on_checkpoint_save()
+
+    def on_checkpoint_restore(self, state: dict[str, Any]) -> None:
+        self.inner.on_checkpoint_restore(state)
+
+
+class TurnMeter(AgentMiddleware):
+    """Reports every finished agent run to the Termination of the workflow running it."""
+
+    async def process(self, context: AgentRunContext, next: Callable[[AgentRunContext], Awaitable[None]]) -> None:
+        termination = _current.get()
+        await next(context)
+        if termination is None:
+            return
+        if context.is_streaming:
+            context.result = self._watch(termination, context, context.result)
+            return
+        response = context.result
+        usage = getattr(response, "usage_details", None)
+        text = response.messages[-1].text if response is not None and response.messages else ""
+        self._observe(termination, context, usage, text, response.messages if response is not None else [])
+
+    async def _watch(self, termination: Termination, context: AgentRunContext, stream: AsyncIterable[Any] | None) -> AsyncIterable[Any]:
+        prompt = completion = 0
+        reported = False
+        chunks: list[str] = []
+        async for update in stream or ():
+            for content in update.contents:
+                if content.type == "usage":
+                    reported = True
+                    prompt += content.details.input_token_count or 0
+                    completion += content.details.output_token_count or 0
+            if update.text:
+                chunks.append(update.text)
+            yield update
+        text = "".join(chunks)
+        if reported:
+            termination.observe(Turn(self._name(context), prompt, completion, text))
+        else:
+            self._observe(termination, context, None, text, [ChatMessage(role=Role.ASSISTANT, text=text)])
+
+    def _observe(self, termination: Termination, context: AgentRunContext, usage: Any, text: str, replies: Sequence[ChatMessage]) -> None:
+        if usage is not None and (usage.input_token_count or usage.output_token_count):
+            prompt, completion = usage.input_token_count or 0, usage.output_token_count or 0
+        else:
+            prompt = sum(message_tokens(m) for m in context.messages)
+            completion = sum(message_tokens(m) for m in replies)
+        termination.observe(Turn(self._name(context), prompt, completion, text))
+
+    @staticmethod
+    def _name(context: AgentRunContext) -> str:
+        return context.agent.name or context.agent.id
+
+
+_meter = TurnMeter()
+
+
+def turn_meter() -> TurnMeter:
+    """The process-wide TurnMeter; it does nothing for runs without a Termination."""
+    return _meter
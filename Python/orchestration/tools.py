@@ -0,0 +1,137 @@
+"""Run function tools off the event loop, concurrently, with optional memoization.
+
+The framework already gathers the tool calls of one model turn concurrently, but a plain
+synchronous tool runs inline on the event loop, so the calls execute one after another and
+every other conversation stalls while they do. ToolPool wraps tools so that sync tools run in a
+bounded thread pool and async tools are awaited natively:
+
+    tools = ToolPool(max_workers=8)
+
+    @tools.tool
+    def process_refund(order_number: str) -> str: ...
+
+    @tools.tool(memo_ttl=30)       # read-only: identical calls within 30s share one result
+    def check_order_status(order_number: str) -> str: ...
+
+Wrapped tools keep their name, signature and docstring, so the schema sent to the model (and
+the agent registry fingerprint) does not change.
+"""
+import asyncio
+import functools
+import inspect
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .metrics import LatencyStats, percentile
+
+# Expired memo entries are swept once a tool has this many
+MEMO_PURGE_SIZE = 1024
+
+
+@dataclass
+class ToolStats:
+    """Per-tool latency (call to result) and queue wait (submitted to started on a worker)."""
+
+    latency: LatencyStats = field(default_factory=LatencyStats)
+    queue_wait: list[float] = field(default_factory=list)
+    memo_hits: int = 0
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "calls": self.latency.count + self.memo_hits,
+            "errors": self.latency.failures,
+            "memo_hits": self.memo_hits,
+            "p50_ms": round(percentile(self.latency.samples, 50) * 1000, 1),
+            "p99_ms": round(percentile(self.latency.samples, 99) * 1000, 1),
+            "wait_p50_ms": round(percentile(self.queue_wait, 50) * 1000, 1),
+            "wait_max_ms": round(max(self.queue_wait, default=0.0) * 1000, 1),
+        }
+
+
+class ToolPool:
+    """Thread pool plus bookkeeping shared by every tool it wraps."""
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self.stats: dict[str, ToolStats] = {}
+
+    def tool(self, func: Callable[..., Any] | None = None, *, memo_ttl: float | None = None) -> Any:
+        """Decorator: ``@pool.tool`` or ``@pool.tool(memo_ttl=seconds)`` for read-only tools."""
+        if func is None:
+            return lambda f: self.tool(f, memo_ttl=memo_ttl)
+
+        name = func.__name__
+        stats = self.stats.setdefault(name, ToolStats())
+        signature = inspect.signature(func)
+        memo: dict[str, tuple[float, asyncio.Future[Any]]] = {}
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(func):
+                    result = await func(*args, **kwargs)
+                else:
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        self._pool, functools.partial(self._run, func, stats, start, args, kwargs)
+                    )
+            except Exception:
+                stats.latency.record(time.perf_counter() - start, ok=False)
+                raise
+            stats.latency.record(time.perf_counter() - start)
+            return result
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if memo_ttl is None:
+                return await call(*args, **kwargs)
+            key = _memo_key(signature, args, kwargs)
+            now = time.monotonic()
+            entry = memo.get(key)
+            if entry is not None and now - entry[0] <= memo_ttl:
+                stats.memo_hits += 1
+                # Concurrent identical calls share the in-flight result as well
+                return await asyncio.shield(entry[1])
+            future = asyncio.ensure_future(call(*args, **kwargs))
+            if len(memo) >= MEMO_PURGE_SIZE:
+                for stale in [k for k, (stored, _) in memo.items() if now - stored > memo_ttl]:
+                    del memo[stale]
+            memo[key] = (now, future)
+            try:
+                return await asyncio.shield(future)
+            except Exception:
+                # Failures are not memoized
+                if memo.get(key, (None, None))[1] is future:
+                    del memo[key]
+                raise
+
+        return wrapper
+
+    @staticmethod
+    def _run(func: Callable[..., Any], stats: ToolStats, submitted: float, args: tuple, kwargs: dict) -> Any:
+        stats.queue_wait.append(time.perf_counter() - submitted)
+        return func(*args, **kwargs)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {name: stats.summary() for name, stats in self.stats.items() if stats.latency.count or stats.memo_hits}
+
+    def report(self) -> str:
+        lines = [f"tools ({self.max_workers} workers):"]
+        for name, s in self.summary().items():
+            lines.append(
+                f"  {name:<24} calls {s['calls']:>4} | errors {s['errors']} | memo hits {s['memo_hits']} | "
+                f"p50 {s['p50_ms']} ms | p99 {s['p99_ms']} ms | queue wait p50 {s['wait_p50_ms']} ms, max {s['wait_max_ms']} ms"
+            )
+        return "\n".join(lines)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _memo_key(signature: inspect.Signature, args: tuple, kwargs: dict) -> str:
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return json.dumps(bound.arguments, sort_keys=True, default=str)
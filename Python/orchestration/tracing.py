@@ -0,0 +1,483 @@
+"""Spans for workflow runs, agent runs, model calls and tool calls, with a summary table.
+
+Enable it with ``ORCHESTRATION_TRACE=traces.jsonl`` (or ``python -m orchestration run --trace``);
+``ORCHESTRATION_TRACE_FORMAT=otlp`` writes OTLP/JSON lines, the format of the OpenTelemetry
+file exporter, instead of one flat record per span. When it is off, ``middleware()`` returns
+nothing and ``trace_workflow`` returns the workflow untouched, so nothing is wrapped or timed.
+
+    registry = AgentRegistry(client, middleware=[*tracing.middleware(), scheduler.middleware()])
+    workflow = tracing.trace_workflow(builder.build(), "magentic")
+    ...
+    tracing.finish()        # prints the summary table to stderr and flushes the file
+
+Spans nest: workflow round > agent run > model call / tool call. Model calls carry queue time
+(waiting in the rate limiter), time to first token, token counts and retries; agent runs carry
+cache hits. Each workflow round also reports framework overhead: its wall time minus the time
+at least one agent was running.
+"""
+import contextvars
+import json
+import os
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable
+
+from agent_framework import (
+    AgentMiddleware,
+    AgentResponse,
+    AgentRunContext,
+    ChatContext,
+    ChatMiddleware,
+    ChatResponse,
+    FunctionInvocationContext,
+    FunctionMiddleware,
+)
+
+from .metrics import percentile
+
+_current: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("orchestration_span", default=None)
+
+
+@dataclass
+class Span:
+    kind: str
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: str | None = None
+    start: float = field(default_factory=time.time)
+    end: float | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    # Workflow round this span belongs to, which collects the intervals its agents were busy
+    workflow: "Span | None" = None
+    busy: list[tuple[float, float]] = field(default_factory=list)
+
+    @property
+    def seconds(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def record_usage(self, usage: Any) -> None:
+        if usage is None:
+            return
+        if usage.input_token_count is not None:
+            self.attributes["prompt_tokens"] = self.attributes.get("prompt_tokens", 0) + usage.input_token_count
+        if usage.output_token_count is not None:
+            self.attributes["completion_tokens"] = self.attributes.get("completion_tokens", 0) + usage.output_token_count
+
+    def to_record(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.seconds * 1000, 2),
+            **self.attributes,
+        }
+
+
+def _union(intervals: list[tuple[float, float]]) -> float:
+    total, reach = 0.0, float("-inf")
+    for start, end in sorted(intervals):
+        if end > reach:
+            total += end - max(start, reach)
+            reach = end
+    return total
+
+
+class JsonlSpanExporter:
+    """One flat JSON record per span."""
+
+    def __init__(self, path: str, flush_every: int = 256):
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer: list[Span] = []
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span) -> None:
+        self._buffer.append(span)
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def _write(self, spans: list[Span]) -> None:
+        for span in spans:
+            self._file.write(json.dumps(span.to_record(), ensure_ascii=False, default=str) + "\n")
+
+    def flush(self) -> None:
+        spans, self._buffer = self._buffer, []
+        if spans:
+            self._write(spans)
+        self._file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpJsonFileExporter(JsonlSpanExporter):
+    """OTLP/JSON lines: each line is an ExportTraceServiceRequest holding one batch of spans."""
+
+    def _write(self, spans: list[Span]) -> None:
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "agent-orchestration"}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "orchestration.tracing"},
+                    "spans": [self._span(span) for span in spans],
+                }],
+            }]
+        }
+        self._file.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+    @staticmethod
+    def _span(span: Span) -> dict[str, Any]:
+        attributes = {"orchestration.kind": span.kind, **span.attributes}
+        record: dict[str, Any] = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": f"{span.kind} {span.name}",
+            # SPAN_KIND_INTERNAL, or CLIENT for calls that leave the process
+            "kind": 3 if span.kind == "chat" else 1,
+            "startTimeUnixNano": str(int(span.start * 1e9)),
+            "endTimeUnixNano": str(int((span.end or span.start) * 1e9)),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None],
+            "status": {"code": 2, "message": attributes["error"]} if "error" in attributes else {"code": 1},
+        }
+        if span.parent_id:
+            record["parentSpanId"] = span.parent_id
+        return record
+
+
+@dataclass
+class _Row:
+    calls: int = 0
+    errors: int = 0
+    samples: list[float] = field(default_factory=list)
+    ttft: list[float] = field(default_factory=list)
+    queue: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+    cache_hits: int = 0
+
+
+class Tracer:
+    """Creates spans, sends finished ones to an exporter and keeps per-name totals for the summary."""
+
+    def __init__(self, exporter: JsonlSpanExporter | None = None):
+        self.exporter = exporter
+        self.rows: dict[tuple[str, str], _Row] = {}
+        self.workflow_seconds = 0.0
+        self.overhead_seconds = 0.0
+
+    def start(self, kind: str, name: str, trace_id: str | None = None, **attributes: Any) -> Span:
+        parent = _current.get()
+        span = Span(
+            kind,
+            name,
+            trace_id=trace_id or (parent.trace_id if parent else uuid.uuid4().hex),
+            parent_id=parent.span_id if parent else None,
+            attributes=attributes,
+        )
+        span.workflow = span if kind == "workflow" else parent.workflow if parent else None
+        return span
+
+    def end(self, span: Span, error: BaseException | None = None) -> None:
+        span.end = time.time()
+        if error is not None:
+            span.attributes["error"] = f"{type(error).__name__}: {error}"
+        if span.kind == "agent" and span.workflow is not None:
+            span.workflow.busy.append((span.start, span.end))
+        if span.kind == "workflow":
+            busy = _union(span.busy)
+            span.attributes["agent_busy_ms"] = round(busy * 1000, 2)
+            span.attributes["overhead_ms"] = round(max(0.0, span.seconds - busy) * 1000, 2)
+            self.workflow_seconds += span.seconds
+            self.overhead_seconds += max(0.0, span.seconds - busy)
+            span.busy = []
+        self._tally(span, error is not None)
+        if self.exporter is not None:
+            self.exporter.export(span)
+
+    def _tally(self, span: Span, failed: bool) -> None:
+        row = self.rows.setdefault((span.kind, span.name), _Row())
+        attrs = span.attributes
+        row.calls += 1
+        row.errors += failed
+        row.samples.append(span.seconds)
+        if "ttft_ms" in attrs:
+            row.ttft.append(attrs["ttft_ms"] / 1000)
+        row.queue += attrs.get("queue_ms", 0.0) / 1000
+        row.prompt_tokens += attrs.get("prompt_tokens", 0)
+        row.completion_tokens += attrs.get("completion_tokens", 0)
+        row.retries += attrs.get("retries", 0)
+        row.cache_hits += bool(attrs.get("cache_hit"))
+
+    async def iterate(self, span: Span, stream: AsyncIterable[Any]) -> AsyncIterable[Any]:
+        """Yield from ``stream`` with ``span`` as the current span while the stream is producing."""
+        iterator = stream.__aiter__()
+        while True:
+            previous = _current.set(span)
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            finally:
+                _current.reset(previous)
+            yield item
+
+    async def within(self, span: Span, call: Callable[[], Awaitable[Any]]) -> Any:
+        previous = _current.set(span)
+        try:
+            return await call()
+        finally:
+            _current.reset(previous)
+
+    def summary_table(self) -> str:
+        lines = [
+            f"{'kind':<9}{'name':<24}{'calls':>6}{'err':>5}{'total s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'ttft ms':>9}{'queue s':>9}{'tok in':>8}{'tok out':>8}{'retry':>6}{'cache':>6}"
+        ]
+        order = {"workflow": 0, "agent": 1, "chat": 2, "tool": 3}
+        for (kind, name), row in sorted(self.rows.items(), key=lambda item: (order.get(item[0][0], 9), -sum(item[1].samples))):
+            ttft = f"{percentile(row.ttft, 50) * 1000:.0f}" if row.ttft else "-"
+            lines.append(
+                f"{kind:<9}{name[:23]:<24}{row.calls:>6}{row.errors:>5}{sum(row.samples):>9.2f}"
+                f"{percentile(row.samples, 50) * 1000:>9.0f}{percentile(row.samples, 95) * 1000:>9.0f}{ttft:>9}"
+                f"{row.queue:>9.2f}{row.prompt_tokens:>8}{row.completion_tokens:>8}{row.retries:>6}{row.cache_hits:>6}"
+            )
+        if self.workflow_seconds:
+            share = self.overhead_seconds / self.workflow_seconds
+            lines.append(
+                f"framework overhead: {self.overhead_seconds:.2f}s of {self.workflow_seconds:.2f}s workflow time "
+                f"({share:.1%}) with no agent running"
+            )
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+class AgentSpanMiddleware(AgentMiddleware):
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    async def process(self, context: AgentRunContext, next: Callable[[AgentRunContext], Awaitable[None]]) -> None:
+        span = self.tracer.start("agent", context.agent.name or "agent")
+        if context.is_streaming:
+            await self.tracer.within(span, lambda: next(context))
+            context.result = self._watch(span, context, context.result)
+            return
+        try:
+            await self.tracer.within(span, lambda: next(context))
+        except BaseException as exc:
+            self.tracer.end(span, exc)
+            raise
+        if isinstance(context.result, AgentResponse):
+            span.record_usage(context.result.usage_details)
+        self._finish(span, context)
+
+    async def _watch(self, span: Span, context: AgentRunContext, stream: AsyncIterable[Any] | None) -> AsyncIterable[Any]:
+        try:
+            async for update in self.tracer.iterate(span, stream or ()):
+                for content in update.contents:
+                    if content.type == "usage":
+                        span.record_usage(content.details)
+                if "ttft_ms" not in span.attributes and update.text:
+                    span.attributes["ttft_ms"] = round((time.time() - span.start) * 1000, 2)
+                yield update
+        except BaseException as exc:
+            self.tracer.end(span, exc)
+            raise
+        self._finish(span, context)
+
+    def _finish(self, span: Span, context: AgentRunContext) -> None:
+        # Set by ResponseCache and the triage fast path when they answer without the model,
+        # and by SingleFlight when the call shared another caller's run
+        if context.metadata.get("cache_hit"):
+            span.attributes["cache_hit"] = True
+        if context.metadata.get("fast_path"):
+            span.attributes["fast_path"] = context.metadata["fast_path"]
+        if context.metadata.get("single_flight"):
+            span.attributes["single_flight"] = context.metadata["single_flight"]
+        self.tracer.end(span)
+
+
+class ChatSpanMiddleware(ChatMiddleware):
+    """Times each model request; place it before the rate limiter to see queue time and retries."""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    async def process(self, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> None:
+        parent = _current.get()
+        name = parent.name if parent is not None and parent.kind == "agent" else "chat"
+        if context.is_streaming:
+            context.result = self._stream(name, context, next)
+            return
+        span = self.tracer.start("chat", name)
+        try:
+            await self.tracer.within(span, lambda: next(context))
+        except BaseException as exc:
+            self._annotate(span, context)
+            self.tracer.end(span, exc)
+            raise
+        if isinstance(context.result, ChatResponse):
+            span.record_usage(context.result.usage_details)
+        self._annotate(span, context)
+        queue = span.attributes.get("queue_ms", 0.0) / 1000
+        span.attributes["ttft_ms"] = round((time.time() - span.start - queue) * 1000, 2)
+        self.tracer.end(span)
+
+    async def _stream(self, name: str, context: ChatContext, next: Callable[[ChatContext], Awaitable[None]]) -> AsyncIterable[Any]:
+        span = self.tracer.start("chat", name)
+        try:
+            await self.tracer.within(span, lambda: next(context))
+            async for update in self.tracer.iterate(span, context.result or ()):
+                for content in update.contents:
+                    if content.type == "usage":
+                        span.record_usage(content.details)
+                if "ttft_ms" not in span.attributes and (update.text or update.contents):
+                    self._annotate(span, context)
+                    queue = span.attributes.get("queue_ms", 0.0) / 1000
+                    span.attributes["ttft_ms"] = round((time.time() - span.start - queue) * 1000, 2)
+                yield update
+        except BaseException as exc:
+            self._annotate(span, context)
+            self.tracer.end(span, exc)
+            raise
+        self._annotate(span, context)
+        self.tracer.end(span)
+
+    @staticmethod
+    def _annotate(span: Span, context: ChatContext) -> None:
+        # Queue time and retries are filled in by RateLimitMiddleware
+        if "queue_seconds" in context.metadata:
+            span.attributes["queue_ms"] = round(context.metadata["queue_seconds"] * 1000, 2)
+        if context.metadata.get("retries"):
+            span.attributes["retries"] = context.metadata["retries"]
+        # and the tokens trimmed by ContextPolicyMiddleware
+        if context.metadata.get("context_saved_tokens"):
+            span.attributes["context_saved_tokens"] = context.metadata["context_saved_tokens"]
+        # and whether HedgingMiddleware sent a duplicate that won or was wasted
+        if context.metadata.get("hedge"):
+            span.attributes["hedge"] = context.metadata["hedge"]
+        # and the label LabelOutput read, if it closed the stream there
+        if context.metadata.get("label"):
+            span.attributes["label"] = context.metadata["label"]
+        if context.metadata.get("stopped_early"):
+            span.attributes["stopped_early"] = True
+
+
+class ToolSpanMiddleware(FunctionMiddleware):
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    async def process(self, context: FunctionInvocationContext, next: Callable[[FunctionInvocationContext], Awaitable[None]]) -> None:
+        span = self.tracer.start("tool", context.function.name)
+        try:
+            await self.tracer.within(span, lambda: next(context))
+        except BaseException as exc:
+            self.tracer.end(span, exc)
+            raise
+        self.tracer.end(span)
+
+
+class TracedWorkflow:
+    """Workflow wrapper that opens a span for each ``run_stream`` / ``send_responses_streaming`` round.
+
+    Rounds that continue a run (responses, checkpoint resumes) share the run's trace id.
+    """
+
+    def __init__(self, workflow: Any, name: str, tracer: Tracer):
+        self._workflow = workflow
+        self._name = name
+        self._tracer = tracer
+        self._trace_id: str | None = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._workflow, name)
+
+    def run_stream(self, *args: Any, **kwargs: Any) -> AsyncIterable[Any]:
+        if kwargs.get("checkpoint_id") is None or self._trace_id is None:
+            self._trace_id = uuid.uuid4().hex
+        return self._round(self._workflow.run_stream(*args, **kwargs))
+
+    def send_responses_streaming(self, *args: Any, **kwargs: Any) -> AsyncIterable[Any]:
+        return self._round(self._workflow.send_responses_streaming(*args, **kwargs))
+
+    async def _round(self, stream: AsyncIterable[Any]) -> AsyncIterable[Any]:
+        span = self._tracer.start("workflow", self._name, trace_id=self._trace_id)
+        events = 0
+        try:
+            async for event in self._tracer.iterate(span, stream):
+                events += 1
+                yield event
+        except BaseException as exc:
+            span.attributes["events"] = events
+            self._tracer.end(span, exc)
+            raise
+        span.attributes["events"] = events
+        self._tracer.end(span)
+
+
+_state: dict[str, Tracer | None] = {}
+
+
+def configure(path: str | None = None, format: str | None = None) -> Tracer | None:
+    """Start tracing to ``path`` (default: $ORCHESTRATION_TRACE); None and no tracing without a path.
+
+    ``format`` is 'jsonl' or 'otlp' (default: $ORCHESTRATION_TRACE_FORMAT, else jsonl).
+    """
+    path = path or os.getenv("ORCHESTRATION_TRACE")
+    format = format or os.getenv("ORCHESTRATION_TRACE_FORMAT", "jsonl")
+    tracer = None
+    if path:
+        exporter = OtlpJsonFileExporter(path) if format == "otlp" else JsonlSpanExporter(path)
+        tracer = Tracer(exporter)
+    _state["tracer"] = tracer
+    return tracer
+
+
+def active_tracer() -> Tracer | None:
+    if "tracer" not in _state:
+        configure()
+    return _state["tracer"]
+
+
+def middleware() -> list[Any]:
+    """Agent, model-call and tool span middleware, or an empty list when tracing is off."""
+    tracer = active_tracer()
+    if tracer is None:
+        return []
+    return [AgentSpanMiddleware(tracer), ChatSpanMiddleware(tracer), ToolSpanMiddleware(tracer)]
+
+
+def trace_workflow(workflow: Any, name: str) -> Any:
+    tracer = active_tracer()
+    return workflow if tracer is None else TracedWorkflow(workflow, name, tracer)
+
+
+def finish() -> None:
+    """Print the summary table to stderr and flush the trace file (no-op when tracing is off)."""
+    tracer = _state.get("tracer")
+    if tracer is None:
+        return
+    print(tracer.summary_table(), file=sys.stderr)
+    tracer.close()
+    print(f"trace: spans written to {tracer.exporter.path}", file=sys.stderr)
+    _state.pop("tracer", None)